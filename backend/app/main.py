@@ -1,17 +1,40 @@
 import os
 import time
-from fastapi import FastAPI, HTTPException, Request
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Query, Header
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
-from .services import scan_directory, write_multiple_updates
-from .models import SaveRequest, SaveResponse
+from fastapi.responses import RedirectResponse, Response, StreamingResponse, PlainTextResponse
+from .services import write_multiple_updates, apply_progress_deltas, apply_bulk_progress, compile_conditions, ParseCache, LiveIndex, DirectoryWatcher, FileTreeCache, ProgressStats, SearchIndex, WRITE_ENGINE
+from .services import BlockingExecutor, Overloaded, resolve_workers, read_table_rows, resolve_data_path
+from .services import ResponseCache, EncodedBody, choose_encoding, etag_matches, file_listing, EventBroker, SaveJournal, ProgressStore
+from .services import ParseSnapshot, METRICS, SamplingProfiler, StartupTimer, configure_logging
+from .services import ProcessLock, LeaderLock, InvalidationBus, SaveScheduler
+from .models import SaveRequest, SaveResponse, DeltaSaveRequest, BulkProgressRequest, BulkProgressResponse
+
+# 日志级别由LOG_LEVEL配置（默认INFO，每个请求的日志为DEBUG），LOG_FORMAT=json时输出结构化日志
+configure_logging()
+logger = logging.getLogger("crt")
+
+# 启动耗时分解，见 /health 的 startup 字段
+STARTUP = StartupTimer()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 导入模块时只创建对象，不访问磁盘；启动和停止的工作都在这里进行
+    start_live_index()
+    yield
+    stop_live_index()
 
 # 创建FastAPI应用
 app = FastAPI(
     title="CRT Collectibles Tracker API",
     description="Markdown游戏收集品追踪器API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 配置CORS
@@ -26,141 +49,784 @@ app.add_middleware(
 # 配置静态文件目录（在生产环境中使用）
 # 在Docker容器中，前端构建产物在 /app/frontend/dist
 STATIC_DIR = "/app/frontend/dist"
-print(f"=" * 60)
-print(f"DEBUG: 静态文件目录路径: {STATIC_DIR}")
-print(f"DEBUG: 静态文件目录是否存在: {os.path.exists(STATIC_DIR)}")
-print(f"=" * 60)
-
-if os.path.exists(STATIC_DIR):
-    print(f"DEBUG: 静态文件目录内容: {os.listdir(STATIC_DIR)}")
-    # 检查dist目录下的具体内容
+
+def log_static_dir():
+    # 列出构建产物，便于排查部署问题（只在DEBUG级别遍历目录）
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     for item in os.listdir(STATIC_DIR):
         item_path = os.path.join(STATIC_DIR, item)
         if os.path.isdir(item_path):
-            print(f"DEBUG: 目录: {item}/")
-            # 列出子目录内容
             try:
                 sub_items = os.listdir(item_path)
-                for sub_item in sub_items[:5]:  # 只显示前5个，避免日志过多
-                    print(f"DEBUG:   - {sub_item}")
-                if len(sub_items) > 5:
-                    print(f"DEBUG:   ... 还有 {len(sub_items) - 5} 个文件")
-            except Exception as e:
-                print(f"DEBUG:   无法读取子目录内容: {e}")
+            except OSError as e:
+                logger.debug("静态文件目录: %s/ (无法读取: %s)", item, e)
+                continue
+            logger.debug("静态文件目录: %s/ %s%s", item, sub_items[:5], f" 等 {len(sub_items)} 个文件" if len(sub_items) > 5 else "")
         else:
-            print(f"DEBUG: 文件: {item} (大小: {os.path.getsize(item_path)} bytes)")
+            logger.debug("静态文件: %s (%d bytes)", item, os.path.getsize(item_path))
+
+# 数据目录 - 使用绝对路径，确保在Docker容器中正确访问（DATA_DIR环境变量可覆盖，如基准测试）
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+
+# 解析结果缓存 - 未修改的文件在重新扫描时直接复用
+PARSE_CACHE = ParseCache(
+    max_entries=int(os.environ.get("PARSE_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.environ.get("PARSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+)
+
+# 常驻内存索引 - 由文件监听器（inotify，不可用时退回轮询）保持与磁盘同步
+# 全量扫描的解析进程数: 0/1 为串行，'auto' 为CPU核数
+LIVE_INDEX = LiveIndex(DATA_DIR, cache=PARSE_CACHE, workers=resolve_workers(os.environ.get("SCAN_WORKERS", "0")))
+WATCHER = DirectoryWatcher(
+    LIVE_INDEX,
+    backend=os.environ.get("WATCHER_BACKEND", "auto"),
+    poll_interval=float(os.environ.get("WATCHER_POLL_INTERVAL", "2.0"))
+)
+
+# 完成度统计 - 随索引增量更新，进度增量保存时按行O(1)更新
+STATS = ProgressStats()
+LIVE_INDEX.subscribe(STATS.on_index_change)
+
+# 全文搜索 - 文件变化先排队，查询时（以及启动扫描完成后）增量建索引
+SEARCH_INDEX = SearchIndex()
+LIVE_INDEX.subscribe(SEARCH_INDEX.on_index_change)
+
+# 变化推送 - 文件变化和保存确认通过Server-Sent Events推送给前端
+EVENTS = EventBroker(history=int(os.environ.get("EVENT_HISTORY", "256")))
+LIVE_INDEX.subscribe(EVENTS.on_index_change)
+EVENT_HEARTBEAT_SECONDS = 15.0
+
+# 预编码的JSON响应 - 按文件缓存编码结果和压缩数据，响应时直接拼接
+RESPONSES = ResponseCache()
+
+# 文件树 - 目录列表按目录mtime缓存，只有变化的目录会重新扫描
+FILE_TREE = FileTreeCache(DATA_DIR)
+
+# 阻塞操作（写入、解析）在有界线程池中执行，事件循环始终能响应健康检查
+EXECUTOR = BlockingExecutor(
+    max_workers=int(os.environ.get("WORKER_THREADS", "4")),
+    max_queue=int(os.environ.get("WORKER_QUEUE_LIMIT", "64"))
+)
+
+# /api/save 的调度器 - 请求按文件排队，同一文件中排队的请求合并为一次改写（每行以最后一次为准），
+# 同时改写的文件数不超过SAVE_MAX_CONCURRENT，其余工作线程留给读取
+SAVE_SCHEDULER = SaveScheduler(
+    EXECUTOR.run,
+    lambda updates: write_after_journal(write_multiple_updates, updates),
+    max_concurrent=int(os.environ.get("SAVE_MAX_CONCURRENT", "2"))
+)
+
+# 进度增量的预写日志 - /api/save/delta 写入日志并fsync后即返回，后台线程合并后改写文件
+# SAVE_JOURNAL_PATH为空时关闭，增量保存同步写入文件
+# PROGRESS_STORE=sqlite时改用SQLite进度库（PROGRESS_DB_PATH）: 增量保存是单行UPDATE，后台线程批量导出到文件，
+# 应用外对文件的修改通过常驻索引导入进度库
+SAVE_JOURNAL_PATH = os.environ.get("SAVE_JOURNAL_PATH", os.path.join(DATA_DIR, ".crt-save-journal"))
+PROGRESS_STORE = os.environ.get("PROGRESS_STORE", "markdown")
+PROGRESS_DB_PATH = os.environ.get("PROGRESS_DB_PATH", os.path.join(DATA_DIR, ".crt-progress.sqlite3"))
+if PROGRESS_STORE == "sqlite":
+    JOURNAL = ProgressStore(
+        PROGRESS_DB_PATH,
+        lambda deltas: write_and_refresh(apply_progress_deltas, deltas, record_deltas),
+        flush_interval=float(os.environ.get("PROGRESS_EXPORT_INTERVAL", "0.5"))
+    )
+    LIVE_INDEX.subscribe(JOURNAL.on_index_change)
+elif SAVE_JOURNAL_PATH:
+    JOURNAL = SaveJournal(
+        SAVE_JOURNAL_PATH,
+        lambda deltas: write_and_refresh(apply_progress_deltas, deltas, record_deltas),
+        flush_interval=float(os.environ.get("SAVE_JOURNAL_FLUSH_INTERVAL", "0.5"))
+    )
 else:
-    print(f"警告: 静态文件目录不存在: {STATIC_DIR}")
-    print(f"DEBUG: 当前工作目录: {os.getcwd()}")
-    print(f"DEBUG: 工作目录内容: {os.listdir(os.getcwd())}")
+    JOURNAL = None
+
+# 解析结果的磁盘快照 - 重启后先用快照提供服务，只重新解析过期的文件；PARSE_SNAPSHOT_PATH为空时关闭
+PARSE_SNAPSHOT_PATH = os.environ.get("PARSE_SNAPSHOT_PATH", os.path.join(DATA_DIR, ".crt-parse-snapshot"))
+SNAPSHOT = ParseSnapshot(PARSE_SNAPSHOT_PATH, DATA_DIR) if PARSE_SNAPSHOT_PATH else None
+SNAPSHOT_INTERVAL = float(os.environ.get("PARSE_SNAPSHOT_INTERVAL", "60"))
+
+# 多进程部署（WEB_CONCURRENCY>1，或CLUSTER_MODE=on）: 每个worker进程各自持有一份索引，
+# 写入时持有按文件的进程间锁，索引变化通过共享目录中的失效日志广播给其他进程；
+# 选举出的主进程负责目录监听和保存解析快照，其他进程载入主进程的快照，主进程退出后由其中一个接替
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+CLUSTER_MODE = os.environ.get("CLUSTER_MODE", "auto")
+CLUSTER_ENABLED = CLUSTER_MODE == "on" or (CLUSTER_MODE == "auto" and WEB_CONCURRENCY > 1)
+CLUSTER_DIR = os.environ.get("CLUSTER_DIR", os.path.join(DATA_DIR, ".crt-cluster"))
+CLUSTER_SNAPSHOT_WAIT = float(os.environ.get("CLUSTER_SNAPSHOT_WAIT", "120"))
+WRITE_LOCK = ProcessLock(os.path.join(CLUSTER_DIR, "write.lock")) if CLUSTER_ENABLED else None
+LEADER = LeaderLock(os.path.join(CLUSTER_DIR, "leader.lock")) if CLUSTER_ENABLED else None
+BUS = InvalidationBus(
+    os.path.join(CLUSTER_DIR, "invalidations.log"),
+    LIVE_INDEX,
+    poll_interval=float(os.environ.get("CLUSTER_POLL_INTERVAL", "0.1")),
+    max_bytes=int(os.environ.get("CLUSTER_LOG_MAX_BYTES", str(1024 * 1024)))
+) if CLUSTER_ENABLED else None
+if BUS is not None:
+    LIVE_INDEX.subscribe(BUS.on_index_change)
+
+# 后台线程的停止信号（快照定期保存、尚未完成的启动工作）
+SHUTDOWN = threading.Event()
+
+# 启动时预热的组件（逗号分隔）: search 预先建好搜索索引，responses 预先编码 /api/structure 和 /api/files
+# 未预热的组件在第一次请求时构建；设为空则不预热
+STARTUP_WARMUP = {name.strip() for name in os.environ.get("STARTUP_WARMUP", "search").split(",") if name.strip()}
+
+# 采样分析器 - 设置PROFILE_INTERVAL_MS时启用，/debug/profile 返回折叠栈
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "0"))
+PROFILER = SamplingProfiler(PROFILE_INTERVAL_MS / 1000) if PROFILE_INTERVAL_MS > 0 else None
+
+# /metrics 中的状态指标，输出时读取
+METRICS.gauge('crt_index_ready', "1 once the live index has been built", lambda: int(LIVE_INDEX.ready.is_set()))
+METRICS.gauge('crt_index_files', "Markdown files in the live index", lambda: LIVE_INDEX.stats()['files'])
+METRICS.gauge('crt_parse_cache_hits', "Parse cache hits", lambda: PARSE_CACHE.hits)
+METRICS.gauge('crt_parse_cache_misses', "Parse cache misses", lambda: PARSE_CACHE.misses)
+METRICS.gauge('crt_executor_queue_depth', "Blocking tasks waiting for a worker thread", lambda: EXECUTOR.stats()['queued'])
+METRICS.gauge('crt_save_queue_depth', "/api/save requests waiting for their file to be rewritten", lambda: SAVE_SCHEDULER.stats()['queuedRequests'])
+METRICS.gauge('crt_event_subscribers', "Connected /api/events clients", lambda: EVENTS.stats()['subscribers'])
+if JOURNAL is not None:
+    METRICS.gauge('crt_journal_lag_records', "Journal records not yet written to markdown files", lambda: JOURNAL.stats()['lagRecords'])
+    METRICS.gauge('crt_journal_lag_seconds', "Age of the oldest unflushed journal delta", lambda: JOURNAL.stats()['lagSeconds'])
+
+def start_live_index():
+    # 接受请求之前只打开并重放预写日志（增量保存依赖它）
+    # 目录监听（需要遍历整个目录树）和全量扫描都在后台线程中进行，期间健康检查等请求照常响应
+    os.makedirs(DATA_DIR, exist_ok=True)
+    logger.info("数据目录: %s", DATA_DIR)
+    mount_static_files()
+    if PROFILER is not None:
+        PROFILER.start()
+    if CLUSTER_ENABLED:
+        # 在写入预写日志中的记录之前开始协调，载入索引期间其他进程的修改也不会遗漏
+        os.makedirs(CLUSTER_DIR, exist_ok=True)
+        WRITE_ENGINE.process_lock = WRITE_LOCK
+        LEADER.try_acquire()
+        BUS.rotate = LEADER.is_leader
+        BUS.open()
+        logger.info("多进程模式: 进程 %d 为%s", os.getpid(), "主进程" if LEADER.is_leader else "从进程")
+    if JOURNAL is not None:
+        with STARTUP.phase('journal'):
+            JOURNAL.start()
+    threading.Thread(target=build_live_index, name="crt-index-build", daemon=True).start()
+    STARTUP.mark('serving')
+
+def build_live_index():
+    # 先启动监听再全量扫描，避免遗漏扫描期间发生的修改
+    if SHUTDOWN.is_set():
+        return
+    leader = is_leader()
+    if leader:
+        with STARTUP.phase('watcher'):
+            WATCHER.start()
+    if JOURNAL is not None:
+        # 先写入重放的日志记录，避免全量扫描读到写入前的内容
+        with STARTUP.phase('journalFlush'):
+            JOURNAL.flush()
+    with STARTUP.phase('snapshot'):
+        files = load_snapshot()
+    if files is not None:
+        # 先用快照中仍然有效的文件提供服务，再扫描目录，只重新解析过期和新增的文件
+        LIVE_INDEX.seed(files)
+        STARTUP.mark('indexReady')
+        with STARTUP.phase('index'):
+            changed = LIVE_INDEX.sync()
+        logger.info("索引与磁盘同步完成，%d 个文件有变化", changed)
+    else:
+        with STARTUP.phase('index'):
+            LIVE_INDEX.rebuild()
+        STARTUP.mark('indexReady')
+    STARTUP.mark('indexSynced')
+    if BUS is not None:
+        BUS.start()
+        if not leader:
+            LEADER.wait(promote)
+    warm_up()
+    logger.info("启动完成，监听后端: %s", WATCHER.stats()['backend'], extra={'startup': STARTUP.stats()})
+    if SNAPSHOT is not None and leader and not SHUTDOWN.is_set():
+        with STARTUP.phase('snapshotSave'):
+            save_snapshot()
+        threading.Thread(target=run_snapshot_saver, name="crt-snapshot", daemon=True).start()
+
+def is_leader():
+    # 单进程部署时总是主进程
+    return LEADER is None or LEADER.is_leader
+
+def load_snapshot():
+    if SNAPSHOT is None:
+        return None
+    files = SNAPSHOT.load(PARSE_CACHE)
+    # 多进程首次启动时还没有快照: 从进程等待主进程扫描完成并保存快照，避免每个进程各自解析一遍
+    # 等待超时（或期间成为主进程）时自行扫描
+    deadline = time.monotonic() + CLUSTER_SNAPSHOT_WAIT
+    while files is None and not is_leader() and time.monotonic() < deadline and not SHUTDOWN.wait(0.2):
+        files = SNAPSHOT.load(PARSE_CACHE)
+    return files
+
+def promote():
+    # 接替退出的主进程: 启动目录监听，补上没有监听期间的修改，并接管快照保存
+    if SHUTDOWN.is_set():
+        return
+    BUS.rotate = True
+    WATCHER.start()
+    changed = LIVE_INDEX.sync()
+    logger.info("已接替为主进程，%d 个文件有变化", changed)
+    if SNAPSHOT is not None:
+        threading.Thread(target=run_snapshot_saver, name="crt-snapshot", daemon=True).start()
 
-# 数据目录 - 使用绝对路径，确保在Docker容器中正确访问
-DATA_DIR = "/app/data"
-print(f"DEBUG: 数据目录路径: {DATA_DIR}")
-print(f"DEBUG: 数据目录是否存在: {os.path.exists(DATA_DIR)}")
+def cluster_stats():
+    if not CLUSTER_ENABLED:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "role": "leader" if LEADER.is_leader else "follower",
+        "pid": os.getpid(),
+        "writeLocks": WRITE_LOCK.acquired,
+        "bus": BUS.stats()
+    }
 
-# 确保数据目录存在
-os.makedirs(DATA_DIR, exist_ok=True)
-print(f"DEBUG: 数据目录确保存在: {os.path.exists(DATA_DIR)}")
+def warm_up():
+    # 按STARTUP_WARMUP预先构建第一次请求才需要的数据
+    if 'search' in STARTUP_WARMUP:
+        with STARTUP.phase('warmSearch'):
+            SEARCH_INDEX.refresh()
+    if 'responses' in STARTUP_WARMUP:
+        with STARTUP.phase('warmResponses'):
+            files = LIVE_INDEX.files()
+            RESPONSES.structure(files)
+            RESPONSES.document('files', files, lambda: {"files": file_listing(files)}, files)
+    STARTUP.mark('warm')
+
+def save_snapshot():
+    try:
+        SNAPSHOT.save(LIVE_INDEX.files(), LIVE_INDEX.version)
+    except Exception as e:
+        logger.warning("保存解析快照失败: %s", e)
+
+def run_snapshot_saver():
+    # 索引有变化时定期保存快照
+    while not SHUTDOWN.wait(SNAPSHOT_INTERVAL):
+        save_snapshot()
+
+def stop_live_index():
+    SHUTDOWN.set()
+    if JOURNAL is not None:
+        JOURNAL.stop()
+    WATCHER.stop()
+    if BUS is not None:
+        BUS.stop()
+    if SNAPSHOT is not None and LIVE_INDEX.ready.is_set() and is_leader():
+        save_snapshot()
+    if PROFILER is not None:
+        PROFILER.stop()
+    EXECUTOR.shutdown()
+
+# 请求指标和日志中间件：按路由模板（而非实际路径）统计，避免标签数量无限增长
+REQUESTS_TOTAL = METRICS.counter('crt_http_requests_total', "HTTP requests by route and status", ('method', 'route', 'status'))
+REQUEST_SECONDS = METRICS.histogram('crt_http_request_seconds', "HTTP request latency (until response headers)", ('route',))
 
-# 添加请求日志中间件
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    print(f"DEBUG: 收到请求: {request.method} {request.url.path} from {request.client.host if request.client else 'unknown'}")
-    
+    started_at = time.perf_counter()
     response = await call_next(request)
+    elapsed = time.perf_counter() - started_at
     
-    process_time = time.time() - start_time
-    print(f"DEBUG: 响应: {response.status_code} | 处理时间: {process_time:.3f}s")
+    route = request.scope.get('route')
+    route_path = route.path if route is not None and hasattr(route, 'path') else 'other'
+    REQUESTS_TOTAL.inc(request.method, route_path, str(response.status_code))
+    REQUEST_SECONDS.observe(elapsed, route_path)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s -> %d %.3fs", request.method, request.url.path, response.status_code, elapsed,
+                     extra={'client': request.client.host if request.client else None})
     return response
 
 # 先定义API路由（在挂载静态文件之前）
 @app.get("/api/structure")
-async def get_structure():
+async def get_structure(request: Request):
     """
     获取所有Markdown文件的结构化数据
+    直接返回常驻索引中的数据，不访问磁盘；响应由各文件预编码的JSON拼接而成，支持gzip/brotli和ETag
+    """
+    await wait_for_index()
+    files = LIVE_INDEX.files()
+    body = RESPONSES.cached('structure', files)
+    if body is None:
+        body = await run_blocking(RESPONSES.structure, files)
+    return await encoded_response(request, body)
+
+@app.get("/api/files")
+async def get_files(request: Request):
+    """
+    获取轻量的文件列表（每个表格只包含标题和行数），用于首屏加载
+    """
+    await wait_for_index()
+    files = LIVE_INDEX.files()
+    body = RESPONSES.cached('files', files)
+    if body is None:
+        body = await run_blocking(RESPONSES.document, 'files', files, lambda: {"files": file_listing(files)}, files)
+    return await encoded_response(request, body)
+
+@app.get("/api/file")
+async def get_file(path: str, request: Request):
+    """
+    获取单个文件的全部表格
+    """
+    await wait_for_index()
+    file_data = LIVE_INDEX.get(path)
+    if file_data is None or not file_data.tables:
+        raise HTTPException(status_code=404, detail=f"文件不存在: {path}")
+    body = RESPONSES.cached(f"file:{file_data.filePath}", file_data)
+    if body is None:
+        body = await run_blocking(RESPONSES.file, file_data)
+    return await encoded_response(request, body)
+
+@app.get("/api/table")
+async def get_table(
+    path: str,
+    index: int = Query(0, ge=0),
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000)
+):
     """
-    print(f"DEBUG: API请求 /api/structure")
+    分页获取单个表格的行
+    cursor为起始行号，响应中的nextCursor为下一页的cursor，最后一页为null
+    """
+    await wait_for_index()
+    file_data = LIVE_INDEX.get(path)
+    if file_data is None or index >= len(file_data.tables):
+        raise HTTPException(status_code=404, detail=f"表格不存在: {path} #{index}")
+    
+    table = file_data.tables[index]
+    end = min(cursor + limit, table.row_count)
+    return {
+        "filePath": file_data.filePath,
+        "version": file_data.version,
+        "tableIndex": index,
+        "title": table.title,
+        "header": list(table.header),
+        "totalRows": table.row_count,
+        "cursor": cursor,
+        "rows": table.rows(cursor, end),
+        "nextCursor": end if end < table.row_count else None
+    }
+
+@app.get("/api/table/range")
+async def get_table_range(
+    path: str,
+    index: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=5000)
+):
+    """
+    获取单个表格中从offset开始的limit行，用于虚拟滚动
+    按解析时记录的行偏移索引直接读取文件中对应的字节范围，只解析这些行；文件在建立索引后被修改时改用常驻索引
+    """
+    await wait_for_index()
+    file_data = LIVE_INDEX.get(path)
+    if file_data is None or index >= len(file_data.tables):
+        raise HTTPException(status_code=404, detail=f"表格不存在: {path} #{index}")
+
     try:
-        results = scan_directory(DATA_DIR)
-        print(f"DEBUG: 扫描完成，找到 {len(results)} 个文件")
-        return {"files": results}
-    except Exception as e:
-        print(f"ERROR: 扫描目录失败: {e}")
-        raise HTTPException(status_code=500, detail=f"扫描目录失败: {str(e)}")
+        file_path = resolve_data_path(DATA_DIR, file_data.filePath)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    table = file_data.tables[index]
+    end = min(offset + limit, table.row_count)
+    rows = await run_blocking(read_table_rows, file_path, table, file_data.version, offset, end)
+    return {
+        "filePath": file_data.filePath,
+        "version": file_data.version,
+        "tableIndex": index,
+        "totalRows": table.row_count,
+        "offset": offset,
+        "rows": rows if rows is not None else table.rows(offset, end),
+        "source": "file" if rows is not None else "index"
+    }
+
+async def run_blocking(fn, *args):
+    try:
+        return await EXECUTOR.run(fn, *args)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def encoded_response(request: Request, body: EncodedBody) -> Response:
+    """
+    返回预编码的响应体：If-None-Match命中时返回304，否则按Accept-Encoding选择压缩方式
+    """
+    headers = {"ETag": body.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), body.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    content = body.peek(encoding)
+    if content is None:
+        # 首次请求某种编码时需要拼接或压缩，在工作线程中进行
+        content = await run_blocking(body.encode, encoding)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+async def wait_for_index():
+    # 启动时的全量扫描尚未完成，异步等待而不占用工作线程
+    while not LIVE_INDEX.ready.is_set():
+        await asyncio.sleep(0.05)
+
+async def wait_for_journal():
+    # 进度库在首次导入（索引就绪）之前不导出，同步写入需要等待，否则之前的修改稍后会覆盖本次写入
+    if isinstance(JOURNAL, ProgressStore):
+        await wait_for_index()
 
 @app.get("/api/file-tree")
 async def get_file_tree():
     """
     获取文件树结构，用于文件管理器
+    目录结构只来自目录元数据，文件的表格数和进度统计来自内存中的统计，不读取任何文件内容
     """
-    print(f"DEBUG: API请求 /api/file-tree")
+    await wait_for_index()
+    if not os.path.exists(DATA_DIR):
+        return {"tree": []}
     try:
-        tree = build_file_tree(DATA_DIR)
-        print(f"DEBUG: 构建文件树完成")
+        # 先取版本号再构建，统计在构建期间变化时下次请求会重新构建
+        tree = await EXECUTOR.run(FILE_TREE.build, STATS.file_info, STATS.version)
         return {"tree": tree}
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        print(f"ERROR: 构建文件树失败: {e}")
+        logger.error("构建文件树失败: %s", e)
         raise HTTPException(status_code=500, detail=f"构建文件树失败: {str(e)}")
 
+@app.get("/api/stats")
+async def get_stats(path: str = Query(None)):
+    """
+    获取完成度统计（数据行数、已完成行数），供仪表盘轮询
+    不带path时返回总计、每个目录和每个文件的汇总；path为文件时返回其每个表格及每个分段的统计
+    """
+    await wait_for_index()
+    if path is None:
+        return STATS.summary()
+    detail = STATS.file_detail(path)
+    if detail is None:
+        raise HTTPException(status_code=404, detail=f"文件不存在或没有表格: {path}")
+    return detail
+
+@app.get("/api/search")
+async def search(q: str = Query(...), limit: int = Query(50, ge=1, le=500), prefix: bool = Query(True)):
+    """
+    在所有表格的单元格和表头中搜索，返回命中的 (filePath, tableIndex, rowIndex) 及该行内容
+    多个词之间为AND；prefix为True时英文/数字词按前缀匹配，中文按双字匹配
+    """
+    await wait_for_index()
+    try:
+        return await EXECUTOR.run(run_search, q, limit, prefix)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def run_search(query: str, limit: int, prefix: bool):
+    started_at = time.perf_counter()
+    found = SEARCH_INDEX.search(query, limit, prefix)
+    for result in found['results']:
+        # 补充表格标题和行内容，文件在索引之间发生变化时可能为空
+        file_data = LIVE_INDEX.get(result['filePath'])
+        table = file_data.tables[result['tableIndex']] if file_data and result['tableIndex'] < len(file_data.tables) else None
+        result['title'] = table.title if table else None
+        if table is None or result['rowIndex'] is None:
+            result['row'] = list(table.header) if table else None
+        else:
+            result['row'] = table.row(result['rowIndex']) if result['rowIndex'] < table.row_count else None
+    found['query'] = query
+    found['tookMs'] = round((time.perf_counter() - started_at) * 1000, 3)
+    return found
+
+def write_and_refresh(writer, items, on_written=None):
+    """
+    在工作线程中执行写入，并刷新受影响文件的索引
+    on_written(items, results) 在刷新索引之前调用
+    """
+    results = writer(items, DATA_DIR)
+    if on_written is not None:
+        on_written(items, results)
+    for file_path in results['updated_files']:
+        # 写入后立即刷新索引，无需等待监听事件
+        LIVE_INDEX.update_file(os.path.join(DATA_DIR, file_path))
+    return results
+
+def write_after_journal(writer, items, on_written=None):
+    """
+    同步写入（/api/save、携带baseVersion的增量）之前先写入预写日志中待写入的增量，
+    否则后台线程稍后会用更早的增量覆盖本次写入
+    """
+    if JOURNAL is not None:
+        JOURNAL.flush()
+    return write_and_refresh(writer, items, on_written)
+
+def record_deltas(items, results):
+    # 统计按实际写入的行（results['deltas']，预写日志中的增量可能已按行内容对应到新行号）更新，并推送逐行的保存确认
+    STATS.apply_deltas(results['deltas'], results)
+    EVENTS.on_progress_saved(results['deltas'], results)
+    for error in results['errors']:
+        EVENTS.publish('save-error', {'filePath': error['file'], 'message': error['error']})
+
+def journal_deltas(deltas):
+    """
+    校验增量后写入预写日志，返回与写入服务相同格式的结果（versions为空，新版本号随progress事件推送）
+    某个文件中任一增量无效时，该文件的所有增量都不会被记录
+    """
+    results = {'success': True, 'updated_files': [], 'errors': [], 'versions': {}}
+    accepted = []
+    deltas_by_file = {}
+    for delta in deltas:
+        deltas_by_file.setdefault(delta.filePath, []).append(delta)
+    for file_path, file_deltas in deltas_by_file.items():
+        file_data = LIVE_INDEX.get(file_path)
+        error = check_deltas(file_path, file_data, file_deltas)
+        if error:
+            results['success'] = False
+            results['errors'].append({'file': file_path, 'error': error})
+        else:
+            # 记录行的内容，写入时文件已被外部修改（或重启后重放）也能找到原来的行
+            accepted.extend(
+                delta.model_copy(update={'rowCells': table.data_cells(table.data_index(delta.rowIndex))})
+                for delta in file_deltas
+                for table in (file_data.tables[delta.tableIndex],)
+            )
+            results['updated_files'].append(file_path)
+    if accepted:
+        # 进度库中缺少某些行时（导入尚未跟上索引）拒绝该文件的增量
+        for file_path, error in JOURNAL.append(accepted).items():
+            results['success'] = False
+            results['updated_files'].remove(file_path)
+            results['errors'].append({'file': file_path, 'error': error})
+    return results
+
+def check_deltas(file_path, file_data, deltas):
+    # 按常驻索引中的文件检查表格和行是否存在、是否为分隔行，返回错误信息
+    if file_data is None:
+        return f"文件不存在: {file_path}"
+    for delta in deltas:
+        if not 0 <= delta.tableIndex < len(file_data.tables):
+            return f"表格不存在: {delta.tableIndex}"
+        table = file_data.tables[delta.tableIndex]
+        if not 0 <= delta.rowIndex < table.row_count:
+            return f"行不存在: 表格 {delta.tableIndex} 第 {delta.rowIndex} 行"
+        if table.is_separator(delta.rowIndex):
+            return f"不能修改分隔行: 表格 {delta.tableIndex} 第 {delta.rowIndex} 行"
+    return None
+
+def build_save_response(results) -> SaveResponse:
+    """
+    根据写入结果生成响应
+    """
+    if results['success']:
+        logger.info("保存成功: %d 个文件已更新", len(results['updated_files']), extra={'files': results['updated_files']})
+        return SaveResponse(success=True, message="保存成功", versions=results['versions'], commitMs=results.get('commitMs'))
+    else:
+        error_msg = "保存失败:\n" + "\n".join([
+            f"  {err['file']}: {err['error']}"
+            for err in results['errors']
+        ])
+        logger.error(error_msg)
+        return SaveResponse(success=False, message=error_msg, versions=results['versions'], commitMs=results.get('commitMs'))
+
 @app.post("/api/save", response_model=SaveResponse)
 async def save_changes(save_request: SaveRequest):
     """
     保存更改到Markdown文件
+    由SAVE_SCHEDULER按文件排队，与同一文件中排队的其他请求合并后改写；响应的commitMs为提交延迟
     """
-    print(f"DEBUG: API请求 /api/save，更新 {len(save_request.updates)} 个表格")
     try:
-        results = write_multiple_updates(save_request.updates, DATA_DIR)
-        
-        if results['success']:
-            print(f"INFO: 保存成功: {len(results['updated_files'])} 个文件已更新")
-            for file_path in results['updated_files']:
-                print(f"INFO:   - {file_path}")
-            return SaveResponse(success=True, message="保存成功")
+        await wait_for_journal()
+        results = await SAVE_SCHEDULER.submit(save_request.updates)
+        return build_save_response(results)
+            
+    except Overloaded as e:
+        logger.warning("%s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        error_msg = f"保存失败: {str(e)}"
+        logger.error(error_msg)
+        return SaveResponse(success=False, message=error_msg)
+
+@app.post("/api/save/delta", response_model=SaveResponse)
+async def save_deltas(delta_request: DeltaSaveRequest):
+    """
+    按行保存进度增量，只传输发生变化的行
+    启用预写日志时写入日志后即返回，文件由后台合并改写；携带baseVersion的请求需要版本检查，仍同步写入
+    """
+    try:
+        if JOURNAL is not None and not any(delta.baseVersion for delta in delta_request.deltas):
+            await wait_for_index()
+            results = await EXECUTOR.run(journal_deltas, delta_request.deltas)
         else:
-            error_msg = "保存失败:\n" + "\n".join([
-                f"  {err['file']}: {err['error']}"
-                for err in results['errors']
-            ])
-            print(f"ERROR: {error_msg}")
-            return SaveResponse(success=False, message=error_msg)
+            await wait_for_journal()
+            results = await EXECUTOR.run(write_after_journal, apply_progress_deltas, delta_request.deltas, record_deltas)
+        return build_save_response(results)
             
+    except Overloaded as e:
+        logger.warning("%s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         error_msg = f"保存失败: {str(e)}"
-        print(f"ERROR: {error_msg}")
+        logger.error(error_msg)
         return SaveResponse(success=False, message=error_msg)
 
+@app.post("/api/progress/bulk", response_model=BulkProgressResponse)
+async def bulk_progress(bulk_request: BulkProgressRequest):
+    """
+    批量设置或清除进度：按行号范围、分隔行划分的分段或单元格条件选择行
+    filePath为目录（或空字符串表示全部）时作用于其下的所有文件；每个文件只读写一次，响应只包含命中和改变的行数
+    """
+    for operation in bulk_request.operations:
+        try:
+            compile_conditions(operation.where)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    await wait_for_index()
+    try:
+        results = await EXECUTOR.run(run_bulk_progress, bulk_request.operations)
+    except Overloaded as e:
+        logger.warning("%s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        error_msg = f"批量操作失败: {str(e)}"
+        logger.error(error_msg)
+        return BulkProgressResponse(success=False, message=error_msg)
+
+    response = build_save_response(results)
+    affected = results['affected']
+    return BulkProgressResponse(
+        success=response.success,
+        message=response.message,
+        versions=response.versions,
+        matched=sum(counts['matched'] for counts in affected.values()),
+        changed=sum(counts['changed'] for counts in affected.values()),
+        affected=affected
+    )
+
+def run_bulk_progress(operations):
+    """
+    展开目录后执行批量操作；先写入预写日志中待写入的增量，保证之前的单行保存不会覆盖批量操作的结果
+    """
+    operations, errors = expand_bulk_operations(operations)
+    if JOURNAL is not None:
+        JOURNAL.flush()
+    results = write_and_refresh(apply_bulk_progress, operations, record_deltas)
+    if errors:
+        results['success'] = False
+        results['errors'] = errors + results['errors']
+    return results
+
+def expand_bulk_operations(operations):
+    # filePath不是已知文件时按目录前缀展开为其下的所有文件，返回 (展开后的操作, 错误)
+    expanded = []
+    errors = []
+    paths = None
+    for operation in operations:
+        if LIVE_INDEX.get(operation.filePath) is not None:
+            expanded.append(operation)
+            continue
+        if paths is None:
+            paths = sorted(file_data.filePath for file_data in LIVE_INDEX.files() if file_data.tables)
+        prefix = operation.filePath.strip('/')
+        matches = [path for path in paths if not prefix or path.startswith(prefix + '/')]
+        if not matches:
+            errors.append({'file': operation.filePath, 'error': f"文件或目录不存在: {operation.filePath}"})
+        expanded.extend(operation.model_copy(update={'filePath': path}) for path in matches)
+    return expanded, errors
+
+@app.get("/api/events")
+async def events(request: Request, last_event_id: str = Header(None)):
+    """
+    Server-Sent Events推送：
+    - file: 文件被修改、新增或删除（内容与/api/files中的条目相同，删除时为removed）
+    - progress: 进度增量已写入，逐行确认，附带文件的新版本号
+    - resync: 索引重建或事件已丢失，客户端应重新加载文件列表
+    断线重连时浏览器自动携带Last-Event-ID，服务端补发期间错过的事件
+    """
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+    subscriber, backlog = EVENTS.subscribe(asyncio.get_running_loop(), last_id)
+
+    async def stream():
+        try:
+            yield b'retry: 3000\n\n'
+            for event in backlog:
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # 心跳注释，防止代理断开空闲连接
+                    yield b': ping\n\n'
+                    continue
+                yield event
+        finally:
+            EVENTS.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus文本格式的指标：请求数和延迟、扫描/写入各阶段耗时、索引/缓存/日志等状态
+    """
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/profile")
+async def debug_profile(reset: bool = Query(False)):
+    """
+    采样分析器统计的折叠栈（可用flamegraph.pl或speedscope查看），未启用时返回404
+    """
+    if PROFILER is None:
+        raise HTTPException(status_code=404, detail="采样分析器未启用，请设置PROFILE_INTERVAL_MS")
+    return PlainTextResponse(PROFILER.collapsed(reset))
+
 # 定义其他API路由
 @app.get("/health")
 async def health_check():
     """
     健康检查接口
     """
-    print(f"DEBUG: 健康检查请求 /health")
-    return {"status": "healthy", "service": "CRT Collectibles Tracker API"}
+    return {
+        "status": "healthy",
+        "service": "CRT Collectibles Tracker API",
+        "parseCache": PARSE_CACHE.stats(),
+        "index": LIVE_INDEX.stats(),
+        "watcher": WATCHER.stats(),
+        "writer": WRITE_ENGINE.stats(),
+        "executor": EXECUTOR.stats(),
+        "saveScheduler": SAVE_SCHEDULER.stats(),
+        "search": SEARCH_INDEX.stats(),
+        "responses": RESPONSES.stats(),
+        "events": EVENTS.stats(),
+        "journal": JOURNAL.stats() if JOURNAL is not None else {"enabled": False},
+        "snapshot": SNAPSHOT.stats() if SNAPSHOT is not None else None,
+        "startup": STARTUP.stats(),
+        "cluster": cluster_stats()
+    }
 
-# 删除重复的静态文件挂载，只保留一次
-# 移除第33-34行的 /app 挂载，只保留根路径挂载
+async def read_root():
+    return {"message": "前端页面未构建，请运行 npm run build", "error": "STATIC_DIR_NOT_FOUND"}
 
-# 最后挂载静态文件服务（只挂载一次）
-if os.path.exists(STATIC_DIR):
-    print(f"DEBUG: 准备挂载静态文件服务到根路径")
-    print(f"DEBUG: StaticFiles 配置: directory={STATIC_DIR}, html=True")
-    app.mount("/", StaticFiles(directory=STATIC_DIR, html=True), name="static")
-    print("DEBUG: 静态文件服务已挂载到根路径 /")
-    print(f"=" * 60)
-else:
-    print(f"警告: 静态文件目录不存在: {STATIC_DIR}")
-    print(f"DEBUG: 当前工作目录: {os.getcwd()}")
-    print(f"DEBUG: 工作目录内容: {os.listdir(os.getcwd())}")
-    print(f"=" * 60)
-    
-    # 如果静态文件不存在，定义根路径路由
-    @app.get("/")
-    async def read_root():
-        return {"message": "前端页面未构建，请运行 npm run build", "error": "STATIC_DIR_NOT_FOUND"}
+def mount_static_files():
+    """
+    在lifespan中挂载静态文件服务（导入模块时不访问磁盘），挂载在所有API路由之后，只挂载一次
+    静态文件不存在时改为定义根路径路由
+    """
+    if any(getattr(route, 'name', None) in ('static', 'read_root') for route in app.routes):
+        return
+    if os.path.exists(STATIC_DIR):
+        log_static_dir()
+        app.mount("/", StaticFiles(directory=STATIC_DIR, html=True), name="static")
+        logger.debug("静态文件服务已挂载到根路径 /: %s", STATIC_DIR)
+    else:
+        logger.warning("静态文件目录不存在: %s（当前工作目录: %s）", STATIC_DIR, os.getcwd())
+        app.add_api_route("/", read_root, methods=["GET"])
+
+STARTUP.mark('imported')
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # 多个worker时uvicorn需要以导入字符串的形式加载应用
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=WEB_CONCURRENCY, timeout_graceful_shutdown=5)
\ No newline at end of file
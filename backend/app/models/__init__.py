@@ -1,3 +1,4 @@
-from .data import TableData, FileData, TableUpdate, SaveRequest, SaveResponse
+from .data import TableData, FileData, TableUpdate, SaveRequest, SaveResponse, ProgressDelta, DeltaSaveRequest, CellCondition, BulkProgressOperation, BulkProgressRequest, BulkProgressResponse
+from .compact import CompactTable, CompactFile
 
-__all__ = ['TableData', 'FileData', 'TableUpdate', 'SaveRequest', 'SaveResponse']
\ No newline at end of file
+__all__ = ['TableData', 'FileData', 'TableUpdate', 'SaveRequest', 'SaveResponse', 'ProgressDelta', 'DeltaSaveRequest', 'CellCondition', 'BulkProgressOperation', 'BulkProgressRequest', 'BulkProgressResponse', 'CompactTable', 'CompactFile']
\ No newline at end of file
@@ -0,0 +1,188 @@
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .data import TableData, FileData
+
+PROGRESS_CHECKED = '[x]'
+PROGRESS_UNCHECKED = '[ ]'
+
+def get_bit(bits: bytearray, index: int) -> bool:
+    return bool(bits[index >> 3] >> (index & 7) & 1)
+
+def set_bit(bits: bytearray, index: int, value: bool) -> None:
+    if value:
+        bits[index >> 3] |= 1 << (index & 7)
+    else:
+        bits[index >> 3] &= ~(1 << (index & 7)) & 0xff
+
+def count_bits(bits: bytearray, start: int = 0, end: Optional[int] = None) -> int:
+    """
+    统计位图中 [start, end) 范围内为1的位数
+    """
+    if end is None:
+        end = len(bits) * 8
+    if start == 0 and end == len(bits) * 8:
+        return int.from_bytes(bits, 'little').bit_count()
+    return sum(get_bit(bits, i) for i in range(start, end))
+
+def _codes_typecode(pool_size: int) -> str:
+    # 按去重后的字符串数量选择最小的整数宽度
+    if pool_size <= 1 << 8:
+        return 'B'
+    if pool_size <= 1 << 16:
+        return 'H'
+    return 'I'
+
+class CompactTable:
+    """
+    常驻内存的紧凑表格，与TableData表示相同的数据：
+    - header / values: 表头和去重后的单元格字符串（sys.intern，不同表格间共享）
+    - columns: 每个非进度列一个整数数组，按数据行存放values中的下标
+    - separators: 分隔行在rows中的位置（升序）
+    - progress: 数据行的完成标记位图（第d位对应第d个数据行）
+    - line_offsets: 源文件中每隔ROW_OFFSET_STRIDE行的起始字节，末尾附加表格的结束字节，按需直接从文件读取一段行
+    - source_columns: 源文件中表头的列数（不含自动添加的进度列）
+    数据行的最后一列总是进度列（[ ]或[x]）；只有在没有数据行时表头才可能不含进度列
+    只在API边界通过to_dict()/to_table_data()还原为原有的结构
+    """
+    __slots__ = ('title', 'header', 'values', 'columns', 'separators', 'progress', 'row_count',
+                 'line_offsets', 'source_columns')
+
+    def __init__(self, title: str, header: List[str], rows: List[List[str]],
+                 line_offsets: Optional[array] = None, source_columns: Optional[int] = None):
+        """
+        rows为process_table_data处理后的行（空列表表示分隔行）
+        """
+        self.title = sys.intern(title)
+        self.header = tuple(sys.intern(h) for h in header)
+        self.row_count = len(rows)
+        self.line_offsets = line_offsets
+        self.source_columns = len(header) if source_columns is None else source_columns
+        self.separators = array('I')
+
+        pool: Dict[str, int] = {}
+        codes: List[List[int]] = [[] for _ in range(len(header) - 1)]
+        checked: List[bool] = []
+        for i, row in enumerate(rows):
+            if not row:
+                self.separators.append(i)
+                continue
+            for column, cell in zip(codes, row):
+                code = pool.get(cell)
+                if code is None:
+                    code = pool[cell] = len(pool)
+                column.append(code)
+            checked.append(row[-1] == PROGRESS_CHECKED)
+
+        typecode = _codes_typecode(len(pool))
+        self.values = tuple(sys.intern(value) for value in pool)
+        self.columns = tuple(array(typecode, column) for column in codes) if checked else ()
+        self.progress = bytearray((len(checked) + 7) // 8)
+        for d, is_checked in enumerate(checked):
+            if is_checked:
+                set_bit(self.progress, d, True)
+
+    @property
+    def data_row_count(self) -> int:
+        return self.row_count - len(self.separators)
+
+    def checked_count(self) -> int:
+        return count_bits(self.progress)
+
+    def is_separator(self, row_index: int) -> bool:
+        position = bisect_left(self.separators, row_index)
+        return position < len(self.separators) and self.separators[position] == row_index
+
+    def data_index(self, row_index: int) -> Optional[int]:
+        """
+        rows中的下标 -> 数据行下标，分隔行返回None
+        """
+        position = bisect_left(self.separators, row_index)
+        if position < len(self.separators) and self.separators[position] == row_index:
+            return None
+        return row_index - position
+
+    def iter_data_rows(self) -> Iterator[Tuple[int, int]]:
+        """
+        依次返回每个数据行的 (rows中的下标, 数据行下标)
+        """
+        separators = self.separators
+        position = 0
+        for row_index in range(self.row_count):
+            if position < len(separators) and separators[position] == row_index:
+                position += 1
+            else:
+                yield row_index, row_index - position
+
+    def is_checked(self, data_index: int) -> bool:
+        return get_bit(self.progress, data_index)
+
+    def data_cells(self, data_index: int) -> List[str]:
+        """
+        数据行中除进度列以外的单元格
+        """
+        values = self.values
+        return [values[column[data_index]] for column in self.columns]
+
+    def row(self, row_index: int) -> List[str]:
+        """
+        还原单行（与TableData.rows中的元素相同，分隔行为空列表）
+        """
+        data_index = self.data_index(row_index)
+        if data_index is None:
+            return []
+        return self._data_row(data_index)
+
+    def rows(self, start: int = 0, end: Optional[int] = None) -> List[List[str]]:
+        """
+        还原 [start, end) 范围内的行
+        """
+        end = self.row_count if end is None else min(end, self.row_count)
+        return list(self._iter_rows(max(start, 0), end))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'title': self.title, 'header': list(self.header), 'rows': self.rows()}
+
+    def to_table_data(self) -> TableData:
+        return TableData(**self.to_dict())
+
+    def _data_row(self, data_index: int) -> List[str]:
+        row = self.data_cells(data_index)
+        row.append(PROGRESS_CHECKED if get_bit(self.progress, data_index) else PROGRESS_UNCHECKED)
+        return row
+
+    def _iter_rows(self, start: int, end: int) -> Iterator[List[str]]:
+        separators = self.separators
+        position = bisect_left(separators, start)
+        for row_index in range(start, end):
+            if position < len(separators) and separators[position] == row_index:
+                position += 1
+                yield []
+            else:
+                yield self._data_row(row_index - position)
+
+class CompactFile:
+    """
+    常驻内存的文件解析结果，与FileData对应
+    """
+    __slots__ = ('filePath', 'version', 'tables')
+
+    def __init__(self, filePath: str, tables: List[CompactTable], version: Optional[str] = None):
+        self.filePath = filePath
+        self.version = version
+        self.tables: Tuple[CompactTable, ...] = tuple(tables)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'filePath': self.filePath,
+            'tables': [table.to_dict() for table in self.tables],
+            'version': self.version
+        }
+
+    def to_file_data(self) -> FileData:
+        return FileData(
+            filePath=self.filePath,
+            tables=[table.to_table_data() for table in self.tables],
+            version=self.version
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Dict, Optional, Union
 
 class TableData(BaseModel):
     title: str
@@ -9,15 +9,56 @@ class TableData(BaseModel):
 class FileData(BaseModel):
     filePath: str
     tables: List[TableData]
+    version: Optional[str] = None
 
 class TableUpdate(BaseModel):
     filePath: str
     tableIndex: int
     newRows: List[List[str]]
+    baseVersion: Optional[str] = None
 
 class SaveRequest(BaseModel):
     updates: List[TableUpdate]
 
+class ProgressDelta(BaseModel):
+    filePath: str
+    tableIndex: int
+    rowIndex: int
+    checked: bool
+    baseVersion: Optional[str] = None
+    # 该行除进度列以外的单元格: 写入时与文件中的行核对，行已移动时按内容对应到新行号，找不到时丢弃该增量
+    rowCells: Optional[List[str]] = None
+
+class DeltaSaveRequest(BaseModel):
+    deltas: List[ProgressDelta]
+
 class SaveResponse(BaseModel):
     success: bool
-    message: str
\ No newline at end of file
+    message: str
+    versions: Dict[str, str] = {}
+    # /api/save: 从请求到达到改写完成的毫秒数（包括排队和合并）
+    commitMs: Optional[float] = None
+
+class CellCondition(BaseModel):
+    column: Union[int, str]
+    equals: Optional[str] = None
+    contains: Optional[str] = None
+    regex: Optional[str] = None
+
+class BulkProgressOperation(BaseModel):
+    filePath: str
+    checked: bool
+    tableIndex: Optional[int] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+    section: Optional[int] = None
+    where: List[CellCondition] = []
+    baseVersion: Optional[str] = None
+
+class BulkProgressRequest(BaseModel):
+    operations: List[BulkProgressOperation]
+
+class BulkProgressResponse(SaveResponse):
+    matched: int = 0
+    changed: int = 0
+    affected: Dict[str, Dict[str, int]] = {}
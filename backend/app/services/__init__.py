@@ -1,4 +1,24 @@
-from .parser import parse_markdown_file, scan_directory
-from .writer import write_updates_to_file, write_multiple_updates
+from .parser import parse_markdown_file, parse_markdown_file_with_index, build_table_index, scan_directory, resolve_workers, read_table_rows
+from .writer import write_updates_to_file, write_multiple_updates, apply_progress_deltas, apply_bulk_progress, compile_conditions, resolve_data_path
+from .cache import ParseCache, file_signature
+from .watcher import LiveIndex, DirectoryWatcher, file_listing
+from .file_tree import FileTreeCache
+from .stats import ProgressStats
+from .search import SearchIndex
+from .responses import ResponseCache, EncodedBody, choose_encoding, etag_matches
+from .events import EventBroker
+from .journal import SaveJournal
+from .progress_store import ProgressStore
+from .snapshot import ParseSnapshot
+from .instrumentation import METRICS, PHASE_SECONDS, SamplingProfiler, StartupTimer, configure_logging, timed
+from .executor import BlockingExecutor, Overloaded
+from .write_engine import WriteEngine, WriteConflict, WRITE_ENGINE, file_version
+from .cluster import ProcessLock, LeaderLock, InvalidationBus
+from .save_scheduler import SaveScheduler, merge_table_updates
 
-__all__ = ['parse_markdown_file', 'scan_directory', 'write_updates_to_file', 'write_multiple_updates']
\ No newline at end of file
+__all__ = ['parse_markdown_file', 'parse_markdown_file_with_index', 'build_table_index', 'scan_directory', 'resolve_workers', 'read_table_rows', 'write_updates_to_file', 'write_multiple_updates', 'apply_progress_deltas', 'apply_bulk_progress', 'compile_conditions', 'resolve_data_path',
+           'ParseCache', 'file_signature', 'LiveIndex', 'DirectoryWatcher', 'file_listing', 'FileTreeCache', 'ProgressStats', 'SearchIndex', 'ResponseCache', 'EncodedBody', 'choose_encoding', 'etag_matches', 'EventBroker', 'SaveJournal', 'ProgressStore', 'ParseSnapshot',
+           'METRICS', 'PHASE_SECONDS', 'SamplingProfiler', 'StartupTimer', 'configure_logging', 'timed',
+           'WriteEngine', 'WriteConflict', 'WRITE_ENGINE', 'file_version',
+           'BlockingExecutor', 'Overloaded', 'ProcessLock', 'LeaderLock', 'InvalidationBus',
+           'SaveScheduler', 'merge_table_updates']
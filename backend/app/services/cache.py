@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from ..models import CompactFile
+
+# 文件签名: (mtime_ns, size, inode)，任一变化都视为文件已修改
+FileSignature = Tuple[int, int, int]
+
+def file_signature(stat_result: os.stat_result) -> FileSignature:
+    """
+    根据stat结果生成文件签名
+    """
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+class ParseCache:
+    """
+    进程内的解析结果缓存，按文件路径 + 签名缓存解析结果（CompactFile）
+    使用LRU淘汰，同时限制条目数和源文件总字节数，保证内存有界
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[FileSignature, CompactFile]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_scan = {'hits': 0, 'misses': 0}
+
+    def get(self, file_path: str, signature: FileSignature) -> Optional[CompactFile]:
+        """
+        查找缓存，签名不一致时视为未命中并丢弃旧条目
+        """
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(file_path)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(file_path)
+            self.misses += 1
+            return None
+
+    def put(self, file_path: str, signature: FileSignature, file_data: CompactFile) -> None:
+        with self._lock:
+            if file_path in self._entries:
+                self._remove(file_path)
+            self._entries[file_path] = (signature, file_data)
+            self._total_bytes += signature[1]
+            self._evict()
+
+    def discard(self, file_path: str) -> None:
+        with self._lock:
+            if file_path in self._entries:
+                self._remove(file_path)
+
+    def prune(self, live_paths: Iterable[str]) -> None:
+        """
+        删除已不存在于磁盘上的文件的缓存条目
+        """
+        live = set(live_paths)
+        with self._lock:
+            for file_path in [p for p in self._entries if p not in live]:
+                self._remove(file_path)
+
+    def record_scan(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.last_scan = {'hits': hits, 'misses': misses}
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'bytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'lastScan': dict(self.last_scan),
+            }
+
+    def _remove(self, file_path: str) -> None:
+        signature, _ = self._entries.pop(file_path)
+        self._total_bytes -= signature[1]
+
+    def _evict(self) -> None:
+        # 至少保留最新插入的条目，避免单个超大文件导致缓存失效
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
@@ -0,0 +1,264 @@
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from ..models import CompactFile
+from .responses import encode_json
+from .watcher import LiveIndex
+
+logger = logging.getLogger(__name__)
+
+class ProcessLock:
+    """
+    进程间的按键互斥锁：所有键共用一个锁文件，每个键锁定其中按哈希确定的一个字节（fcntl.lockf）
+    同一进程内的互斥由调用方保证（WriteEngine的按文件锁），这里只负责不同进程之间
+    键的哈希取62位，不同键落在同一字节的概率可以忽略
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._open_lock = threading.Lock()
+        self.acquired = 0
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        fd = self._open()
+        offset = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big') >> 2
+        fcntl.lockf(fd, fcntl.LOCK_EX, 1, offset, os.SEEK_SET)
+        try:
+            self.acquired += 1
+            yield
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset, os.SEEK_SET)
+
+    def _open(self) -> int:
+        # POSIX记录锁在进程关闭该文件的任一描述符时全部释放，因此整个进程只打开一次且不关闭
+        if self._fd is None:
+            with self._open_lock:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+class LeaderLock:
+    """
+    多进程中的主进程选举：持有锁文件上flock排他锁的进程为主进程，进程退出时锁自动释放
+    其他进程可在后台线程中等待，主进程退出后由其中一个接替
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.is_leader = False
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        self._fd = self._fd if self._fd is not None else os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.is_leader = True
+        return True
+
+    def wait(self, on_acquired: Callable[[], None]) -> None:
+        """
+        在后台线程中阻塞等待锁，获得后调用on_acquired
+        """
+        def run():
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self.is_leader = True
+            logger.info("主进程已退出，本进程 %d 接替为主进程", os.getpid())
+            on_acquired()
+        threading.Thread(target=run, name="crt-leader-wait", daemon=True).start()
+
+class InvalidationBus:
+    """
+    多个worker进程之间的索引失效广播，基于共享目录中的只追加日志：
+    - 本进程的索引变化（文件监听器发现的修改、本进程的写入）作为一条记录追加到日志
+      {"pid", "paths": [[相对路径, 版本号或null], ...]} 或全量重建时 {"pid", "reset": true}
+    - 后台线程轮询日志的新增内容，重新加载其他进程报告的文件（版本号与本地一致时跳过），reset时与磁盘全量比对
+    - 应用其他进程的记录引起的索引变化不会再次广播
+    - open()之后才开始广播，start()之后才读取其他进程的记录
+    - 日志超过max_bytes时由主进程轮换（写入新文件后原子替换），追加和轮换之间用flock互斥，
+      读取方读完旧文件的剩余内容后再切换到新文件，不会遗漏记录
+    """
+
+    def __init__(self, path: str, index: LiveIndex, poll_interval: float = 0.1, max_bytes: int = 1024 * 1024):
+        self.path = path
+        self.index = index
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self.pid: Optional[int] = None
+        self.rotate = False
+        self._started = False
+        self._append_fd: Optional[int] = None
+        self._append_lock = threading.Lock()
+        self._read_fd: Optional[int] = None
+        self._offset = 0
+        self._buffer = b''
+        self._applying = threading.local()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.applied = 0
+        self.skipped = 0
+        self.resyncs = 0
+        self.rotations = 0
+
+    def open(self) -> None:
+        """
+        打开日志并从当前末尾开始读取；应在载入索引之前调用，载入期间其他进程的记录不会遗漏
+        """
+        self.pid = os.getpid()
+        self._read_fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o644)
+        self._offset = os.fstat(self._read_fd).st_size
+
+    def start(self) -> None:
+        self._started = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="crt-invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def on_index_change(self, changes: Dict[str, Optional[CompactFile]], reset: bool) -> None:
+        """
+        索引监听器：广播本进程产生的变化
+        """
+        if getattr(self._applying, 'active', False) or self.pid is None:
+            return
+        if reset:
+            # 启动时的全量载入只反映磁盘上已有的内容，其他进程会自行与磁盘同步，不需要广播
+            if self._started:
+                self.publish({'pid': self.pid, 'reset': True})
+        elif changes:
+            self.publish({
+                'pid': self.pid,
+                'paths': [[file_path, file_data.version if file_data is not None else None]
+                          for file_path, file_data in changes.items()]
+            })
+
+    def publish(self, record: Dict[str, Any]) -> None:
+        line = encode_json(record) + b'\n'
+        with self._append_lock:
+            for _ in range(3):
+                fd = self._append_fd
+                if fd is None:
+                    fd = self._append_fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                try:
+                    # 日志已被轮换时改为追加到新文件
+                    if _same_file(fd, self.path):
+                        os.write(fd, line)
+                        self.published += 1
+                        return
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+                self._append_fd = None
+            logger.warning("索引失效日志反复被轮换，放弃广播: %s", self.path)
+
+    def poll(self) -> int:
+        """
+        读取并应用日志中的新记录，返回应用的记录数
+        """
+        applied = 0
+        while True:
+            applied += self._read_available()
+            if _same_file(self._read_fd, self.path):
+                break
+            # 已轮换: 旧文件已读完，切换到新文件
+            os.close(self._read_fd)
+            self._read_fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o644)
+            self._offset = 0
+            self._buffer = b''
+        if self.rotate and self._offset > self.max_bytes:
+            self._rotate()
+        return applied
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pid': self.pid,
+            'offset': self._offset,
+            'published': self.published,
+            'applied': self.applied,
+            'skipped': self.skipped,
+            'resyncs': self.resyncs,
+            'rotations': self.rotations,
+        }
+
+    def _read_available(self) -> int:
+        applied = 0
+        while True:
+            chunk = os.pread(self._read_fd, 64 * 1024, self._offset)
+            if not chunk:
+                return applied
+            self._offset += len(chunk)
+            lines = (self._buffer + chunk).split(b'\n')
+            self._buffer = lines.pop()
+            for line in lines:
+                if line:
+                    applied += self._apply(line)
+
+    def _apply(self, line: bytes) -> int:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            logger.warning("忽略无法解析的索引失效记录: %r", line[:200])
+            return 0
+        if record.get('pid') == self.pid:
+            return 0
+        self._applying.active = True
+        try:
+            if record.get('reset'):
+                self.resyncs += 1
+                self.index.sync()
+            else:
+                for file_path, version in record.get('paths', []):
+                    current = self.index.get(file_path)
+                    if version is not None and current is not None and current.version == version:
+                        self.skipped += 1
+                        continue
+                    self.index.update_file(os.path.join(self.index.root_dir, file_path))
+        finally:
+            self._applying.active = False
+        self.applied += 1
+        return 1
+
+    def _rotate(self) -> None:
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if not _same_file(fd, self.path):
+                return
+            # 加锁后其他进程无法追加，读完剩余的记录再替换
+            self._read_available()
+            tmp_path = f"{self.path}.{self.pid}.tmp"
+            os.close(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
+            os.replace(tmp_path, self.path)
+            self.rotations += 1
+        finally:
+            os.close(fd)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning("读取索引失效日志失败: %s", e)
+
+def _same_file(fd: int, path: str) -> bool:
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
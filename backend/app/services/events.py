@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from ..models import CompactFile, ProgressDelta
+from .responses import encode_json
+from .watcher import table_summary
+
+class _Subscriber:
+    __slots__ = ('loop', 'queue')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, event: bytes) -> None:
+        # 在订阅者的事件循环中执行；处理不过来时丢弃积压的事件，改为通知客户端重新同步
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event(None, 'resync', {'reason': 'overflow'}))
+
+def format_event(event_id: Optional[int], event_type: str, data: Any) -> bytes:
+    """
+    编码为一条Server-Sent Events消息
+    """
+    lines = [] if event_id is None else [f"id: {event_id}".encode('ascii')]
+    lines.append(f"event: {event_type}".encode('ascii'))
+    lines.append(b'data: ' + encode_json(data))
+    return b'\n'.join(lines) + b'\n\n'
+
+class EventBroker:
+    """
+    文件变化和保存确认的广播（Server-Sent Events）
+    - publish() 可在任意线程中调用，事件通过call_soon_threadsafe投递到各订阅者的队列
+    - 保留最近的事件，客户端断线重连时按Last-Event-ID补发；已超出保留范围时发送resync
+    """
+
+    def __init__(self, history: int = 256, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._subscribers: Set[_Subscriber] = set()
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event_type: str, data: Any) -> int:
+        with self._lock:
+            self._last_id += 1
+            event_id = self._last_id
+            event = format_event(event_id, event_type, data)
+            self._history.append((event_id, event))
+            subscribers = list(self._subscribers)
+            self.published += 1
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(subscriber)
+                self.dropped += 1
+        return event_id
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop,
+                  last_event_id: Optional[int] = None) -> Tuple[_Subscriber, List[bytes]]:
+        """
+        注册订阅者，返回 (订阅者, 需要先补发的事件)
+        """
+        subscriber = _Subscriber(loop, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            backlog = []
+            if last_event_id is not None and last_event_id < self._last_id:
+                oldest = self._history[0][0] if self._history else self._last_id + 1
+                if last_event_id + 1 < oldest:
+                    backlog = [format_event(None, 'resync', {'reason': 'expired'})]
+                else:
+                    backlog = [event for event_id, event in self._history if event_id > last_event_id]
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def on_index_change(self, changes: Dict[str, Optional[CompactFile]], reset: bool) -> None:
+        """
+        索引监听器：每个变化的文件发布一条file事件（内容与/api/files中的条目相同）
+        全量重建时只发布一条resync，由客户端重新加载文件列表
+        """
+        if reset:
+            self.publish('resync', {'reason': 'rebuild'})
+            return
+        for file_path, file_data in changes.items():
+            if file_data is None:
+                self.publish('file', {'filePath': file_path, 'removed': True})
+            else:
+                self.publish('file', {
+                    'filePath': file_path,
+                    'version': file_data.version,
+                    'tables': [table_summary(t) for t in file_data.tables]
+                })
+
+    def on_progress_saved(self, deltas: List[ProgressDelta], results: Dict[str, Any]) -> None:
+        """
+        进度增量写入后，按文件发布progress事件（逐行确认），先于随后的file事件到达客户端
+        """
+        updated = set(results['updated_files'])
+        rows: Dict[str, List[Dict[str, Any]]] = {}
+        for delta in deltas:
+            if delta.filePath in updated:
+                rows.setdefault(delta.filePath, []).append(
+                    {'tableIndex': delta.tableIndex, 'rowIndex': delta.rowIndex, 'checked': delta.checked})
+        for file_path, file_rows in rows.items():
+            self.publish('progress', {
+                'filePath': file_path,
+                'version': results['versions'].get(file_path),
+                'rows': file_rows
+            })
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'lastEventId': self._last_id,
+                'published': self.published,
+                'dropped': self.dropped,
+            }
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+class Overloaded(Exception):
+    """
+    排队任务已达上限，调用方应稍后重试
+    """
+
+class BlockingExecutor:
+    """
+    在有界线程池中执行阻塞操作（扫描、解析、写入），避免阻塞事件循环
+    - max_workers: 同时执行的任务数
+    - max_queue: 等待执行的任务上限，超过时立即拒绝（背压）
+    同时记录排队深度、等待时间和执行时间
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64, name: str = 'crt-worker'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_wait = 0.0
+        self._max_run = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"服务繁忙，排队任务已达上限 ({self.max_queue})")
+            self._in_flight += 1
+        submitted_at = time.perf_counter()
+
+        def call():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                finished_at = time.perf_counter()
+                self._record(started_at - submitted_at, finished_at - started_at)
+
+        try:
+            future = self._pool.submit(call)
+        except RuntimeError:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # 计数在工作线程中递减，请求被取消时任务仍会占用名额直到执行完毕
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            completed = self.completed
+            return {
+                'workers': self.max_workers,
+                'queueLimit': self.max_queue,
+                'running': self._running,
+                'queued': self._in_flight - self._running,
+                'completed': completed,
+                'rejected': self.rejected,
+                'avgWaitMs': round(self._total_wait / completed * 1000, 3) if completed else 0.0,
+                'avgRunMs': round(self._total_run / completed * 1000, 3) if completed else 0.0,
+                'maxWaitMs': round(self._max_wait * 1000, 3),
+                'maxRunMs': round(self._max_run * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def _record(self, wait: float, run: float) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._running -= 1
+            self.completed += 1
+            self._total_wait += wait
+            self._total_run += run
+            self._max_wait = max(self._max_wait, wait)
+            self._max_run = max(self._max_run, run)
@@ -0,0 +1,109 @@
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .parser import is_excluded_dir, is_markdown_file
+
+class FileTreeCache:
+    """
+    只基于目录元数据（os.scandir）构建文件树，不读取文件内容
+    每个目录的列表按目录mtime缓存；整棵树在所有目录mtime和文件信息版本都未变化时直接复用
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._listings: Dict[str, Tuple[int, List[str], List[str]]] = {}  # 目录 -> (mtime_ns, 子目录, md文件)
+        self._tree: Optional[List[Dict[str, Any]]] = None
+        self._tree_key = None
+        self._lock = threading.Lock()
+
+    def build(self, file_info: Callable[[str], Optional[Dict[str, int]]], info_version: int) -> List[Dict[str, Any]]:
+        """
+        返回嵌套的目录/文件节点列表
+        file_info(相对路径) 返回文件的表格和进度统计，返回None的文件（没有表格）不显示
+        """
+        with self._lock:
+            mtimes = []
+            self._refresh(self.root_dir, mtimes)
+            key = (info_version, tuple(mtimes))
+            if self._tree is None or key != self._tree_key:
+                self._tree = self._build_dir(self.root_dir, '', file_info)['children']
+                self._tree_key = key
+            return self._tree
+
+    def _listdir(self, dir_path: str) -> Tuple[List[str], List[str]]:
+        mtime = os.stat(dir_path).st_mtime_ns
+        cached = self._listings.get(dir_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        subdirs = []
+        files = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_excluded_dir(entry.name):
+                        subdirs.append(entry.name)
+                elif is_markdown_file(entry.name):
+                    files.append(entry.name)
+        subdirs.sort()
+        files.sort()
+        self._listings[dir_path] = (mtime, subdirs, files)
+        return subdirs, files
+
+    def _refresh(self, dir_path: str, mtimes: List[Tuple[str, int]]) -> None:
+        """
+        递归刷新目录列表，并收集所有目录的mtime作为整棵树的缓存键
+        """
+        try:
+            subdirs, _ = self._listdir(dir_path)
+        except OSError:
+            self._listings.pop(dir_path, None)
+            return
+        mtimes.append((dir_path, self._listings[dir_path][0]))
+        for name in subdirs:
+            self._refresh(os.path.join(dir_path, name), mtimes)
+
+    def _build_dir(self, dir_path: str, rel_path: str,
+                   file_info: Callable[[str], Optional[Dict[str, int]]]) -> Dict[str, Any]:
+        node = {
+            'name': os.path.basename(dir_path),
+            'path': rel_path,
+            'type': 'directory',
+            'children': [],
+            'tableCount': 0,
+            'dataRows': 0,
+            'checkedRows': 0
+        }
+        listing = self._listings.get(dir_path)
+        if listing is None:
+            return node
+        _, subdirs, files = listing
+
+        for name in subdirs:
+            child = self._build_dir(os.path.join(dir_path, name), f"{rel_path}/{name}" if rel_path else name, file_info)
+            if child['children']:  # 不显示没有可用文件的目录
+                node['children'].append(child)
+                self._accumulate(node, child)
+
+        for name in files:
+            child_path = f"{rel_path}/{name}" if rel_path else name
+            info = file_info(child_path)
+            if not info:
+                continue
+            child = {
+                'name': name,
+                'path': child_path,
+                'type': 'file',
+                'hasTables': True,
+                'tableCount': info['tableCount'],
+                'dataRows': info['dataRows'],
+                'checkedRows': info['checkedRows']
+            }
+            node['children'].append(child)
+            self._accumulate(node, child)
+        return node
+
+    @staticmethod
+    def _accumulate(node: Dict[str, Any], child: Dict[str, Any]) -> None:
+        for key in ('tableCount', 'dataRows', 'checkedRows'):
+            node[key] += child[key]
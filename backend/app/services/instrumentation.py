@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter as _StackCounter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# LogRecord自带的属性，其余属性（logging的extra参数）作为结构化字段输出
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志输出为一行JSON: {"ts", "level", "logger", "msg", ...extra中的字段}
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """
+    配置根日志：级别由LOG_LEVEL（默认INFO）、格式由LOG_FORMAT（text/json，默认text）指定
+    每个请求的日志为DEBUG级别，默认不输出
+    """
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+# 指标（Prometheus文本格式）
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """
+    累积直方图，每组标签值一组桶计数、总和和次数
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # 标签值 -> [各桶计数..., 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *label_values)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """
+        每组标签值的次数和总耗时（供基准测试等读取）
+        """
+        with self._lock:
+            return {labels: {'count': series[-1], 'sum': series[-2]} for labels, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class _Gauge:
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            lines.append(f"{self.name} {_format_value(self.read())}")
+        except Exception as e:
+            logger.warning("读取指标失败 %s: %s", self.name, e)
+        return lines
+
+class MetricsRegistry:
+    """
+    进程内的指标注册表，render()输出Prometheus文本格式
+    计数器和直方图在观测时更新；gauge在输出时调用回调读取当前值
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        with self._lock:
+            self._metrics[name] = _Gauge(name, help_text, read)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+# 进程内共享的默认注册表，解析、写入等模块级函数的阶段耗时记录在这里
+METRICS = MetricsRegistry()
+
+PHASE_SECONDS = METRICS.histogram(
+    'crt_phase_seconds',
+    "Time spent per phase: walk/parse (directory scan), read/serialize/write (writer), encode (responses)",
+    ('phase',)
+)
+
+def timed(phase: str):
+    """
+    记录一个阶段的耗时: with timed('parse'): ...
+    """
+    return PHASE_SECONDS.time(phase)
+
+# 启动耗时
+def process_start_time() -> Optional[float]:
+    """
+    当前进程的启动时刻（Unix时间戳），由/proc计算；不支持的平台返回None
+    """
+    try:
+        with open('/proc/self/stat', 'rb') as f:
+            # 第2个字段（进程名）可能包含空格，从最后一个')'之后开始计数，starttime为第22个字段
+            fields = f.read().rsplit(b')', 1)[1].split()
+        with open('/proc/stat', 'rb') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith(b'btime'))
+        return boot_time + int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+class StartupTimer:
+    """
+    启动耗时分解：
+    - phases: 各启动阶段的耗时（秒）
+    - marks: 关键时刻距进程启动的秒数（无法获取进程启动时刻时，距创建本对象的秒数）
+    创建时不访问磁盘，进程启动时刻在第一次读取统计时才从/proc计算
+    """
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.phases: Dict[str, float] = {}
+        self._marks: Dict[str, float] = {}
+        self._origin: Optional[float] = None
+        self.process_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round(time.perf_counter() - started_at, 4)
+
+    def mark(self, name: str) -> None:
+        with self._lock:
+            self._marks[name] = time.time()
+
+    @property
+    def marks(self) -> Dict[str, float]:
+        with self._lock:
+            if self._origin is None:
+                self.process_started_at = process_start_time()
+                self._origin = self.process_started_at or self.created_at
+            return {name: round(at - self._origin, 4) for name, at in self._marks.items()}
+
+    def stats(self) -> Dict[str, object]:
+        marks = self.marks
+        with self._lock:
+            return {
+                'fromProcessStart': self.process_started_at is not None,
+                'phases': dict(self.phases),
+                'marks': marks,
+            }
+
+# 采样分析器
+class SamplingProfiler:
+    """
+    按固定间隔采样所有线程的调用栈（sys._current_frames），统计折叠栈出现次数
+    输出为折叠栈格式（每行 "帧;帧;帧 次数"），可直接用flamegraph.pl或speedscope查看
+    默认不启用；采样线程只读取栈帧，不影响被采样线程的执行
+    """
+
+    def __init__(self, interval: float = 0.01, max_stacks: int = 10000, max_depth: int = 64):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.samples = 0
+        self.dropped = 0
+        self._stacks: _StackCounter = _StackCounter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="crt-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self, reset: bool = False) -> str:
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+            if reset:
+                self._stacks.clear()
+                self.samples = 0
+                self.dropped = 0
+        return '\n'.join(lines) + '\n'
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(names)))
+            with self._lock:
+                for stack in stacks:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    else:
+                        self.dropped += 1
+                self.samples += 1
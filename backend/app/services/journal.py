@@ -0,0 +1,360 @@
+import os
+import json
+import fcntl
+import itertools
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from ..models import ProgressDelta
+from .responses import encode_json
+
+logger = logging.getLogger(__name__)
+
+# 写入函数: 接收合并后的增量，返回与apply_progress_deltas相同格式的结果
+DeltaWriter = Callable[[List[ProgressDelta]], Dict[str, Any]]
+
+class SaveJournal:
+    """
+    进度增量的预写日志（write-behind）：
+    - append() 把增量追加到日志文件并fsync后即返回，不等待Markdown文件被改写
+    - 并发的append共用一次fsync（组提交）
+    - 后台线程定期把待写入的增量按文件合并（同一行以最后一次为准），一次改写一个文件
+    - 启动时重放日志中尚未写入的增量；全部写入后截断日志
+    - 每个进程用flock独占一个日志文件（path，被占用时依次为 path.1、path.2 ...）
+    - 多个进程时，flush() 持有进程间的写入锁，先把其他进程日志中的记录转入自己的日志并清空原文件
+      （已退出的进程的日志转入后删除），再写入；同步写入之前调用flush()，所有进程中更早的增量都已生效
+    - 写入的内容以日志文件为准：记录被其他进程转走后，本进程不会再写入它们
+    日志每行一条记录: {"seq": 序号, "t": 追加时间, "deltas": [[filePath, tableIndex, rowIndex, checked, rowCells], ...]}
+    同一行在不同进程的日志中都有记录时，以追加时间最晚的为准
+    - rowCells是追加时该行除进度列以外的单元格（由调用方按常驻索引填入）；写入时与文件中的行核对，
+      文件在此期间被外部修改（或重启后重放）时按内容对应到新行号，找不到时丢弃并记录警告（见writer.locate_delta）
+    """
+
+    def __init__(self, path: str, write: DeltaWriter, flush_interval: float = 0.5):
+        self.base_path = path
+        self.path = path
+        self.write = write
+        self.flush_interval = flush_interval
+        self._fd: Optional[int] = None
+        # 进程间的flock锁（path.lock、path.append-lock）:
+        # 写入锁在整个flush期间独占，同一时刻只有一个进程在写入日志中的增量；
+        # 追加锁由append共享持有，转移其他进程的日志时独占，转移期间不会有记录写入一半
+        # 用flock而不是lockf: lockf的死锁检测以进程为单位，不同线程分别持有和等待两把锁时会误报
+        self._flush_fd: Optional[int] = None
+        self._append_fd: Optional[int] = None
+        # 相对路径 -> {(tableIndex, rowIndex): checked}
+        self._pending: Dict[str, Dict[Tuple[int, int], bool]] = {}
+        self._pending_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self._synced_seq = 0
+        self._flushed_seq = 0
+        self.replayed = 0
+        self.adopted = 0
+        self.flushes = 0
+        self.flushed_deltas = 0
+        self.failed_deltas = 0
+        self.remapped = 0
+        self.dropped = 0
+        self.last_flush_seconds = 0.0
+
+    def start(self) -> None:
+        """
+        打开日志，载入上次未写入的增量，并启动后台写入线程
+        """
+        directory = os.path.dirname(self.base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._flush_fd = os.open(f"{self.base_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._append_fd = os.open(f"{self.base_path}.append-lock", os.O_RDWR | os.O_CREAT, 0o644)
+        with _flock(self._flush_fd, fcntl.LOCK_EX):
+            # 重放时可能截断自己的日志，不能与其他进程的转移交错
+            self._fd, self.path = self._claim()
+            self._replay()
+            with self._lock, _flock(self._append_fd, fcntl.LOCK_EX):
+                self._adopt()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="crt-save-journal", daemon=True)
+        self._thread.start()
+        if self._pending:
+            self._wake.set()
+
+    def stop(self) -> None:
+        """
+        停止后台线程，写入剩余的增量后关闭日志
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        for fd in (self._flush_fd, self._append_fd):
+            if fd is not None:
+                os.close(fd)
+        self._flush_fd = self._append_fd = None
+
+    def append(self, deltas: List[ProgressDelta]) -> Dict[str, str]:
+        """
+        追加增量并等待日志落盘，返回没有记录的文件及原因（与ProgressStore的接口一致，预写日志不拒绝增量）
+        """
+        if self._fd is None:
+            raise RuntimeError("保存日志未启动")
+        with self._lock, _flock(self._append_fd, fcntl.LOCK_SH):
+            self._seq += 1
+            seq = self._seq
+            self._write_record(seq, time.time(), deltas)
+            self._merge(deltas)
+        self._sync(seq)
+        self._wake.set()
+        return {}
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        立即写入所有进程的日志中待写入的增量，返回写入结果（没有待写入的增量时返回None）
+        """
+        with self._flush_lock, _flock(self._flush_fd, fcntl.LOCK_EX):
+            with self._lock:
+                # 追加锁的描述符只在持有self._lock时使用，由共享改为独占不会与本进程的append冲突
+                with _flock(self._append_fd, fcntl.LOCK_EX):
+                    self._adopt()
+                # 本进程的记录可能已被其他进程转走并写入，以日志文件的内容为准
+                size = os.fstat(self._fd).st_size
+                records, _ = _parse_records(os.pread(self._fd, size, 0))
+                seq = self._seq
+                if not records:
+                    self._pending = {}
+                    self._pending_since = None
+                    return None
+
+            # 同一行（行号和单元格都相同）只保留最后一次；按追加时间排序，对应到同一行的增量也以最后一次为准
+            latest: Dict[tuple, Tuple[float, ProgressDelta]] = {}
+            for _, appended_at, record_deltas in records:
+                for delta in record_deltas:
+                    key = (delta.filePath, delta.tableIndex, delta.rowIndex,
+                           tuple(delta.rowCells) if delta.rowCells is not None else None)
+                    if key not in latest or appended_at >= latest[key][0]:
+                        latest.pop(key, None)
+                        latest[key] = (appended_at, delta)
+            deltas = [delta for _, delta in sorted(latest.values(), key=lambda item: item[0])]
+            started_at = time.perf_counter()
+            try:
+                results = self.write(deltas)
+            except Exception as e:
+                # 写入本身失败（而非单个文件出错）时记录仍在日志中，稍后重试
+                logger.error("写入保存日志中的增量失败: %s", e)
+                self._wake.set()
+                return None
+
+            failed = {error['file'] for error in results['errors']}
+            for error in results['errors']:
+                logger.error("保存日志中的增量无法写入 %s: %s", error['file'], error['error'])
+            with self._lock:
+                self._flushed_seq = seq
+                self.flushes += 1
+                self.flushed_deltas += len(deltas)
+                self.failed_deltas += sum(1 for delta in deltas if delta.filePath in failed)
+                self.remapped += results.get('remapped', 0)
+                self.dropped += results.get('dropped', 0)
+                self.last_flush_seconds = time.perf_counter() - started_at
+                if os.fstat(self._fd).st_size == size:
+                    # 日志中的记录都已写入（或被确认无法写入），可以截断
+                    # 写入期间追加了新记录时保留日志，已写入的记录下次与新记录一起再写入一次，结果相同
+                    os.ftruncate(self._fd, 0)
+                    os.fsync(self._fd)
+                    self._pending = {}
+                    self._pending_since = None
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': True,
+                'appendedSeq': self._seq,
+                'flushedSeq': self._flushed_seq,
+                'lagRecords': self._seq - self._flushed_seq,
+                'lagSeconds': round(time.time() - self._pending_since, 3) if self._pending_since else 0.0,
+                'pendingFiles': len(self._pending),
+                'pendingDeltas': sum(len(rows) for rows in self._pending.values()),
+                'journalBytes': os.fstat(self._fd).st_size if self._fd is not None else 0,
+                'path': self.path,
+                'replayed': self.replayed,
+                'adopted': self.adopted,
+                'flushes': self.flushes,
+                'flushedDeltas': self.flushed_deltas,
+                'failedDeltas': self.failed_deltas,
+                'remapped': self.remapped,
+                'dropped': self.dropped,
+                'lastFlushMs': round(self.last_flush_seconds * 1000, 3),
+            }
+
+    def _merge(self, deltas: List[ProgressDelta]) -> None:
+        # 调用方需持有锁
+        for delta in deltas:
+            self._pending.setdefault(delta.filePath, {})[(delta.tableIndex, delta.rowIndex)] = delta.checked
+        if self._pending and self._pending_since is None:
+            self._pending_since = time.time()
+
+    def _sync(self, seq: int) -> None:
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                target = self._seq
+            os.fsync(self._fd)
+            self._synced_seq = target
+
+    def _write_record(self, seq: int, appended_at: float, deltas: List[ProgressDelta]) -> None:
+        # 调用方需持有锁
+        os.write(self._fd, encode_json({
+            'seq': seq,
+            't': appended_at,
+            'deltas': [[d.filePath, d.tableIndex, d.rowIndex, d.checked, d.rowCells] for d in deltas]
+        }) + b'\n')
+
+    def _claim(self) -> Tuple[int, str]:
+        """
+        独占一个未被其他进程使用的日志文件，返回 (文件描述符, 路径)
+        """
+        for slot in itertools.count():
+            path = self.base_path if slot == 0 else f"{self.base_path}.{slot}"
+            fd = _lock_file(path, os.O_RDWR | os.O_CREAT | os.O_APPEND)
+            if fd is not None:
+                return fd, path
+
+    def _adopt(self) -> None:
+        """
+        把其他进程日志中的记录（保留追加时间）追加到自己的日志并fsync，再清空原文件；已退出的进程的日志随后删除
+        调用方需持有锁、进程间的写入锁和追加锁
+        """
+        for path in _slot_paths(self.base_path):
+            if path == self.path:
+                continue
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                with os.fdopen(os.dup(fd), 'rb') as f:
+                    records, _ = _parse_records(f.read())
+                if records:
+                    for _, appended_at, deltas in records:
+                        self._seq += 1
+                        self._write_record(self._seq, appended_at, deltas)
+                        self._merge(deltas)
+                    os.fsync(self._fd)
+                    self._synced_seq = self._seq
+                    self.adopted += len(records)
+                    logger.info("转入了保存日志 %s 中的 %d 条记录", path, len(records))
+                os.ftruncate(fd, 0)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            orphan = _lock_file(path, os.O_RDONLY)
+            if orphan is not None:
+                os.unlink(path)
+                os.close(orphan)
+
+    def _replay(self) -> None:
+        """
+        载入日志中的记录；末尾不完整的记录（写入时崩溃）被截掉，之后追加的记录不会与之混在一起
+        """
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        records, valid_end = _parse_records(content)
+        first_seq = None
+        with self._lock:
+            for seq, _, deltas in records:
+                self._merge(deltas)
+                first_seq = seq if first_seq is None else first_seq
+                self._seq = max(self._seq, seq)
+            self._synced_seq = self._seq
+            self._flushed_seq = first_seq - 1 if first_seq else self._seq
+            self.replayed = len(records)
+        if valid_end < len(content):
+            logger.warning("保存日志末尾有 %d 字节不完整的记录，已丢弃", len(content) - valid_end)
+            os.ftruncate(self._fd, valid_end)
+            os.fsync(self._fd)
+        if records:
+            logger.info("从保存日志中恢复了 %d 条记录", len(records))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            # 等待一小段时间，让连续的切换合并为一次写入
+            self._stop.wait(self.flush_interval)
+            self.flush()
+
+def _parse_records(content: bytes) -> Tuple[List[Tuple[int, float, List[ProgressDelta]]], int]:
+    """
+    解析日志内容，返回 ([(序号, 追加时间, 增量列表), ...], 完整记录的结束位置)
+    """
+    records = []
+    valid_end = 0
+    for line in content.splitlines(keepends=True):
+        if not line.endswith(b'\n'):
+            break
+        try:
+            record = json.loads(line)
+            # 没有rowCells的旧记录按行号写入
+            deltas = [
+                ProgressDelta(filePath=entry[0], tableIndex=entry[1], rowIndex=entry[2], checked=entry[3],
+                              rowCells=entry[4] if len(entry) > 4 else None)
+                for entry in record['deltas']
+            ]
+        except (ValueError, KeyError, IndexError, TypeError):
+            break
+        records.append((record.get('seq', 0), record.get('t', 0.0), deltas))
+        valid_end += len(line)
+    return records, valid_end
+
+def _slot_paths(base_path: str) -> List[str]:
+    """
+    已存在的日志文件: base_path 以及 base_path.N
+    """
+    directory = os.path.dirname(base_path)
+    prefix = os.path.basename(base_path) + '.'
+    slots = [base_path] if os.path.exists(base_path) else []
+    slots.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory or '.'))
+                 if name.startswith(prefix) and name[len(prefix):].isdigit())
+    return slots
+
+@contextmanager
+def _flock(fd: int, operation: int) -> Iterator[None]:
+    fcntl.flock(fd, operation)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+def _lock_file(path: str, flags: int) -> Optional[int]:
+    """
+    打开文件并加上非阻塞的flock排他锁；文件被其他进程占用，或加锁前已被删除（其他进程接管）时返回None
+    """
+    try:
+        fd = os.open(path, flags, 0o644)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        opened = os.fstat(fd)
+        current = os.stat(path)
+        if (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino):
+            return fd
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    os.close(fd)
+    return None
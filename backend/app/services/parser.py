@@ -1,128 +1,251 @@
+import io
 import os
 import re
-from typing import List, Dict, Any, Tuple
-from ..models import FileData, TableData
+import time
+import logging
+from array import array
+from typing import List, Dict, Any, Tuple, Optional, Iterator, BinaryIO, Union
+from ..models import FileData, TableData, CompactFile, CompactTable
+from .cache import ParseCache, file_signature
+from .write_engine import file_version
+from .instrumentation import PHASE_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+HEADER_PATTERN = re.compile(r'^(#{1,6})\s+(.+)$')
+# 未转义的 |（单元格中的 \| 是内容的一部分）
+CELL_DELIMITER = re.compile(r'(?<!\\)\|')
+
+def split_row(line: str) -> List[str]:
+    """
+    按 | 切分表格行，结果与 line.split('|') 相同（包括第一个 | 之前和最后一个 | 之后的部分），
+    但转义的 \\| 不切分，原样保留在单元格中；各段用 '|' 连接即还原原行
+    """
+    if '\\|' not in line:
+        return line.split('|')
+    return CELL_DELIMITER.split(line)
 
 def parse_markdown_file(file_path: str, root_dir: str) -> FileData:
     """
     解析单个Markdown文件，提取表格数据
-    支持由分隔行拆分的多个表格
+    以二进制流单遍读取，每个标题下的所有表格都会被解析
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        raise Exception(f"读取文件失败 {file_path}: {str(e)}")
-    
+    file_data, _ = _parse_file(file_path, root_dir, with_index=False)
+    return file_data
+
+def parse_markdown_file_compact(file_path: str, root_dir: str) -> CompactFile:
+    """
+    解析单个Markdown文件，返回紧凑表示（用于缓存和常驻索引）
+    """
+    file_data, _ = _parse_file(file_path, root_dir, with_index=False, compact=True)
+    return file_data
+
+def parse_markdown_file_with_index(file_path: str, root_dir: str) -> Tuple[FileData, List[Dict[str, Any]]]:
+    """
+    解析单个Markdown文件，同时返回表格位置索引（见 build_table_location）
+    """
+    return _parse_file(file_path, root_dir, with_index=True)
+
+def build_table_index(content: bytes) -> List[Dict[str, Any]]:
+    """
+    为文件内容构建表格位置索引，写入服务据此定位表格，保证与解析结果的编号一致
+    """
+    _, table_index = _parse_tokens(tokenize_markdown(io.BytesIO(content)), '', with_index=True)
+    return table_index
+
+def _parse_file(file_path: str, root_dir: str, with_index: bool,
+                compact: bool = False) -> Tuple[Union[FileData, CompactFile], List[Dict[str, Any]]]:
     # 获取相对路径
     rel_path = os.path.relpath(file_path, root_dir)
+    # 无标题时使用文件名（不含扩展名）作为标题
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
     
-    # 分割内容，查找标题和表格
-    sections = split_content_by_headers(content)
-    
-    tables = []
-    for section in sections:
-        title, table_data_list = parse_section(section, file_path)
-        if table_data_list:
-            # 处理返回的表格列表（可能是单个表格或列表）
-            if isinstance(table_data_list, list):
-                # 如果是列表，添加所有表格
-                for i, table_data in enumerate(table_data_list):
-                    # 如果有多个表格，在标题后添加序号
-                    table_title = title if i == 0 else f"{title} (Part {i+1})"
-                    tables.append(TableData(
-                        title=table_title,
-                        header=table_data['header'],
-                        rows=table_data['rows']
-                    ))
-            else:
-                # 如果是单个表格
-                tables.append(TableData(
-                    title=title,
-                    header=table_data_list['header'],
-                    rows=table_data_list['rows']
-                ))
-    
-    # 如果没有找到任何表格，尝试解析整个内容为表格
-    if not tables:
-        table_data_list = parse_table(content)
-        if table_data_list:
-            # 使用文件名（不含扩展名）作为标题
-            file_name = os.path.splitext(os.path.basename(file_path))[0]
-            # 处理返回的表格列表（可能是单个表格或列表）
-            if isinstance(table_data_list, list):
-                # 如果是列表，添加所有表格
-                for i, table_data in enumerate(table_data_list):
-                    # 如果有多个表格，在标题后添加序号
-                    table_title = file_name if i == 0 else f"{file_name} (Part {i+1})"
-                    tables.append(TableData(
-                        title=table_title,
-                        header=table_data['header'],
-                        rows=table_data['rows']
-                    ))
-            else:
-                # 如果是单个表格
-                tables.append(TableData(
-                    title=file_name,
-                    header=table_data_list['header'],
-                    rows=table_data_list['rows']
-                ))
+    try:
+        with open(file_path, 'rb') as f:
+            version = file_version(os.fstat(f.fileno()))
+            tables, table_index = _parse_tokens(tokenize_markdown(f), file_name, with_index, compact)
+    except (OSError, UnicodeDecodeError) as e:
+        raise Exception(f"读取文件失败 {file_path}: {str(e)}")
     
-    return FileData(
+    file_class = CompactFile if compact else FileData
+    return file_class(
         filePath=rel_path,
-        tables=tables
-    )
+        tables=tables,
+        version=version
+    ), table_index
 
-def split_content_by_headers(content: str) -> List[Dict[str, Any]]:
+def _parse_tokens(tokens: Iterator[Dict[str, Any]], file_name: str, with_index: bool,
+                  compact: bool = False) -> Tuple[List[Union[TableData, CompactTable]], List[Dict[str, Any]]]:
     """
-    根据Markdown标题分割内容，支持任意级别标题（###、####等）
+    将标记流组装为TableData（compact为True时为CompactTable）列表，并按需构建表格位置索引
     """
-    sections = []
-    lines = content.split('\n')
-    
-    current_section = {
-        'title': None,
-        'content': []
+    tables = []
+    table_index = []
+    title = None
+    part = 0  # 当前标题下已解析出的表格数
+    for token in tokens:
+        if token['type'] == 'header':
+            title = token['title']
+            part = 0
+            continue
+        
+        table_data = parse_table_lines(token['lines'])
+        if with_index:
+            location = build_table_location(token, table_data)
+            if table_data:
+                location['tableIndex'] = len(tables)
+            table_index.append(location)
+        if not table_data:
+            continue
+        section_title = title or file_name
+        # 同一标题下有多个表格时，在标题后添加序号
+        table_title = section_title if part == 0 else f"{section_title} (Part {part+1})"
+        part += 1
+        if compact:
+            tables.append(CompactTable(table_title, table_data['header'], table_data['rows'],
+                                       line_offsets=row_line_offsets(token),
+                                       source_columns=len(split_row(token['lines'][0])) - 2))
+        else:
+            tables.append(TableData(
+                title=table_title,
+                header=table_data['header'],
+                rows=table_data['rows']
+            ))
+    return tables, table_index
+
+def build_table_location(token: Dict[str, Any], table_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    记录单个表格块的位置信息：
+    - tableIndex: 在FileData.tables中的编号，未被解析为表格（没有数据行）时为None
+    - start/end: 表格块的字节范围
+    - header: 原始表头单元格（不含自动添加的进度列）
+    - hasProgressColumn: 解析器是否将最后一列识别为进度列
+    - headerLine/separatorLine: 表头行和主分隔行的字节范围（没有主分隔行时为None）
+    - rows: 与TableData.rows一一对应的 (起始字节, 结束字节, 是否分隔行)
+    """
+    lines = token['lines']
+    offsets = token['offsets']
+    data_start = 2 if len(lines) > 1 and '---' in lines[1] else 1
+    rows = []
+    for line, (start, end) in zip(lines[data_start:], offsets[data_start:]):
+        cells = [c.strip() for c in split_row(line)[1:-1]]
+        rows.append((start, end, is_separator_row(cells)))
+    return {
+        'tableIndex': None,
+        'start': token['start'],
+        'end': token['end'],
+        'header': [h.strip() for h in split_row(lines[0])[1:-1]],
+        'hasProgressColumn': bool(table_data and table_data['hasProgressColumn']),
+        'headerLine': offsets[0],
+        'separatorLine': offsets[1] if data_start == 2 else None,
+        'rows': rows
     }
-    
-    for line in lines:
-        # 匹配任意级别的Markdown标题（###、####等）
-        header_match = re.match(r'^(#{1,6})\s+(.+)$', line)
+
+# 行偏移索引的间隔: 每隔这么多行记录一个起始字节，读取时最多多读 2 * (间隔 - 1) 行
+ROW_OFFSET_STRIDE = 32
+
+def row_line_offsets(token: Dict[str, Any]) -> array:
+    """
+    表格块中第 0、STRIDE、2*STRIDE ... 行（含分隔行，与rows一一对应）的起始字节，末尾附加表格块的结束字节
+    """
+    lines = token['lines']
+    data_start = 2 if len(lines) > 1 and '---' in lines[1] else 1
+    starts = [start for start, _ in token['offsets'][data_start::ROW_OFFSET_STRIDE]]
+    starts.append(token['end'])
+    return array('I' if token['end'] < 1 << 32 else 'Q', starts)
+
+def read_table_rows(file_path: str, table: CompactTable, version: str, start: int, end: int) -> Optional[List[List[str]]]:
+    """
+    按行偏移索引只读取文件中 [start, end) 范围内的行，解析结果与完整解析时的rows相同
+    文件的当前版本与version不一致（或表格没有偏移索引）时返回None，由调用方改用常驻索引
+    """
+    offsets = table.line_offsets
+    if offsets is None:
+        return None
+    end = min(end, table.row_count)
+    if start >= end:
+        return []
+    with open(file_path, 'rb') as f:
+        if file_version(os.fstat(f.fileno())) != version:
+            return None
+        # 从start之前最近的记录点读到end之后最近的记录点（或表格末尾）
+        first = start // ROW_OFFSET_STRIDE
+        last = min(-(-end // ROW_OFFSET_STRIDE), len(offsets) - 1)
+        f.seek(offsets[first])
+        content = f.read(offsets[last] - offsets[first])
+    # 与process_table_data一致: 源文件没有进度列时在末尾添加，已有的进度列规范化为[ ]或[x]
+    column_count = table.source_columns
+    has_progress_column = column_count == len(table.header)
+    rows = []
+    skip = start - first * ROW_OFFSET_STRIDE
+    for line in content.split(b'\n')[skip:skip + end - start]:
+        cells = [c.strip() for c in split_row(line.decode('utf-8').strip())[1:-1]]
+        if is_separator_row(cells):
+            rows.append([])
+            continue
+        cells = cells[:column_count] + [''] * (column_count - len(cells))
+        if not has_progress_column:
+            cells.append('[ ]')
+        elif cells[-1] not in PROGRESS_MARKS:
+            cells[-1] = '[ ]'
+        rows.append(cells)
+    return rows
+
+def tokenize_markdown(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    逐行读取二进制流，单遍产出标题和表格块
+    - 标题: {'type': 'header', 'title', 'start', 'end'}
+    - 表格: {'type': 'table', 'lines', 'offsets', 'start', 'end'}
+    offsets为每行 (起始字节, 内容结束字节)，不含换行符；表格块至少包含两行
+    同一时刻只在内存中保留当前表格块，适用于任意大小的文件
+    """
+    block_lines = []
+    block_offsets = []
+    offset = 0
+    
+    for raw in stream:
+        line_start = offset
+        offset += len(raw)
+        content_end = offset
+        if raw.endswith(b'\n'):
+            content_end -= 2 if raw.endswith(b'\r\n') else 1
+        text = raw[:content_end - line_start].decode('utf-8')
+        
+        stripped = text.strip()
+        if len(stripped) >= 2 and stripped[0] == '|' and stripped[-1] == '|':
+            block_lines.append(stripped)
+            block_offsets.append((line_start, content_end))
+            continue
+        
+        if block_lines:
+            if len(block_lines) >= 2:
+                yield _table_token(block_lines, block_offsets)
+            block_lines = []
+            block_offsets = []
+        
+        header_match = HEADER_PATTERN.match(text)
         if header_match:
-            # 如果已有内容，保存当前section
-            if current_section['content']:
-                sections.append(current_section)
-            
-            # 开始新的section
-            current_section = {
+            yield {
+                'type': 'header',
                 'title': header_match.group(2).strip(),
-                'content': [line]
+                'start': line_start,
+                'end': content_end
             }
-        else:
-            current_section['content'].append(line)
     
-    # 添加最后一个section
-    if current_section['content']:
-        sections.append(current_section)
-    
-    return sections
+    if len(block_lines) >= 2:
+        yield _table_token(block_lines, block_offsets)
 
-def parse_section(section: Dict[str, Any], file_path: str) -> Tuple[str, List[Dict[str, Any]]]:
-    """
-    解析单个section，提取标题和表格
-    支持返回多个表格（由分隔行拆分）
-    """
-    title = section['title']
-    content = '\n'.join(section['content'])
-    
-    table_data = parse_table(content)
-    
-    # 如果没有标题，使用文件名
-    if not title and table_data:
-        file_name = os.path.splitext(os.path.basename(file_path))[0]
-        title = file_name
-    
-    return title, table_data
+def _table_token(lines: List[str], offsets: List[Tuple[int, int]]) -> Dict[str, Any]:
+    return {
+        'type': 'table',
+        'lines': lines,
+        'offsets': offsets,
+        'start': offsets[0][0],
+        'end': offsets[-1][1]
+    }
+
+# 进度列单元格的合法取值
+PROGRESS_MARKS = frozenset(('[ ]', '[x]'))
 
 def is_separator_row(cells):
     """
@@ -130,37 +253,33 @@ def is_separator_row(cells):
     支持有进度列和没有进度列两种情况
     """
     for cell in cells:
-        # 去掉空格后，检查单元格内容
+        # 去掉空格后，单元格不是空字符串，且不全是由-组成，也不是进度标记，则不是分隔行
         stripped = cell.strip()
-        # 如果单元格不是空字符串，且不全是由-组成，也不是进度标记，则不是分隔行
-        if stripped != '' and not all(c == '-' for c in stripped) and stripped not in ['[ ]', '[x]']:
+        if stripped.strip('-') and stripped not in PROGRESS_MARKS:
             return False
     return True
 
 def parse_table(content: str) -> Dict[str, Any]:
     """
-    从内容中解析Markdown表格，检查并添加"进度"列
-    识别分隔行并在数据中标记
+    从内容中解析第一个有效的Markdown表格，检查并添加"进度"列
+    """
+    for token in tokenize_markdown(io.BytesIO(content.encode('utf-8'))):
+        if token['type'] == 'table':
+            table_data = parse_table_lines(token['lines'])
+            if table_data:
+                return table_data
+    return None
+
+def parse_table_lines(lines: List[str]) -> Dict[str, Any]:
+    """
+    解析一个表格块（已去除首尾空白的行），检查并添加"进度"列
+    识别分隔行并在数据中标记；各行列数的统一由process_table_data完成
     """
-    # 查找表格
-    table_pattern = r'(\|.*\|(?:\n\|.*\|)+)'
-    table_match = re.search(table_pattern, content)
-    
-    if not table_match:
-        return None
-    
-    table_text = table_match.group(1)
-    lines = table_text.strip().split('\n')
-    
     if len(lines) < 1:
         return None
     
     # 解析表头
-    header_line = lines[0].strip()
-    if not header_line.startswith('|') or not header_line.endswith('|'):
-        return None
-    
-    headers = [h.strip() for h in header_line.split('|')[1:-1]]
+    headers = [h.strip() for h in split_row(lines[0])[1:-1]]
     
     # 检查是否是分隔线（包含---）
     if len(lines) > 1 and '---' in lines[1]:
@@ -168,26 +287,12 @@ def parse_table(content: str) -> Dict[str, Any]:
     else:
         data_start = 1
     
-    # 解析数据行，识别分隔行
+    # 解析数据行，分隔行用空列表标记（切分后至少有一个单元格，不会与空行混淆）
     rows = []
-    header_count = len(headers)
-    
     for line in lines[data_start:]:
-        line = line.strip()
-        if line.startswith('|') and line.endswith('|'):
-            cells = [c.strip() for c in line.split('|')[1:-1]]
-            if cells:  # 确保不是空行
-                # 检查是否是分隔行
-                if is_separator_row(cells):
-                    # 如果是分隔行，添加空列表作为标记
-                    rows.append([])  # 空列表表示分隔行
-                else:
-                    # 确保行数据与表头列数匹配
-                    while len(cells) < header_count:
-                        cells.append('')
-                    if len(cells) > header_count:
-                        cells = cells[:header_count]
-                    rows.append(cells)
+        cells = [c.strip() for c in split_row(line)[1:-1]]
+        if cells:
+            rows.append([] if is_separator_row(cells) else cells)
     
     if not rows:
         return None
@@ -198,104 +303,195 @@ def parse_table(content: str) -> Dict[str, Any]:
 def process_table_data(headers, rows):
     """
     处理表格数据，检查并添加进度列
-    rows中包含空列表表示分隔行
+    rows中包含空列表表示分隔行；整张表格批量处理:
+    - 单遍统一每个数据行的列数（补空或截断到表头列数），同时统计最后一列中进度标记的行数
+    - 超过一半的数据行符合进度格式时认为最后一列是进度列，否则添加进度列
+    - 再只处理进度列本身: 添加 [ ]，或把不是 [ ]/[x] 的单元格规范化为 [ ]
     """
     if not rows:
         return None
     
     # 复制headers，避免修改原始列表
     table_headers = headers.copy()
+    header_count = len(table_headers)
+    last_col_index = header_count - 1
     
-    # 检查哪些行是数据行（非分隔行）
     data_rows = []
-    for row in rows:
-        if row:  # 如果不是分隔行（空列表）
-            data_rows.append(row)
+    progress_count = 0
+    for i, row in enumerate(rows):
+        if not row:  # 分隔行（空列表）
+            continue
+        # 截断前后最后一列是同一个单元格，补上的空单元格不是进度标记
+        if header_count and len(row) > last_col_index and row[last_col_index].strip() in PROGRESS_MARKS:
+            progress_count += 1
+        extra = header_count - len(row)
+        if extra > 0:
+            row.extend([''] * extra)
+        elif extra < 0:
+            row = rows[i] = row[:header_count]
+        data_rows.append(row)
     
     # 如果没有数据行（所有行都是分隔行），也返回有效数据
     if not data_rows:
         return {
             'header': table_headers,
-            'rows': rows
+            'rows': rows,
+            'hasProgressColumn': False
         }
     
-    # 检查最后一列是否为进度列（内容为[ ]或[x]格式）
-    is_progress_column = False
-    if table_headers and data_rows:
-        last_col_index = len(table_headers) - 1
-        # 检查最后一列的内容是否符合进度格式
-        progress_count = 0
-        for row in data_rows:
-            if len(row) > last_col_index:
-                cell_value = row[last_col_index].strip()
-                if cell_value in ['[ ]', '[x]']:
-                    progress_count += 1
-        
-        # 如果超过一半的行符合进度格式，则认为最后一列是进度列
-        if progress_count >= len(data_rows) * 0.5:
-            is_progress_column = True
-    
-    # 确保所有行的列数与表头匹配
-    header_count = len(table_headers)
-    for i in range(len(rows)):
-        if rows[i]:  # 如果不是分隔行（空列表）
-            # 确保行有足够的列
-            while len(rows[i]) < header_count:
-                rows[i].append('')
-            # 如果行有多余的列，截断
-            if len(rows[i]) > header_count:
-                rows[i] = rows[i][:header_count]
+    # 如果超过一半的行符合进度格式，则认为最后一列是进度列
+    is_progress_column = header_count > 0 and progress_count >= len(data_rows) * 0.5
     
-    # 如果没有进度列，添加它
     if not is_progress_column:
+        # 添加进度列，数据行填充默认值（没有表头列时数据行被截断为空，不再视为数据行）
         table_headers.append('进度')
-        
-        # 为所有数据行添加进度列，填充默认值
-        for i in range(len(rows)):
-            if rows[i]:  # 如果不是分隔行
-                rows[i].append('[ ]')
+        for row in data_rows:
+            if row:
+                row.append('[ ]')
     else:
-        # 确保进度列的格式正确
-        last_col_index = len(table_headers) - 1
-        for i in range(len(rows)):
-            if rows[i]:  # 如果不是分隔行
-                # 如果进度列为空，填充默认值
-                if not rows[i][last_col_index] or rows[i][last_col_index].strip() == '':
-                    rows[i][last_col_index] = '[ ]'
-                # 确保格式正确（[ ] 或 [x]）
-                elif rows[i][last_col_index] not in ['[ ]', '[x]']:
-                    rows[i][last_col_index] = '[ ]'
+        # 确保进度列的格式正确（[ ] 或 [x]），其余（含空单元格）填充默认值
+        for row in data_rows:
+            if row[last_col_index] not in PROGRESS_MARKS:
+                row[last_col_index] = '[ ]'
     
     return {
         'header': table_headers,
-        'rows': rows
+        'rows': rows,
+        'hasProgressColumn': is_progress_column
     }
 
-def scan_directory(root_dir: str) -> List[FileData]:
+def parse_markdown_file_cached(file_path: str, root_dir: str, cache: ParseCache) -> Tuple[CompactFile, bool]:
+    """
+    通过缓存解析单个文件，返回 (CompactFile, 是否命中缓存)
+    先stat再读取，保证文件在解析期间被修改时下次能检测到变化
+    """
+    signature = file_signature(os.stat(file_path))
+    file_data = cache.get(file_path, signature)
+    if file_data is not None:
+        return file_data, True
+    file_data = parse_markdown_file_compact(file_path, root_dir)
+    cache.put(file_path, signature, file_data)
+    return file_data, False
+
+def is_excluded_dir(name: str) -> bool:
+    """
+    排除常见的隐藏目录和构建目录
+    """
+    return name.startswith('.') or name in ['node_modules', 'dist', 'build']
+
+def is_markdown_file(name: str) -> bool:
+    return name.lower().endswith('.md')
+
+def iter_markdown_files(root_dir: str) -> Iterator[str]:
+    """
+    递归遍历目录，依次返回所有Markdown文件的路径
+    """
+    for root, dirs, files in os.walk(root_dir):
+        dirs[:] = [d for d in dirs if not is_excluded_dir(d)]
+        
+        for file in files:
+            if is_markdown_file(file):
+                yield os.path.join(root, file)
+
+def scan_directory(root_dir: str, cache: Optional[ParseCache] = None, workers: int = 0) -> List[FileData]:
     """
     递归扫描目录，查找所有Markdown文件
+    传入cache时，只重新解析签名（mtime/size/inode）发生变化的文件
+    workers大于1时，使用多进程并行解析
     """
     if not os.path.exists(root_dir):
         raise Exception(f"目录不存在: {root_dir}")
     
-    markdown_files = []
-    for root, dirs, files in os.walk(root_dir):
-        # 排除常见的隐藏目录和构建目录
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'dist', 'build']]
-        
-        for file in files:
-            if file.lower().endswith('.md'):
-                file_path = os.path.join(root, file)
-                markdown_files.append(file_path)
+    with timed('walk'):
+        markdown_files = list(iter_markdown_files(root_dir))
+    parsed = load_markdown_files(markdown_files, root_dir, cache, workers)
     
-    results = []
-    for file_path in markdown_files:
-        try:
-            file_data = parse_markdown_file(file_path, root_dir)
-            if file_data.tables:  # 只包含有表格的文件
-                results.append(file_data)
-        except Exception as e:
-            print(f"警告: 解析文件失败 {file_path}: {str(e)}")
+    # 只包含有表格的文件，保持遍历顺序
+    return [parsed[p].to_file_data() for p in markdown_files if p in parsed and parsed[p].tables]
+
+def load_markdown_files(file_paths: List[str], root_dir: str, cache: Optional[ParseCache] = None,
+                        workers: int = 0) -> Dict[str, CompactFile]:
+    """
+    加载一组文件的解析结果（紧凑表示）：先查缓存，未命中的文件串行或并行解析
+    解析失败的文件会被跳过（记录警告），不影响其他文件
+    """
+    parsed = {}
+    to_parse = []
+    signatures = {}
+    hits = 0
+    for file_path in file_paths:
+        if cache is not None:
+            try:
+                signature = file_signature(os.stat(file_path))
+            except OSError as e:
+                logger.warning("解析文件失败 %s: %s", file_path, e)
+                continue
+            file_data = cache.get(file_path, signature)
+            if file_data is not None:
+                parsed[file_path] = file_data
+                hits += 1
+                continue
+            signatures[file_path] = signature
+        to_parse.append(file_path)
+    
+    for file_path, file_data, error in parse_files(to_parse, root_dir, workers):
+        if error is not None:
+            logger.warning("解析文件失败 %s: %s", file_path, error)
             continue
+        if cache is not None:
+            cache.put(file_path, signatures[file_path], file_data)
+        parsed[file_path] = file_data
     
-    return results
\ No newline at end of file
+    if cache is not None:
+        cache.prune(file_paths)
+        cache.record_scan(hits, len(to_parse))
+    
+    return parsed
+
+# 每个进程任务解析的文件数，过小时进程间通信开销占比过高
+PARSE_CHUNK_SIZE = 64
+
+def parse_files(file_paths: List[str], root_dir: str,
+                workers: int = 0) -> Iterator[Tuple[str, Optional[CompactFile], Optional[str]]]:
+    """
+    解析一组文件，按输入顺序逐个返回 (路径, CompactFile或None, 错误信息或None)
+    workers大于1且文件足够多时，按块分发到进程池并行解析，结果按块顺序流式返回
+    每个文件的解析耗时（在子进程中测量）记录到parse阶段
+    """
+    if workers <= 1 or len(file_paths) <= PARSE_CHUNK_SIZE:
+        for file_path in file_paths:
+            *result, seconds = _parse_one(file_path, root_dir)
+            PHASE_SECONDS.observe(seconds, 'parse')
+            yield tuple(result)
+        return
+    
+    # 多进程模块只在并行解析时导入，不增加启动时的导入耗时
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    chunks = [file_paths[i:i + PARSE_CHUNK_SIZE] for i in range(0, len(file_paths), PARSE_CHUNK_SIZE)]
+    # 进程中可能有监听线程在运行，避免直接fork
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             mp_context=multiprocessing.get_context(method)) as pool:
+        for results in pool.map(_parse_chunk, [root_dir] * len(chunks), chunks):
+            for *result, seconds in results:
+                PHASE_SECONDS.observe(seconds, 'parse')
+                yield tuple(result)
+
+def resolve_workers(value: str) -> int:
+    """
+    解析并行度配置: 'auto' 表示CPU核数，其余按整数处理（0或1表示串行）
+    """
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return int(value)
+
+def _parse_one(file_path: str, root_dir: str) -> Tuple[str, Optional[CompactFile], Optional[str], float]:
+    started_at = time.perf_counter()
+    try:
+        return file_path, parse_markdown_file_compact(file_path, root_dir), None, time.perf_counter() - started_at
+    except Exception as e:
+        return file_path, None, str(e), time.perf_counter() - started_at
+
+def _parse_chunk(root_dir: str, file_paths: List[str]) -> List[Tuple[str, Optional[CompactFile], Optional[str], float]]:
+    return [_parse_one(file_path, root_dir) for file_path in file_paths]
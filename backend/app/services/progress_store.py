@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from ..models import CompactFile, CompactTable, ProgressDelta
+from .journal import DeltaWriter
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    version TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tables (
+    path TEXT NOT NULL,
+    table_index INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    header TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (path, table_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rows (
+    path TEXT NOT NULL,
+    table_index INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    cells TEXT NOT NULL,
+    checked INTEGER NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (path, table_index, row_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rows_dirty ON rows (dirty) WHERE dirty = 1;
+"""
+
+class ProgressStore:
+    """
+    SQLite中的进度库（PROGRESS_STORE=sqlite时代替预写日志），接口与SaveJournal相同：
+    - 每个文件的表格和数据行（单元格、完成标记）保存在SQLite中，主键为 (文件, 表格, 行)
+    - append() 对每个增量执行一条单行UPDATE并标记为待导出，事务提交（WAL + synchronous=FULL）后即返回
+    - 后台线程定期把待导出的行按文件合并写回Markdown，写入成功后清除标记（期间又被修改的行保留）
+    - 作为常驻索引的监听器导入文件的变化：单元格未变的表格只同步完成标记；单元格有变化（应用外的编辑）时
+      重新导入该表格，尚未导出的修改按单元格内容重新对应到行，找不到对应的行时丢弃
+    - 启动后第一次全量导入完成之前不导出，避免把上次运行留下的修改写到已被外部修改的行上
+    """
+
+    def __init__(self, path: str, write: DeltaWriter, flush_interval: float = 0.5):
+        self.path = path
+        self.write = write
+        self.flush_interval = flush_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._imported = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._dirty_since: Optional[float] = None
+        self.updates = 0
+        self.imports = 0
+        self.imported_rows = 0
+        self.remapped = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed_deltas = 0
+        self.failed_deltas = 0
+        self.last_flush_seconds = 0.0
+
+    def start(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+        pending = self._db.execute("SELECT COUNT(*) FROM rows WHERE dirty = 1").fetchone()[0]
+        if pending:
+            self._dirty_since = time.time()
+            logger.info("进度库中有 %d 行修改尚未导出", pending)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="crt-progress-export", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def append(self, deltas: List[ProgressDelta]) -> Dict[str, str]:
+        """
+        在一个事务中逐行更新完成标记，返回没有保存的文件及原因（调用方已按常驻索引校验）
+        进度库中缺少某个文件的任一行时（如导入尚未跟上索引），该文件的所有增量都不保存
+        """
+        if self._db is None:
+            raise RuntimeError("进度库未启动")
+        deltas_by_file: Dict[str, List[ProgressDelta]] = {}
+        for delta in deltas:
+            deltas_by_file.setdefault(delta.filePath, []).append(delta)
+        rejected = {}
+        with self._lock, self._db:
+            updated = 0
+            for file_path, file_deltas in deltas_by_file.items():
+                self._db.execute("SAVEPOINT file_deltas")
+                count = 0
+                for delta in file_deltas:
+                    count += self._db.execute(
+                        "UPDATE rows SET checked = ?, dirty = 1 WHERE path = ? AND table_index = ? AND row_index = ?",
+                        (int(delta.checked), file_path, delta.tableIndex, delta.rowIndex)
+                    ).rowcount
+                if count < len(file_deltas):
+                    self._db.execute("ROLLBACK TO file_deltas")
+                    rejected[file_path] = f"进度库中缺少 {len(file_deltas) - count} 行，请刷新后重试"
+                else:
+                    updated += count
+                self._db.execute("RELEASE file_deltas")
+            self.updates += updated
+            if updated and self._dirty_since is None:
+                self._dirty_since = time.time()
+        for file_path, error in rejected.items():
+            logger.warning("增量没有保存 %s: %s", file_path, error)
+        self._wake.set()
+        return rejected
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        立即把待导出的行写回Markdown，返回写入结果（没有待导出的行，或尚未完成首次导入时返回None）
+        """
+        if self._db is None or not self._imported.is_set():
+            return None
+        with self._flush_lock:
+            with self._lock:
+                pending = self._db.execute(
+                    "SELECT path, table_index, row_index, checked FROM rows WHERE dirty = 1"
+                ).fetchall()
+            if not pending:
+                return None
+
+            deltas = [
+                ProgressDelta(filePath=file_path, tableIndex=table_index, rowIndex=row_index, checked=bool(checked))
+                for file_path, table_index, row_index, checked in pending
+            ]
+            started_at = time.perf_counter()
+            try:
+                results = self.write(deltas)
+            except Exception as e:
+                logger.error("导出进度库中的修改失败: %s", e)
+                self._wake.set()
+                return None
+
+            failed = {error['file'] for error in results['errors']}
+            for error in results['errors']:
+                logger.error("进度库中的修改无法写入 %s: %s", error['file'], error['error'])
+            with self._lock, self._db:
+                # 只清除导出时的值，导出期间再次修改的行留到下一次
+                self._db.executemany(
+                    "UPDATE rows SET dirty = 0 WHERE path = ? AND table_index = ? AND row_index = ? AND checked = ?",
+                    [(file_path, table_index, row_index, checked) for file_path, table_index, row_index, checked in pending]
+                )
+                remaining = self._db.execute("SELECT COUNT(*) FROM rows WHERE dirty = 1").fetchone()[0]
+                self._dirty_since = self._dirty_since if remaining else None
+                self.flushes += 1
+                self.flushed_deltas += len(deltas)
+                self.failed_deltas += sum(1 for delta in deltas if delta.filePath in failed)
+                self.last_flush_seconds = time.perf_counter() - started_at
+            return results
+
+    def on_index_change(self, changes: Dict[str, Optional[CompactFile]], reset: bool) -> None:
+        """
+        索引监听器：导入变化的文件；reset时同时删除索引中已不存在的文件
+        """
+        if self._db is None:
+            return
+        with self._lock, self._db:
+            if reset:
+                stored = {path for path, in self._db.execute("SELECT path FROM files")}
+                for file_path in stored - changes.keys():
+                    self._delete_file(file_path)
+            for file_path, file_data in changes.items():
+                if file_data is None:
+                    self._delete_file(file_path)
+                else:
+                    self._import_file(file_data)
+        if reset and not self._imported.is_set():
+            self._imported.set()
+            self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        if self._db is None:
+            return {'enabled': True, 'store': 'sqlite', 'path': self.path, 'lagRecords': 0, 'lagSeconds': 0.0}
+        with self._lock:
+            # 待导出的行数走部分索引，不扫描整个表
+            files, tables = self._db.execute("SELECT COUNT(*), (SELECT COUNT(*) FROM tables) FROM files").fetchone()
+            dirty, = self._db.execute("SELECT COUNT(*) FROM rows WHERE dirty = 1").fetchone()
+            return {
+                'enabled': True,
+                'store': 'sqlite',
+                'path': self.path,
+                'files': files,
+                'tables': tables,
+                'lagRecords': dirty,
+                'lagSeconds': round(time.time() - self._dirty_since, 3) if self._dirty_since else 0.0,
+                'updates': self.updates,
+                'imports': self.imports,
+                'importedRows': self.imported_rows,
+                'remapped': self.remapped,
+                'dropped': self.dropped,
+                'flushes': self.flushes,
+                'flushedDeltas': self.flushed_deltas,
+                'failedDeltas': self.failed_deltas,
+                'lastFlushMs': round(self.last_flush_seconds * 1000, 3),
+            }
+
+    def _delete_file(self, file_path: str) -> None:
+        # 调用方需持有锁并处于事务中
+        for table in ('rows', 'tables', 'files'):
+            self._db.execute(f"DELETE FROM {table} WHERE path = ?", (file_path,))
+
+    def _import_file(self, file_data: CompactFile) -> None:
+        # 调用方需持有锁并处于事务中
+        db = self._db
+        file_path = file_data.filePath
+        stored = db.execute("SELECT version FROM files WHERE path = ?", (file_path,)).fetchone()
+        if stored is not None and stored[0] == file_data.version:
+            return
+        self.imports += 1
+        digests = dict(db.execute("SELECT table_index, digest FROM tables WHERE path = ?", (file_path,)))
+        dirty = db.execute(
+            "SELECT table_index, row_index, cells, checked FROM rows WHERE path = ? AND dirty = 1", (file_path,)
+        ).fetchall()
+
+        reimported = set()
+        for table_index, table in enumerate(file_data.tables):
+            digest = table_digest(table)
+            if digests.get(table_index) == digest:
+                # 单元格没有变化（如导出的写入）: 只同步完成标记，待导出的行以进度库为准
+                stored_checked = dict(db.execute(
+                    "SELECT row_index, checked FROM rows WHERE path = ? AND table_index = ? AND dirty = 0",
+                    (file_path, table_index)
+                ))
+                db.executemany(
+                    "UPDATE rows SET checked = ? WHERE path = ? AND table_index = ? AND row_index = ?",
+                    [(checked, file_path, table_index, row_index)
+                     for row_index, data_index in table.iter_data_rows()
+                     for checked in (int(table.is_checked(data_index)),)
+                     if stored_checked.get(row_index, checked) != checked]
+                )
+                continue
+            reimported.add(table_index)
+            db.execute("DELETE FROM rows WHERE path = ? AND table_index = ?", (file_path, table_index))
+            db.execute(
+                "INSERT OR REPLACE INTO tables (path, table_index, title, header, digest, row_count) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_path, table_index, table.title, json.dumps(table.header, ensure_ascii=False), digest, table.row_count)
+            )
+            db.executemany(
+                "INSERT INTO rows (path, table_index, row_index, cells, checked) VALUES (?, ?, ?, ?, ?)",
+                [(file_path, table_index, row_index, json.dumps(table.data_cells(data_index), ensure_ascii=False),
+                  int(table.is_checked(data_index)))
+                 for row_index, data_index in table.iter_data_rows()]
+            )
+            self.imported_rows += table.data_row_count
+        table_count = len(file_data.tables)
+        db.execute("DELETE FROM rows WHERE path = ? AND table_index >= ?", (file_path, table_count))
+        db.execute("DELETE FROM tables WHERE path = ? AND table_index >= ?", (file_path, table_count))
+
+        # 重新导入的表格中尚未导出的修改: 优先对应原位置上单元格相同的行，其次是同一表格中单元格相同的第一个行
+        for table_index, row_index, cells, checked in dirty:
+            if table_index not in reimported and table_index < table_count:
+                continue
+            target = None
+            if table_index < table_count:
+                same = db.execute(
+                    "SELECT row_index FROM rows WHERE path = ? AND table_index = ? AND row_index = ? AND cells = ?",
+                    (file_path, table_index, row_index, cells)
+                ).fetchone() or db.execute(
+                    "SELECT row_index FROM rows WHERE path = ? AND table_index = ? AND cells = ? AND dirty = 0 "
+                    "ORDER BY row_index LIMIT 1",
+                    (file_path, table_index, cells)
+                ).fetchone()
+                target = same[0] if same else None
+            if target is None:
+                self.dropped += 1
+                logger.warning("%s 被外部修改，表格 %d 第 %d 行尚未导出的进度找不到对应的行，已丢弃",
+                               file_path, table_index, row_index)
+                continue
+            if target != row_index:
+                self.remapped += 1
+            db.execute(
+                "UPDATE rows SET checked = ?, dirty = 1 WHERE path = ? AND table_index = ? AND row_index = ?",
+                (checked, file_path, table_index, target)
+            )
+        db.execute("INSERT OR REPLACE INTO files (path, version) VALUES (?, ?)", (file_path, file_data.version))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            # 等待一小段时间，让连续的切换合并为一次导出
+            self._stop.wait(self.flush_interval)
+            self.flush()
+
+def table_digest(table: CompactTable) -> bytes:
+    """
+    表格中除完成标记以外内容（标题、表头、单元格、分隔行位置）的摘要
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([table.title, table.header, table.values], ensure_ascii=False).encode('utf-8'))
+    for column in table.columns:
+        digest.update(column.typecode.encode('ascii'))
+        digest.update(column.tobytes())
+    digest.update(table.separators.tobytes())
+    return digest.digest()
@@ -0,0 +1,245 @@
+import json
+import zlib
+import struct
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from ..models import CompactFile
+from .instrumentation import timed
+
+try:  # 可选依赖，未安装时只提供gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# gzip头: 魔数、deflate、无标志、mtime为0、无额外标志、操作系统未知
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+def encode_json(obj: Any) -> bytes:
+    """
+    与FastAPI JSONResponse相同的编码方式（紧凑、不转义非ASCII字符）
+    """
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+def deflate_chunk(data: bytes) -> bytes:
+    """
+    独立压缩一段数据，以完全刷新（字节对齐、不引用之前的数据、非最终块）结束
+    这样的片段可以按任意顺序拼接成一个deflate流，只需在末尾追加结束块
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+_DEFLATE_END = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS).flush(zlib.Z_FINISH)
+
+class EncodedBody:
+    """
+    预先编码好的响应体：由若干JSON片段拼接而成，每个片段附带独立压缩的deflate数据
+    gzip输出直接拼接各片段的压缩数据，不重新压缩；brotli（如已安装）在首次请求时整体压缩并缓存
+    """
+    __slots__ = ('etag', 'parts', 'deflated', '_identity', '_gzip', '_brotli', '_lock')
+
+    def __init__(self, etag: str, parts: List[bytes], deflated: List[bytes]):
+        self.etag = etag
+        self.parts = parts
+        self.deflated = deflated
+        self._identity: Optional[bytes] = None
+        self._gzip: Optional[bytes] = None
+        self._brotli: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def peek(self, encoding: str) -> Optional[bytes]:
+        """
+        已编码过时直接返回，否则返回None（调用方应在工作线程中调用encode）
+        """
+        if encoding == 'gzip':
+            return self._gzip
+        if encoding == 'br' and brotli is not None:
+            return self._brotli
+        return self._identity
+
+    def encode(self, encoding: str) -> bytes:
+        with self._lock:
+            if self._identity is None:
+                self._identity = b''.join(self.parts)
+            if encoding == 'gzip':
+                if self._gzip is None:
+                    crc = 0
+                    for part in self.parts:
+                        crc = zlib.crc32(part, crc)
+                    trailer = struct.pack('<II', crc, len(self._identity) & 0xffffffff)
+                    self._gzip = b''.join([_GZIP_HEADER, *self.deflated, _DEFLATE_END, trailer])
+                return self._gzip
+            if encoding == 'br' and brotli is not None:
+                if self._brotli is None:
+                    self._brotli = brotli.compress(self._identity, quality=BROTLI_QUALITY)
+                return self._brotli
+            return self._identity
+
+class _Entry:
+    __slots__ = ('source', 'body')
+
+    def __init__(self, source: Any, body: EncodedBody):
+        self.source = source
+        self.body = body
+
+class ResponseCache:
+    """
+    JSON响应缓存
+    - 每个文件的JSON和压缩数据按 (路径, 版本号) 缓存，文件未变化时直接复用
+    - 完整响应由各文件的片段拼接，按数据源（索引快照对象）缓存；快照变化但ETag不变时同样复用
+    - ETag由各文件的版本号（mtime/size/inode）计算，是强校验值
+    """
+
+    def __init__(self):
+        self._files: Dict[str, Tuple[Optional[str], bytes, bytes]] = {}  # 路径 -> (版本号, JSON, deflate片段)
+        self._bodies: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._constants: Dict[bytes, bytes] = {}
+
+    def cached(self, key: str, source: Any) -> Optional[EncodedBody]:
+        """
+        数据源未变化时返回已缓存的响应体，否则返回None
+        """
+        entry = self._bodies.get(key)
+        if entry is not None and entry.source is source:
+            return entry.body
+        return None
+
+    def structure(self, files: List[CompactFile]) -> EncodedBody:
+        """
+        /api/structure 的响应体: {"files": [FileData, ...]}
+        """
+        return self._build('structure', files, lambda: self._splice(files))
+
+    def file(self, file_data: CompactFile) -> EncodedBody:
+        """
+        /api/file 的响应体（单个文件），ETag由文件版本号计算
+        """
+        def build():
+            json_bytes, deflated = self._file_part(file_data)
+            return [json_bytes], [deflated]
+        return self._build(f"file:{file_data.filePath}", file_data, build, files=[file_data])
+
+    def document(self, key: str, source: Any, obj_factory: Callable[[], Any], files: Iterable[CompactFile]) -> EncodedBody:
+        """
+        一次性编码的小型响应（如/api/files），按数据源缓存，ETag由files的版本号计算
+        """
+        def build():
+            json_bytes = encode_json(obj_factory())
+            return [json_bytes], [deflate_chunk(json_bytes)]
+        return self._build(key, source, build, files=files)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bodies': len(self._bodies),
+                'brotli': brotli is not None,
+            }
+
+    def _build(self, key: str, source: Any, build: Callable[[], Tuple[List[bytes], List[bytes]]],
+               files: Optional[Iterable[CompactFile]] = None) -> EncodedBody:
+        entry = self._bodies.get(key)
+        if entry is not None and entry.source is source:
+            return entry.body
+        etag = compute_etag(source if files is None else files)
+        if entry is not None and entry.body.etag == etag:
+            # 内容未变化（如索引重建后的新快照）
+            self._bodies[key] = _Entry(source, entry.body)
+            return entry.body
+        parts, deflated = build()
+        body = EncodedBody(etag, parts, deflated)
+        with self._lock:
+            self._bodies[key] = _Entry(source, body)
+            if key.startswith('file:'):
+                self._prune_file_bodies()
+        return body
+
+    def _splice(self, files: List[CompactFile]) -> Tuple[List[bytes], List[bytes]]:
+        parts = [b'{"files":[']
+        deflated = [self._constant(b'{"files":[')]
+        cache = {}
+        for i, file_data in enumerate(files):
+            if i:
+                parts.append(b',')
+                deflated.append(self._constant(b','))
+            json_bytes, chunk = self._file_part(file_data)
+            cache[file_data.filePath] = (file_data.version, json_bytes, chunk)
+            parts.append(json_bytes)
+            deflated.append(chunk)
+        parts.append(b']}')
+        deflated.append(self._constant(b']}'))
+        with self._lock:
+            # 只保留当前快照中的文件
+            self._files = cache
+        return parts, deflated
+
+    def _file_part(self, file_data: CompactFile) -> Tuple[bytes, bytes]:
+        cached = self._files.get(file_data.filePath)
+        if cached is not None and cached[0] is not None and cached[0] == file_data.version:
+            return cached[1], cached[2]
+        with timed('encode'):
+            json_bytes = encode_json(file_data.to_dict())
+            chunk = deflate_chunk(json_bytes)
+        with self._lock:
+            self._files[file_data.filePath] = (file_data.version, json_bytes, chunk)
+        return json_bytes, chunk
+
+    def _constant(self, data: bytes) -> bytes:
+        chunk = self._constants.get(data)
+        if chunk is None:
+            chunk = self._constants[data] = deflate_chunk(data)
+        return chunk
+
+    def _prune_file_bodies(self) -> None:
+        # 调用方需持有锁；单文件响应只保留仍在文件缓存中的
+        for key in [k for k in self._bodies if k.startswith('file:') and k[5:] not in self._files]:
+            del self._bodies[key]
+
+def compute_etag(files: Iterable[CompactFile]) -> str:
+    """
+    由文件路径和版本号计算强ETag
+    """
+    digest = hashlib.sha1()
+    for file_data in files:
+        digest.update(file_data.filePath.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update((file_data.version or '').encode('ascii'))
+        digest.update(b'\n')
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match使用弱比较（忽略W/前缀），支持逗号分隔的多个值和*
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    根据Accept-Encoding选择编码: br（已安装brotli时）> gzip > identity
+    """
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in (['br'] if brotli is not None else []) + ['gzip']:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return 'identity'
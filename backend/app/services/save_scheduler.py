@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Set
+from ..models import TableUpdate
+from .instrumentation import METRICS
+
+SAVE_COMMIT_SECONDS = METRICS.histogram(
+    'crt_save_commit_seconds',
+    "Time from /api/save arrival until every file it touches has been rewritten"
+)
+
+class _PendingSave:
+    __slots__ = ('updates', 'future', 'exclusive')
+
+    def __init__(self, updates: List[TableUpdate], future: asyncio.Future):
+        self.updates = updates
+        self.future = future
+        # 携带baseVersion的请求需要版本检查，不与其他请求合并
+        self.exclusive = any(update.baseVersion for update in updates)
+
+class SaveScheduler:
+    """
+    /api/save 的调度器：请求按文件排队，同一文件中排队的请求合并为一次改写
+    - 同一 (filePath, tableIndex) 的更新按到达顺序逐行合并，每行以最后一次写入为准，
+      结果与依次执行这些请求相同，但文件只读写一次
+    - 携带baseVersion的请求单独改写，版本冲突只影响该请求
+    - 同时改写的文件数不超过max_concurrent，等待的文件按排队顺序获得名额，
+      正在改写的文件再次排队时排到队尾，频繁保存的文件不会挤占其他文件
+    - 每个请求从到达到涉及的所有文件改写完成的时间记录为提交延迟（/metrics 的 crt_save_commit_seconds）
+    队列状态只在事件循环线程中访问；改写通过run在线程池中执行
+    """
+
+    def __init__(self, run: Callable[..., Awaitable[Any]], write: Callable[[List[TableUpdate]], Dict[str, Any]],
+                 max_concurrent: int = 2, latency_window: int = 1024):
+        self.run = run
+        self.write = write
+        self.max_concurrent = max(1, max_concurrent)
+        self._queues: Dict[str, Deque[_PendingSave]] = {}
+        self._ready: Deque[str] = deque()
+        self._writing: Set[str] = set()
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self.requests = 0
+        self.batches = 0
+        self.merged = 0
+        self.failed = 0
+
+    async def submit(self, updates: List[TableUpdate]) -> Dict[str, Any]:
+        """
+        排队并等待请求涉及的所有文件改写完成，返回与write_multiple_updates相同格式的结果，另加commitMs
+        """
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        updates_by_file: Dict[str, List[TableUpdate]] = {}
+        for update in updates:
+            updates_by_file.setdefault(update.filePath, []).append(update)
+        futures = []
+        for file_path, file_updates in updates_by_file.items():
+            pending = _PendingSave(file_updates, loop.create_future())
+            queue = self._queues.setdefault(file_path, deque())
+            if not queue and file_path not in self._writing:
+                self._ready.append(file_path)
+            queue.append(pending)
+            futures.append(pending.future)
+        self.requests += 1
+        self._dispatch()
+
+        results = {'success': True, 'updated_files': [], 'errors': [], 'versions': {}}
+        for file_results in await asyncio.gather(*futures):
+            results['success'] = results['success'] and file_results['success']
+            results['updated_files'].extend(file_results['updated_files'])
+            results['errors'].extend(file_results['errors'])
+            results['versions'].update(file_results['versions'])
+        latency = time.perf_counter() - started_at
+        SAVE_COMMIT_SECONDS.observe(latency)
+        self._latencies.append(latency)
+        results['commitMs'] = round(latency * 1000, 3)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        def pick(q: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3) if latencies else 0.0
+        return {
+            'maxConcurrent': self.max_concurrent,
+            'writing': len(self._writing),
+            'queuedFiles': len(self._queues),
+            'queuedRequests': sum(len(queue) for queue in self._queues.values()),
+            'requests': self.requests,
+            'batches': self.batches,
+            'merged': self.merged,
+            'failed': self.failed,
+            'commitP50Ms': pick(0.5),
+            'commitP99Ms': pick(0.99),
+        }
+
+    def _dispatch(self) -> None:
+        while self._ready and len(self._writing) < self.max_concurrent:
+            file_path = self._ready.popleft()
+            batch = self._take_batch(file_path)
+            self._writing.add(file_path)
+            asyncio.ensure_future(self._commit(file_path, batch))
+
+    def _take_batch(self, file_path: str) -> List[_PendingSave]:
+        queue = self._queues[file_path]
+        batch = [queue.popleft()]
+        if not batch[0].exclusive:
+            while queue and not queue[0].exclusive:
+                batch.append(queue.popleft())
+        if not queue:
+            del self._queues[file_path]
+        return batch
+
+    async def _commit(self, file_path: str, batch: List[_PendingSave]) -> None:
+        try:
+            results = await self.run(self._write_batch, [pending.updates for pending in batch])
+            error = None
+        except Exception as e:
+            results = None
+            error = e
+        finally:
+            self._writing.discard(file_path)
+            if file_path in self._queues:
+                self._ready.append(file_path)
+            self._dispatch()
+        self.batches += 1
+        self.merged += len(batch) - 1
+        if error is not None or not results['success']:
+            self.failed += len(batch)
+        for pending in batch:
+            # 客户端断开时请求已被取消，改写仍然生效
+            if pending.future.done():
+                continue
+            if error is not None:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(results)
+
+    def _write_batch(self, requests: List[List[TableUpdate]]) -> Dict[str, Any]:
+        # 合并在工作线程中进行，大表格的逐行合并不占用事件循环
+        return self.write(merge_table_updates(requests))
+
+def merge_table_updates(requests: List[List[TableUpdate]]) -> List[TableUpdate]:
+    """
+    按到达顺序合并多个请求中的表格更新，每个 (filePath, tableIndex) 只保留一个更新
+    逐行合并: 后到的请求中非空的行覆盖之前的同一行，空行（分隔行）和超出其长度的行保留之前的值，
+    与写入器依次应用这些更新的结果一致；baseVersion取第一个非空的值
+    """
+    merged: Dict[tuple, TableUpdate] = {}
+    rows_by_key: Dict[tuple, List[List[str]]] = {}
+    for updates in requests:
+        for update in updates:
+            key = (update.filePath, update.tableIndex)
+            current = merged.get(key)
+            if current is None:
+                merged[key] = update
+                continue
+            rows = rows_by_key.get(key)
+            if rows is None:
+                rows = rows_by_key[key] = list(current.newRows)
+            for row_index, row in enumerate(update.newRows):
+                if row_index >= len(rows):
+                    rows.append(row)
+                elif row:
+                    rows[row_index] = row
+            merged[key] = TableUpdate(filePath=update.filePath, tableIndex=update.tableIndex, newRows=rows,
+                                      baseVersion=current.baseVersion or update.baseVersion)
+    return list(merged.values())
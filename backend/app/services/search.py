@@ -0,0 +1,240 @@
+import re
+import heapq
+import bisect
+import threading
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from ..models import CompactFile
+
+# 中日韩字符（按n-gram切分）和其他文字/数字（按词切分）
+_CJK_RANGES = '぀-ヿ㐀-䶿一-鿿가-힯豈-﫿'
+TOKEN_PATTERN = re.compile(f'([{_CJK_RANGES}]+)|[^\\W_{_CJK_RANGES}]+')
+_CJK_CHAR = re.compile(f'[{_CJK_RANGES}]')
+
+# 前缀匹配的词数不超过此值时直接合并倒排列表，否则在候选行上逐行过滤
+PREFIX_EXPAND_LIMIT = 64
+
+def tokenize(text: str) -> List[Tuple[bool, str]]:
+    """
+    将文本切分为 (是否为中日韩字符串, 片段) 列表，字母统一转为小写
+    """
+    return [(bool(match.group(1)), match.group(0)) for match in TOKEN_PATTERN.finditer(text.casefold())]
+
+@lru_cache(maxsize=65536)
+def index_terms(text: str) -> FrozenSet[str]:
+    """
+    建索引用的词项：普通文字按词，中日韩字符串取所有单字和相邻双字
+    收集清单中重复的单元格很多，结果按文本缓存
+    """
+    terms = set()
+    for is_cjk, token in tokenize(text):
+        if is_cjk:
+            terms.update(token)
+            terms.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.add(token)
+    return frozenset(terms)
+
+class SearchIndex:
+    """
+    表格单元格的倒排索引，结果指向 (filePath, tableIndex, rowIndex)，表头命中时rowIndex为None
+    - 普通文字按词匹配，可按前缀匹配；中日韩文字按双字（单字查询按单字）匹配，多个词项之间为AND
+    - 作为LiveIndex监听器接收文件变化，变化先进入待处理队列，下次查询（或refresh()）时按文件增量更新
+    进度列不参与索引
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}  # 词项 -> 行ID集合
+        self._words: List[str] = []               # 已排序的普通词（用于前缀查找）
+        self._rows: Dict[int, Tuple[str, int, Optional[int]]] = {}  # 行ID -> 位置
+        self._row_terms: Dict[int, Tuple[str, ...]] = {}
+        self._file_rows: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Optional[CompactFile]] = {}
+        self._pending_reset = False
+        self._pending_lock = threading.Lock()
+        self.version = 0
+
+    def on_index_change(self, changes: Dict[str, Optional[CompactFile]], reset: bool) -> None:
+        """
+        LiveIndex监听器，只记录变化，不在通知线程中建索引
+        """
+        with self._pending_lock:
+            if reset:
+                self._pending = dict(changes)
+                self._pending_reset = True
+            else:
+                self._pending.update(changes)
+
+    def refresh(self) -> None:
+        """
+        应用所有待处理的文件变化
+        """
+        with self._lock:
+            self._apply_pending()
+
+    def search(self, query: str, limit: int = 50, prefix: bool = True) -> Dict[str, Any]:
+        """
+        返回 {'total': 命中行数, 'results': [{filePath, tableIndex, rowIndex}, ...]}
+        prefix为True时普通词按前缀匹配
+        取行ID最小的limit个结果（全量建索引时行ID按路径顺序分配，之后变化的文件排在后面），再按位置排序
+        """
+        with self._lock:
+            self._apply_pending()
+            candidates = self._match(tokenize(query), prefix)
+            locations = sorted(
+                (self._rows[row_id] for row_id in heapq.nsmallest(limit, candidates)),
+                key=lambda location: (location[0], location[1], -1 if location[2] is None else location[2])
+            )
+            return {
+                'total': len(candidates),
+                'results': [
+                    {'filePath': file_path, 'tableIndex': table_index, 'rowIndex': row_index}
+                    for file_path, table_index, row_index in locations
+                ]
+            }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            with self._pending_lock:
+                pending = len(self._pending)
+            return {
+                'version': self.version,
+                'files': len(self._file_rows),
+                'rows': len(self._rows),
+                'terms': len(self._postings),
+                'pendingFiles': pending,
+            }
+
+    def _match(self, tokens: List[Tuple[bool, str]], prefix: bool) -> Set[int]:
+        # 调用方需持有锁
+        exact_terms = []
+        prefix_terms = []
+        for is_cjk, token in tokens:
+            if is_cjk:
+                if len(token) == 1:
+                    exact_terms.append(token)
+                else:
+                    exact_terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+            elif prefix:
+                prefix_terms.append(token)
+            else:
+                exact_terms.append(token)
+        if not exact_terms and not prefix_terms:
+            return set()
+
+        sets = []
+        for term in exact_terms:
+            postings = self._postings.get(term)
+            if not postings:
+                return set()
+            sets.append(postings)
+
+        deferred = []
+        for term in prefix_terms:
+            words = self._words_with_prefix(term)
+            if not words:
+                return set()
+            if len(words) == 1:
+                sets.append(self._postings[words[0]])
+            elif len(words) <= PREFIX_EXPAND_LIMIT:
+                sets.append(set().union(*(self._postings[word] for word in words)))
+            else:
+                deferred.append(term)
+        if not sets:
+            # 所有词项都是宽泛的前缀，至少展开一个
+            term = deferred.pop(0)
+            sets.append(set().union(*(self._postings[word] for word in self._words_with_prefix(term))))
+
+        # 返回值可能直接是倒排列表本身，只读使用
+        sets.sort(key=len)
+        candidates = sets[0]
+        for postings in sets[1:]:
+            candidates = candidates & postings
+            if not candidates:
+                return candidates
+        for term in deferred:
+            candidates = {
+                row_id for row_id in candidates
+                if any(t.startswith(term) for t in self._row_terms[row_id])
+            }
+        return candidates
+
+    def _words_with_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix + '\U0010ffff')
+        return self._words[start:end]
+
+    def _apply_pending(self) -> None:
+        # 调用方需持有锁
+        with self._pending_lock:
+            pending = self._pending
+            reset = self._pending_reset
+            self._pending = {}
+            self._pending_reset = False
+        if not pending and not reset:
+            return
+
+        if reset:
+            self._postings = {}
+            self._rows = {}
+            self._row_terms = {}
+            self._file_rows = {}
+            for file_path, file_data in sorted(pending.items()):
+                if file_data is not None:
+                    self._add_file(file_path, file_data, track_words=False)
+            self._words = sorted(term for term in self._postings if not _is_cjk_term(term))
+        else:
+            for file_path, file_data in pending.items():
+                self._remove_file(file_path)
+                if file_data is not None:
+                    self._add_file(file_path, file_data, track_words=True)
+        self.version += 1
+
+    def _add_file(self, file_path: str, file_data: CompactFile, track_words: bool) -> None:
+        row_ids = []
+        for table_index, table in enumerate(file_data.tables):
+            # 每个去重后的单元格字符串只切分一次
+            value_terms = [index_terms(value) for value in table.values]
+            # 标题和表头，rowIndex为None；数据行的进度列不参与索引
+            header_terms = set()
+            for cell in (table.title,) + table.header[:-1]:
+                header_terms.update(index_terms(cell))
+            entries = [(None, header_terms)]
+            for row_index, data_index in table.iter_data_rows():
+                terms = set()
+                for column in table.columns:
+                    terms.update(value_terms[column[data_index]])
+                entries.append((row_index, terms))
+            for row_index, terms in entries:
+                if not terms:
+                    continue
+                row_id = self._next_id
+                self._next_id += 1
+                self._rows[row_id] = (file_path, table_index, row_index)
+                self._row_terms[row_id] = tuple(terms)
+                row_ids.append(row_id)
+                for term in terms:
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = set()
+                        if track_words and not _is_cjk_term(term):
+                            bisect.insort(self._words, term)
+                    postings.add(row_id)
+        if row_ids:
+            self._file_rows[file_path] = row_ids
+
+    def _remove_file(self, file_path: str) -> None:
+        for row_id in self._file_rows.pop(file_path, ()):
+            del self._rows[row_id]
+            for term in self._row_terms.pop(row_id):
+                postings = self._postings[term]
+                postings.discard(row_id)
+                if not postings:
+                    del self._postings[term]
+                    if not _is_cjk_term(term):
+                        del self._words[bisect.bisect_left(self._words, term)]
+
+def _is_cjk_term(term: str) -> bool:
+    return _CJK_CHAR.match(term) is not None
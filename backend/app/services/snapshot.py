@@ -0,0 +1,152 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from array import array, _array_reconstructor
+from typing import Dict, List, Optional, Tuple
+from ..models import CompactFile, CompactTable
+from .cache import ParseCache, file_signature
+from .write_engine import atomic_write, file_version
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'CRTSNAP\x02'
+
+# 快照中只允许出现的类型，载入时不会构造其他对象或执行任意代码
+_ALLOWED_GLOBALS = {
+    (CompactFile.__module__, 'CompactFile'): CompactFile,
+    (CompactTable.__module__, 'CompactTable'): CompactTable,
+    ('array', '_array_reconstructor'): _array_reconstructor,
+    ('array', 'array'): array,
+    ('builtins', 'bytearray'): bytearray,
+}
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        allowed = _ALLOWED_GLOBALS.get((module, name))
+        if allowed is None:
+            raise pickle.UnpicklingError(f"快照中包含不允许的类型: {module}.{name}")
+        return allowed
+
+def content_hash(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+class ParseSnapshot:
+    """
+    解析结果的磁盘快照，用于冷启动：
+    - 保存索引中每个文件的 (相对路径, 版本号, 内容哈希, CompactFile)
+    - 启动时逐个校验：版本号（mtime/size/inode）一致直接使用；大小一致但版本号不同（如被touch、
+      从备份恢复）时比较内容哈希，一致则只更新版本号；其余视为过期，由随后的扫描重新解析
+    - 有效的条目同时放入解析缓存，扫描时直接命中
+    """
+
+    def __init__(self, path: str, root_dir: str):
+        self.path = path
+        self.root_dir = root_dir
+        # 相对路径 -> (版本号, 内容哈希)，保存时未变化的文件无需重新计算哈希
+        self._hashes: Dict[str, Tuple[str, bytes]] = {}
+        self._saved_version = None
+        self._lock = threading.Lock()
+        self.last_load = {'entries': 0, 'valid': 0, 'rehashed': 0, 'stale': 0, 'seconds': 0.0}
+        self.last_save = {'entries': 0, 'bytes': 0, 'seconds': 0.0}
+
+    def load(self, cache: Optional[ParseCache] = None) -> Optional[Dict[str, CompactFile]]:
+        """
+        载入快照，返回仍然有效的条目（绝对路径 -> CompactFile）；快照不存在或无法读取时返回None
+        """
+        started_at = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    logger.warning("解析快照格式不匹配，忽略: %s", self.path)
+                    return None
+                snapshot = _SnapshotUnpickler(f).load()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("读取解析快照失败，忽略: %s", e)
+            return None
+
+        files = {}
+        rehashed = 0
+        for rel_path, version, digest, file_data in snapshot['entries']:
+            file_path = os.path.join(self.root_dir, rel_path)
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                continue
+            current_version = file_version(stat_result)
+            if current_version != version:
+                if stat_result.st_size != int(version.split('-')[1], 16) or self._hash_file(file_path, current_version) != digest:
+                    continue
+                file_data.version = current_version
+                rehashed += 1
+            self._hashes[rel_path] = (current_version, digest)
+            files[file_path] = file_data
+            if cache is not None:
+                cache.put(file_path, file_signature(stat_result), file_data)
+
+        self.last_load = {
+            'entries': len(snapshot['entries']),
+            'valid': len(files),
+            'rehashed': rehashed,
+            'stale': len(snapshot['entries']) - len(files),
+            'seconds': round(time.perf_counter() - started_at, 4),
+        }
+        logger.info("载入解析快照: %d 个条目，有效 %d（其中 %d 个按内容哈希确认），耗时 %.3fs",
+                    len(snapshot['entries']), len(files), rehashed, self.last_load['seconds'])
+        return files
+
+    def save(self, files: List[CompactFile], index_version: Optional[int] = None) -> None:
+        """
+        保存快照（临时文件 + 原子替换）；index_version与上次保存时相同则跳过
+        解析后已被修改的文件（当前版本号与解析结果不一致）不写入快照
+        """
+        with self._lock:
+            if index_version is not None and index_version == self._saved_version:
+                return
+            started_at = time.perf_counter()
+            entries = []
+            hashes = {}
+            for file_data in files:
+                version = file_data.version
+                known = self._hashes.get(file_data.filePath)
+                if known is not None and known[0] == version:
+                    digest = known[1]
+                else:
+                    digest = self._hash_file(os.path.join(self.root_dir, file_data.filePath), version)
+                    if digest is None:
+                        continue
+                hashes[file_data.filePath] = (version, digest)
+                entries.append((file_data.filePath, version, digest, file_data))
+
+            content = SNAPSHOT_MAGIC + pickle.dumps({'entries': entries}, protocol=5)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            atomic_write(self.path, content)
+            self._hashes = hashes
+            self._saved_version = index_version
+            self.last_save = {
+                'entries': len(entries),
+                'bytes': len(content),
+                'seconds': round(time.perf_counter() - started_at, 4),
+            }
+        logger.debug("保存解析快照: %d 个文件，%d 字节", len(entries), len(content))
+
+    def stats(self) -> Dict[str, object]:
+        return {'path': self.path, 'lastLoad': dict(self.last_load), 'lastSave': dict(self.last_save)}
+
+    def _hash_file(self, file_path: str, expected_version: str) -> Optional[bytes]:
+        """
+        计算文件内容的哈希；读取时的版本号与expected_version不一致（文件已被修改）时返回None
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                if file_version(os.fstat(f.fileno())) != expected_version:
+                    return None
+                return content_hash(f.read())
+        except OSError:
+            return None
@@ -0,0 +1,225 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional
+from ..models import CompactFile, CompactTable, ProgressDelta
+from ..models.compact import count_bits, get_bit, set_bit
+
+class TableStats:
+    """
+    单个表格的完成度计数器，基于CompactTable的分隔行位置
+    - checked: 数据行完成标记位图（CompactTable.progress的副本，随增量更新）
+    - section_starts: 每个分段（以分隔行划分）第一个数据行的下标
+    - sections: 每个分段的 [数据行数, 已完成行数]
+    """
+    __slots__ = ('title', 'row_count', 'separators', 'checked', 'section_starts', 'sections',
+                 'data_rows', 'checked_rows')
+
+    def __init__(self, table: CompactTable):
+        self.title = table.title
+        self.row_count = table.row_count
+        self.separators = table.separators
+        self.checked = bytearray(table.progress)
+        self.section_starts = array('I')
+        self.sections: List[List[int]] = []
+        self.data_rows = table.data_row_count
+        self.checked_rows = count_bits(self.checked)
+
+        previous = -1
+        data_index = 0
+        for boundary in list(self.separators) + [self.row_count]:
+            length = boundary - previous - 1
+            if length > 0:
+                self.section_starts.append(data_index)
+                self.sections.append([length, count_bits(self.checked, data_index, data_index + length)])
+                data_index += length
+            previous = boundary
+
+    def set_checked(self, row_index: int, checked: bool) -> int:
+        """
+        设置单行的完成状态，返回已完成行数的变化量（-1/0/1）
+        行不存在或为分隔行时不做任何修改
+        """
+        if row_index < 0 or row_index >= self.row_count:
+            return 0
+        position = bisect_left(self.separators, row_index)
+        if position < len(self.separators) and self.separators[position] == row_index:
+            return 0
+        data_index = row_index - position
+        if get_bit(self.checked, data_index) == checked:
+            return 0
+        change = 1 if checked else -1
+        set_bit(self.checked, data_index, checked)
+        self.sections[bisect_right(self.section_starts, data_index) - 1][1] += change
+        self.checked_rows += change
+        return change
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'title': self.title,
+            'dataRows': self.data_rows,
+            'checkedRows': self.checked_rows,
+            'sections': [{'dataRows': data, 'checkedRows': checked} for data, checked in self.sections]
+        }
+
+class _FileStats:
+    __slots__ = ('version', 'tables', 'data_rows', 'checked_rows')
+
+    def __init__(self, file_data: CompactFile):
+        self.version = file_data.version
+        self.tables = [TableStats(table) for table in file_data.tables]
+        self.data_rows = sum(t.data_rows for t in self.tables)
+        self.checked_rows = sum(t.checked_rows for t in self.tables)
+
+class ProgressStats:
+    """
+    按表格、文件、目录汇总的完成度统计
+    - 解析结果变化时（LiveIndex监听器）只重新统计变化的文件
+    - 通过写入服务保存的进度增量按行O(1)更新，并沿目录链更新汇总；
+      随后重新解析得到的版本号与记录的一致时不再重新统计
+    目录以相对路径表示，根目录为空字符串
+    """
+
+    def __init__(self):
+        self._files: Dict[str, _FileStats] = {}
+        self._dirs: Dict[str, List[int]] = {}  # 目录 -> [文件数, 表格数, 数据行数, 已完成行数]
+        self._lock = threading.Lock()
+        self._summary: Optional[Dict[str, Any]] = None
+        self.version = 0
+
+    def on_index_change(self, changes: Dict[str, Optional[CompactFile]], reset: bool) -> None:
+        """
+        LiveIndex监听器
+        """
+        # 统计在锁外完成，锁内只替换结果
+        prepared = {
+            path: _FileStats(file_data) if file_data is not None and file_data.tables else None
+            for path, file_data in changes.items()
+            if reset or not self._is_current(path, file_data)
+        }
+        with self._lock:
+            if reset:
+                self._files = {}
+                self._dirs = {}
+            for path, file_stats in prepared.items():
+                old = self._files.pop(path, None)
+                if old is not None:
+                    self._roll_up(path, old, -1)
+                if file_stats is not None:
+                    self._files[path] = file_stats
+                    self._roll_up(path, file_stats, 1)
+            if prepared or reset:
+                self._changed()
+
+    def apply_deltas(self, deltas: List[ProgressDelta], results: Dict[str, Any]) -> None:
+        """
+        记录已成功写入的进度增量（results为写入服务的返回值），每行O(1)
+        """
+        updated = set(results['updated_files'])
+        with self._lock:
+            changed = False
+            for delta in deltas:
+                if delta.filePath not in updated:
+                    continue
+                file_stats = self._files.get(delta.filePath)
+                if file_stats is None or not 0 <= delta.tableIndex < len(file_stats.tables):
+                    continue
+                change = file_stats.tables[delta.tableIndex].set_checked(delta.rowIndex, delta.checked)
+                if change:
+                    file_stats.checked_rows += change
+                    for directory in _ancestors(delta.filePath):
+                        self._dirs[directory][3] += change
+                    changed = True
+            for file_path in updated:
+                file_stats = self._files.get(file_path)
+                if file_stats is not None and file_path in results['versions']:
+                    file_stats.version = results['versions'][file_path]
+            if changed:
+                self._changed()
+
+    def file_info(self, file_path: str) -> Optional[Dict[str, int]]:
+        """
+        单个文件的汇总（不含表格明细），文件没有表格时返回None
+        """
+        with self._lock:
+            file_stats = self._files.get(file_path)
+            return _file_summary(file_stats) if file_stats is not None else None
+
+    def file_detail(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        单个文件的汇总和每个表格、每个分段的统计
+        """
+        with self._lock:
+            file_stats = self._files.get(file_path)
+            if file_stats is None:
+                return None
+            detail = _file_summary(file_stats)
+            detail['filePath'] = file_path
+            detail['version'] = file_stats.version
+            detail['tables'] = [table.to_dict() for table in file_stats.tables]
+            return detail
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        总计、每个目录和每个文件的汇总，按统计版本缓存，返回值不应被修改
+        """
+        with self._lock:
+            if self._summary is None:
+                totals = self._dirs.get('', [0, 0, 0, 0])
+                self._summary = {
+                    'version': self.version,
+                    'totals': _dir_summary(totals),
+                    'directories': {
+                        path: _dir_summary(counts) for path, counts in sorted(self._dirs.items()) if path
+                    },
+                    'files': {
+                        path: _file_summary(file_stats) for path, file_stats in sorted(self._files.items())
+                    }
+                }
+            return self._summary
+
+    def _is_current(self, path: str, file_data: Optional[CompactFile]) -> bool:
+        # 版本号与已记录的一致（如已按增量更新过），无需重新统计
+        with self._lock:
+            old = self._files.get(path)
+        if old is None:
+            return file_data is None or not file_data.tables
+        return file_data is not None and file_data.version is not None and file_data.version == old.version
+
+    def _roll_up(self, path: str, file_stats: _FileStats, sign: int) -> None:
+        # 调用方需持有锁
+        for directory in _ancestors(path):
+            counts = self._dirs.setdefault(directory, [0, 0, 0, 0])
+            counts[0] += sign
+            counts[1] += sign * len(file_stats.tables)
+            counts[2] += sign * file_stats.data_rows
+            counts[3] += sign * file_stats.checked_rows
+            if counts[0] == 0:
+                del self._dirs[directory]
+
+    def _changed(self) -> None:
+        # 调用方需持有锁
+        self._summary = None
+        self.version += 1
+
+def _ancestors(path: str) -> List[str]:
+    """
+    'a/b/c.md' -> ['', 'a', 'a/b']
+    """
+    parts = path.split('/')[:-1]
+    return [''] + ['/'.join(parts[:i + 1]) for i in range(len(parts))]
+
+def _file_summary(file_stats: _FileStats) -> Dict[str, int]:
+    return {
+        'tableCount': len(file_stats.tables),
+        'dataRows': file_stats.data_rows,
+        'checkedRows': file_stats.checked_rows
+    }
+
+def _dir_summary(counts: List[int]) -> Dict[str, int]:
+    return {
+        'fileCount': counts[0],
+        'tableCount': counts[1],
+        'dataRows': counts[2],
+        'checkedRows': counts[3]
+    }
@@ -0,0 +1,481 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from ..models import CompactFile, CompactTable
+from .cache import ParseCache, file_signature
+from .parser import parse_markdown_file_cached, load_markdown_files, iter_markdown_files, is_excluded_dir, is_markdown_file
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# 索引变化监听器: listener(changes, reset)
+# changes为 相对路径 -> CompactFile（文件被移除时为None）；reset为True时changes包含全部文件，应替换已有数据
+IndexListener = Callable[[Dict[str, Optional[CompactFile]], bool], None]
+
+class LiveIndex:
+    """
+    常驻内存的解析结果索引，由文件监听器保持与磁盘同步
+    请求路径只读取已发布的快照列表，不访问磁盘
+    """
+
+    def __init__(self, root_dir: str, cache: Optional[ParseCache] = None, workers: int = 0):
+        self.root_dir = root_dir
+        self.cache = cache if cache is not None else ParseCache()
+        self.workers = workers
+        self._files: Dict[str, CompactFile] = {}  # 绝对路径 -> CompactFile
+        self._snapshot: Optional[List[CompactFile]] = []
+        self._lock = threading.Lock()
+        # 修改索引并通知监听器的过程串行执行，保证监听器按修改顺序收到变化
+        self._update_lock = threading.Lock()
+        self._listeners: List[IndexListener] = []
+        self.version = 0
+        self.ready = threading.Event()
+
+    def subscribe(self, listener: IndexListener) -> None:
+        """
+        注册索引变化监听器；索引已构建时立即以reset方式推送当前全部文件
+        """
+        with self._update_lock:
+            self._listeners.append(listener)
+            if self.ready.is_set():
+                with self._lock:
+                    current = {file_data.filePath: file_data for file_data in self._files.values()}
+                listener(current, True)
+
+    def rebuild(self) -> None:
+        """
+        全量扫描目录，重建索引（未修改的文件直接命中缓存，其余按workers配置并行解析）
+        """
+        files = self._scan()
+        with self._update_lock:
+            with self._lock:
+                self._files = files
+                self._invalidate()
+            self._notify({file_data.filePath: file_data for file_data in files.values()}, True)
+            self.ready.set()
+
+    def seed(self, files: Dict[str, CompactFile]) -> None:
+        """
+        用已有的解析结果（如启动时载入的快照，绝对路径 -> CompactFile）初始化索引并立即标记为可用
+        之后应调用sync()与磁盘比对
+        """
+        with self._update_lock:
+            with self._lock:
+                self._files = dict(files)
+                self._invalidate()
+            self._notify({file_data.filePath: file_data for file_data in files.values()}, True)
+            self.ready.set()
+
+    def sync(self) -> int:
+        """
+        全量扫描并与当前索引比对，只通知发生变化的文件（未修改的文件命中缓存，结果对象不变）
+        返回变化的文件数
+        """
+        files = self._scan()
+        with self._update_lock:
+            with self._lock:
+                changes = {
+                    file_data.filePath: file_data
+                    for file_path, file_data in files.items()
+                    if self._files.get(file_path) is not file_data
+                }
+                for file_path, file_data in self._files.items():
+                    if file_path not in files:
+                        changes[file_data.filePath] = None
+                self._files = files
+                if changes:
+                    self._invalidate()
+            if changes:
+                self._notify(changes, False)
+            self.ready.set()
+        return len(changes)
+
+    def update_file(self, file_path: str) -> bool:
+        """
+        重新加载单个文件，文件已不存在时从索引中移除
+        返回索引是否发生变化
+        """
+        file_data = self._load(file_path)
+        if file_data is None:
+            return self.remove_file(file_path)
+
+        with self._update_lock:
+            with self._lock:
+                if self._files.get(file_path) is file_data:
+                    return False
+                self._files[file_path] = file_data
+                self._invalidate()
+            self._notify({file_data.filePath: file_data}, False)
+        return True
+
+    def remove_file(self, file_path: str) -> bool:
+        self.cache.discard(file_path)
+        with self._update_lock:
+            with self._lock:
+                file_data = self._files.pop(file_path, None)
+                if file_data is None:
+                    return False
+                self._invalidate()
+            self._notify({file_data.filePath: None}, False)
+        return True
+
+    def remove_tree(self, dir_path: str) -> bool:
+        """
+        移除某个目录（被删除或移出）下的所有文件
+        """
+        prefix = os.path.join(dir_path, '')
+        with self._update_lock:
+            with self._lock:
+                removed = [p for p in self._files if p.startswith(prefix)]
+                removed_data = [self._files.pop(file_path) for file_path in removed]
+                if removed:
+                    self._invalidate()
+            if removed:
+                self._notify({file_data.filePath: None for file_data in removed_data}, False)
+        for file_path in removed:
+            self.cache.discard(file_path)
+        return bool(removed)
+
+    def files(self) -> List[CompactFile]:
+        """
+        返回含表格的文件列表（按相对路径排序）
+        索引未变化时直接返回已缓存的列表，返回值不应被修改
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = [
+                        file_data for _, file_data in sorted(self._files.items())
+                        if file_data.tables
+                    ]
+                snapshot = self._snapshot
+        return snapshot
+
+    def get(self, rel_path: str) -> Optional[CompactFile]:
+        file_path = os.path.join(self.root_dir, rel_path)
+        with self._lock:
+            return self._files.get(file_path)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'ready': self.ready.is_set(),
+                'version': self.version,
+                'files': len(self._files),
+            }
+
+    def _scan(self) -> Dict[str, CompactFile]:
+        if not os.path.exists(self.root_dir):
+            return {}
+        with timed('walk'):
+            file_paths = list(iter_markdown_files(self.root_dir))
+        return load_markdown_files(file_paths, self.root_dir, self.cache, self.workers)
+
+    def _load(self, file_path: str) -> Optional[CompactFile]:
+        try:
+            file_data, _ = parse_markdown_file_cached(file_path, self.root_dir, self.cache)
+            return file_data
+        except Exception as e:
+            if os.path.exists(file_path):
+                logger.warning("解析文件失败 %s: %s", file_path, e)
+            return None
+
+    def _notify(self, changes: Dict[str, Optional[CompactFile]], reset: bool) -> None:
+        # 调用方需持有_update_lock
+        for listener in self._listeners:
+            try:
+                listener(changes, reset)
+            except Exception as e:
+                logger.warning("索引监听器执行失败: %s", e)
+
+    def _invalidate(self) -> None:
+        # 调用方需持有锁
+        self._snapshot = None
+        self.version += 1
+
+def file_listing(files: List[CompactFile]) -> List[Dict[str, object]]:
+    """
+    轻量的文件列表：每个文件只包含版本号和各表格的标题、行数、进度统计
+    """
+    return [
+        {
+            'filePath': file_data.filePath,
+            'version': file_data.version,
+            'tables': [table_summary(t) for t in file_data.tables]
+        }
+        for file_data in files
+    ]
+
+def table_summary(table: CompactTable) -> Dict[str, object]:
+    """
+    表格的标题、行数（含分隔行）、数据行数和已完成行数
+    """
+    return {
+        'title': table.title,
+        'rowCount': table.row_count,
+        'dataRows': table.data_row_count,
+        'checkedRows': table.checked_count()
+    }
+
+class PollingBackend:
+    """
+    定期stat轮询的后备方案，只对签名变化的文件重新解析
+    """
+    name = 'poll'
+
+    def __init__(self, index: LiveIndex, interval: float = 2.0):
+        self.index = index
+        self.interval = interval
+        self._signatures: Dict[str, tuple] = self._collect()
+
+    def run(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self.interval):
+            self.poll_once()
+
+    def poll_once(self) -> None:
+        current = self._collect()
+        for file_path, signature in current.items():
+            if self._signatures.get(file_path) != signature:
+                self.index.update_file(file_path)
+        for file_path in self._signatures.keys() - current.keys():
+            self.index.remove_file(file_path)
+        self._signatures = current
+
+    def close(self) -> None:
+        pass
+
+    def _collect(self) -> Dict[str, tuple]:
+        signatures = {}
+        if not os.path.exists(self.index.root_dir):
+            return signatures
+        for file_path in iter_markdown_files(self.index.root_dir):
+            try:
+                signatures[file_path] = file_signature(os.stat(file_path))
+            except OSError:
+                continue
+        return signatures
+
+# inotify常量，见 <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyBackend:
+    """
+    基于Linux inotify（通过ctypes调用libc）的文件监听
+    事件在静默debounce秒后批量处理，持续写入时最多延迟max_delay秒
+    """
+    name = 'inotify'
+
+    def __init__(self, index: LiveIndex, debounce: float = 0.2, max_delay: float = 2.0):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify仅在Linux上可用")
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "libc不支持inotify")
+
+        self.index = index
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1失败: {os.strerror(error)}")
+        self._watches: Dict[int, str] = {}  # wd -> 目录路径
+        try:
+            self._add_tree(index.root_dir)
+        except OSError:
+            self.close()
+            raise
+
+    def run(self, stop_event: threading.Event) -> None:
+        changed_files: Set[str] = set()
+        removed_dirs: Set[str] = set()
+        resync = False
+        first_event_at = None
+
+        while not stop_event.is_set():
+            pending = changed_files or removed_dirs or resync
+            readable, _, _ = select.select([self._fd], [], [], self.debounce if pending else 0.5)
+            if readable:
+                resync |= self._read_events(changed_files, removed_dirs)
+                if first_event_at is None:
+                    first_event_at = time.monotonic()
+                if time.monotonic() - first_event_at < self.max_delay:
+                    continue
+            if not (changed_files or removed_dirs or resync):
+                continue
+
+            if resync:
+                self._add_tree(self.index.root_dir)
+                self.index.rebuild()
+            else:
+                for dir_path in removed_dirs:
+                    self.index.remove_tree(dir_path)
+                for file_path in changed_files:
+                    self.index.update_file(file_path)
+            changed_files = set()
+            removed_dirs = set()
+            resync = False
+            first_event_at = None
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _add_watch(self, dir_path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(error, f"inotify_add_watch失败 {dir_path}: {os.strerror(error)}")
+        self._watches[wd] = dir_path
+
+    def _add_tree(self, dir_path: str) -> List[str]:
+        """
+        为目录及其子目录添加监听，返回其中已存在的Markdown文件
+        """
+        markdown_files = []
+        for root, dirs, files in os.walk(dir_path):
+            dirs[:] = [d for d in dirs if not is_excluded_dir(d)]
+            self._add_watch(root)
+            markdown_files.extend(os.path.join(root, f) for f in files if is_markdown_file(f))
+        return markdown_files
+
+    def _drop_tree(self, dir_path: str) -> None:
+        prefix = os.path.join(dir_path, '')
+        for wd, path in list(self._watches.items()):
+            if path == dir_path or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def _read_events(self, changed_files: Set[str], removed_dirs: Set[str]) -> bool:
+        """
+        读取并归类一批事件，返回是否需要全量重新同步
+        """
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        resync = False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_len].rstrip(b'\0')
+            offset += EVENT_HEADER.size + name_len
+
+            if mask & IN_Q_OVERFLOW:
+                resync = True
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            dir_path = self._watches.get(wd)
+            if dir_path is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if dir_path == self.index.root_dir:
+                    resync = True
+                continue
+
+            name = os.fsdecode(name)
+            path = os.path.join(dir_path, name)
+            if mask & IN_ISDIR:
+                if is_excluded_dir(name):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    removed_dirs.discard(path)
+                    changed_files.update(self._add_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._drop_tree(path)
+                    removed_dirs.add(path)
+            elif is_markdown_file(name):
+                changed_files.add(path)
+        return resync
+
+class DirectoryWatcher:
+    """
+    后台线程，选择可用的监听后端并保持LiveIndex与磁盘同步
+    backend: 'auto'（优先inotify，失败时退回轮询）、'inotify' 或 'poll'
+    """
+
+    def __init__(self, index: LiveIndex, backend: str = 'auto', poll_interval: float = 2.0):
+        self.index = index
+        self.backend_preference = backend
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.backend = self._create_backend()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='crt-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'backend': self.backend.name if self.backend else None,
+            'running': self._thread is not None and self._thread.is_alive(),
+        }
+
+    def _create_backend(self):
+        if self.backend_preference in ('auto', 'inotify'):
+            try:
+                return InotifyBackend(self.index)
+            except OSError as e:
+                if self.backend_preference == 'inotify':
+                    raise
+                logger.warning("inotify不可用，改用轮询监听: %s", e)
+        return PollingBackend(self.index, self.poll_interval)
+
+    def _run(self) -> None:
+        try:
+            self.backend.run(self._stop_event)
+        except Exception as e:
+            if self._stop_event.is_set():
+                return
+            logger.error("文件监听失败，改用轮询监听: %s", e)
+            self.backend.close()
+            self.backend = PollingBackend(self.index, self.poll_interval)
+            self.backend.run(self._stop_event)
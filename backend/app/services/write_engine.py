@@ -0,0 +1,238 @@
+import os
+import stat
+import tempfile
+import threading
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Union
+from .instrumentation import timed
+
+# 转换函数返回完整的新内容，或按起始位置排序的 (起始字节, 结束字节, 新内容) 替换列表
+Transform = Callable[[bytes], Union[bytes, List[tuple]]]
+
+class WriteConflict(Exception):
+    """
+    文件已被其他写入者修改（版本号不一致）
+    """
+
+def file_version(stat_result: os.stat_result) -> str:
+    """
+    根据stat结果生成文件版本号（用作ETag）
+    """
+    return f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}-{stat_result.st_ino:x}"
+
+def splice(content: bytes, replacements: List[tuple]) -> bytes:
+    """
+    按顺序应用替换列表，生成新内容
+    """
+    parts = []
+    position = 0
+    for start, end, new in replacements:
+        parts.append(content[position:start])
+        parts.append(new)
+        position = end
+    parts.append(content[position:])
+    return b''.join(parts)
+
+def atomic_write(file_path: str, content: bytes) -> None:
+    """
+    写入同目录下的临时文件并fsync，再用os.replace原子替换，最后fsync目录
+    崩溃时文件要么是旧内容，要么是新内容，不会被截断
+    """
+    directory = os.path.dirname(file_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+def patch_in_place(file_path: str, replacements: List[tuple]) -> None:
+    """
+    原位改写若干等长字节区间（如 [ ] <-> [x]）并fsync
+    每处修改都不改变文件结构，崩溃时文件仍然是合法的Markdown
+    """
+    with open(file_path, 'r+b') as f:
+        for start, _, new in replacements:
+            f.seek(start)
+            f.write(new)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _fsync_directory(directory: str) -> None:
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+class _WriteJob:
+    __slots__ = ('transform', 'expected_version', 'done', 'version', 'error')
+
+    def __init__(self, transform: Transform, expected_version: Optional[str]):
+        self.transform = transform
+        self.expected_version = expected_version
+        self.done = threading.Event()
+        self.version = None
+        self.error = None
+
+class _FileQueue:
+    __slots__ = ('lock', 'pending', 'users')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: List[_WriteJob] = []
+        # 已登记、尚未返回的写入数；为0时从WriteEngine._queues中移除，字典不随写过的文件数增长
+        self.users = 0
+
+class WriteEngine:
+    """
+    文件写入引擎：
+    - 每个文件一把锁，同一文件的写入串行执行
+    - 等待锁期间到达的同一文件的写入会被合并，由持锁者一次读取、依次应用、一次写入
+    - 整体重写使用临时文件 + fsync + os.replace；等长修改原位改写并fsync
+    - 写入前检查调用方提供的版本号（批次中之前的任务已修改内容时同样视为冲突），并在替换前确认文件未被外部修改，否则重试
+    - 设置process_lock后（多进程模式），提交期间同时持有该文件的进程间锁
+    """
+
+    def __init__(self, max_retries: int = 3):
+        self.max_retries = max_retries
+        # 提供 hold(key) 上下文管理器的进程间锁，见 cluster.ProcessLock
+        self.process_lock = None
+        self._queues: Dict[str, _FileQueue] = {}
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.coalesced_jobs = 0
+
+    def modify(self, file_path: str, transform: Transform, expected_version: Optional[str] = None) -> str:
+        """
+        对文件应用转换并写回，返回写入后的版本号
+        expected_version不为None且与当前版本不一致时抛出WriteConflict
+        """
+        job = _WriteJob(transform, expected_version)
+        with self._lock:
+            queue = self._queues.get(file_path)
+            if queue is None:
+                queue = self._queues[file_path] = _FileQueue()
+            queue.pending.append(job)
+            queue.users += 1
+
+        try:
+            with queue.lock:
+                if not job.done.is_set():
+                    with self._lock:
+                        batch = queue.pending
+                        queue.pending = []
+                    self._commit(file_path, batch)
+        finally:
+            with self._lock:
+                queue.users -= 1
+                if queue.users == 0 and self._queues.get(file_path) is queue:
+                    del self._queues[file_path]
+
+        if job.error is not None:
+            raise job.error
+        return job.version
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'commits': self.commits,
+                'coalescedJobs': self.coalesced_jobs,
+                'pendingJobs': sum(len(q.pending) for q in self._queues.values()),
+                'activeFiles': len(self._queues),
+            }
+
+    def _commit(self, file_path: str, batch: List[_WriteJob]) -> None:
+        try:
+            with self.process_lock.hold(file_path) if self.process_lock is not None else nullcontext():
+                for _ in range(self.max_retries):
+                    if self._try_commit(file_path, batch):
+                        return
+                for job in batch:
+                    job.error = WriteConflict(f"文件在写入期间被反复修改: {file_path}")
+        except Exception as e:
+            for job in batch:
+                job.error = e
+        finally:
+            for job in batch:
+                job.done.set()
+
+    def _try_commit(self, file_path: str, batch: List[_WriteJob]) -> bool:
+        """
+        读取一次、依次应用批次中的所有转换、写入一次
+        文件在读取后被外部修改时返回False，由调用方重试
+        """
+        with timed('read'), open(file_path, 'rb') as f:
+            base_version = file_version(os.fstat(f.fileno()))
+            content = f.read()
+
+        with timed('serialize'):
+            new_content, replacements, in_place, errors = self._apply(base_version, content, file_path, batch)
+
+        if len(errors) < len(batch) and new_content != content:
+            if file_version(os.stat(file_path)) != base_version:
+                return False
+            with timed('write'):
+                if in_place:
+                    patch_in_place(file_path, replacements)
+                else:
+                    atomic_write(file_path, new_content)
+            version = file_version(os.stat(file_path))
+        else:
+            version = base_version
+
+        for job in batch:
+            job.error = errors.get(job)
+            job.version = version
+        with self._lock:
+            self.commits += 1
+            self.coalesced_jobs += len(batch) - 1
+        return True
+
+    def _apply(self, base_version: str, content: bytes, file_path: str, batch: List[_WriteJob]) -> tuple:
+        """
+        依次应用批次中的转换，返回 (新内容, 替换列表, 是否可原位改写, 出错的任务)
+        """
+        new_content = content
+        replacements = []
+        in_place = True
+        errors = {}
+        for job in batch:
+            # 批次中之前的任务已修改内容时，依次执行的话该任务看到的版本已经变化
+            if job.expected_version is not None and (job.expected_version != base_version or new_content != content):
+                errors[job] = WriteConflict(f"文件已被修改，请刷新后重试: {file_path}")
+                continue
+            try:
+                result = job.transform(new_content)
+            except Exception as e:
+                errors[job] = e
+                continue
+            if isinstance(result, bytes):
+                new_content = result
+                in_place = False
+            else:
+                if any(end - start != len(new) for start, end, new in result):
+                    in_place = False
+                new_content = splice(new_content, result)
+                replacements.extend(result)
+        return new_content, replacements, in_place, errors
+
+# 进程内共享的默认写入引擎，保证所有写入路径使用同一组文件锁
+WRITE_ENGINE = WriteEngine()
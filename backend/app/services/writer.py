@@ -1,47 +1,55 @@
 import os
 import re
+import logging
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
-from ..models import TableUpdate
+from ..models import TableUpdate, ProgressDelta, BulkProgressOperation, CellCondition
+from .parser import PROGRESS_MARKS, build_table_index, split_row
+from .write_engine import WriteEngine, WRITE_ENGINE, atomic_write
 
-def write_multiple_updates(updates: List[TableUpdate], root_dir: str) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+def resolve_data_path(root_dir: str, file_path_rel: str) -> str:
+    """
+    数据目录中的相对路径 -> 写入用的路径
+    解析 .. 和符号链接后不在数据目录中时（如 ../x.md、绝对路径）抛出ValueError
+    """
+    root = os.path.realpath(root_dir)
+    resolved = os.path.realpath(os.path.join(root, file_path_rel))
+    if resolved == root or os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"路径不在数据目录中: {file_path_rel}")
+    return os.path.join(root_dir, file_path_rel)
+
+def write_multiple_updates(updates: List[TableUpdate], root_dir: str,
+                           engine: Optional[WriteEngine] = None) -> Dict[str, Any]:
     """
     批量写入多个更新。按文件分组，对每个文件进行一次完整的读写操作，
     确保文件内的所有表格都被统一标准化。
+    写入通过WriteEngine完成：按文件加锁、原子替换，并检查baseVersion。
     """
+    engine = engine or WRITE_ENGINE
     results = {
         'success': True,
         'updated_files': [],
-        'errors': []
+        'errors': [],
+        'versions': {}
     }
-    
+
     updates_by_file = defaultdict(list)
     for update in updates:
         updates_by_file[update.filePath].append(update)
 
     for file_path_rel, file_updates in updates_by_file.items():
         try:
-            file_path_abs = os.path.join(root_dir, file_path_rel)
-            with open(file_path_abs, 'r', encoding='utf-8') as f:
-                current_content = f.read()
-            
+            file_path_abs = resolve_data_path(root_dir, file_path_rel)
             update_lookup = {up.tableIndex: up.newRows for up in file_updates}
-            
-            # 我们需要动态地查找表格，因为每次更新都会改变内容和表格位置
-            i = 0
-            while True:
-                table_pattern = r'(\|.*\|(?:\n\|.*\|)+)'
-                tables = list(re.finditer(table_pattern, current_content, re.MULTILINE))
-                if i >= len(tables):
-                    break
-                
-                rows_to_update = update_lookup.get(i)
-                current_content = update_table_in_content(current_content, i, rows_to_update)
-                i += 1
-
-            with open(file_path_abs, 'w', encoding='utf-8') as f:
-                f.write(current_content)
-            
+            expected_version = next((up.baseVersion for up in file_updates if up.baseVersion), None)
+
+            results['versions'][file_path_rel] = engine.modify(
+                file_path_abs,
+                lambda content, lookup=update_lookup: rewrite_tables(content, lookup),
+                expected_version
+            )
             results['updated_files'].append(file_path_rel)
 
         except Exception as e:
@@ -50,126 +58,512 @@ def write_multiple_updates(updates: List[TableUpdate], root_dir: str) -> Dict[st
                 'file': file_path_rel,
                 'error': str(e)
             })
-    
+
     return results
 
+def rewrite_tables(content: bytes, update_lookup: Dict[int, Optional[List[List[str]]]],
+                   normalize_all: bool = True) -> bytes:
+    """
+    根据解析器的表格位置索引，单遍重写文件中的表格。
+    update_lookup的键与解析结果中的表格编号（FileData.tables下标）一致；
+    normalize_all为True时，没有更新的表格也会被标准化（补充进度列）。
+    表格之外的内容、以及没有数据行的表格块（解析器不为其添加进度列）按原始字节保留。
+    """
+    parts = []
+    position = 0
+    for location in build_table_index(content):
+        if location['tableIndex'] is None or all(is_separator for _, _, is_separator in location['rows']):
+            continue
+        new_rows = update_lookup.get(location['tableIndex'])
+        if new_rows is None and not normalize_all:
+            continue
+        parts.append(content[position:location['start']])
+        parts.append(render_table(content, location, new_rows))
+        position = location['end']
+    parts.append(content[position:])
+    return b''.join(parts)
+
 def update_table_in_content(content: str, table_index: int, new_rows: Optional[List[List[str]]]) -> str:
     """
-    在内容中定位并更新单个表格。
+    在内容中定位并更新单个表格（表格编号与解析结果一致）。
+    """
+    encoded = content.encode('utf-8')
+    for location in build_table_index(encoded):
+        if location['tableIndex'] == table_index:
+            new_table = render_table(encoded, location, new_rows)
+            return (encoded[:location['start']] + new_table + encoded[location['end']:]).decode('utf-8')
+    return content
+
+def render_table(content: bytes, location: Dict[str, Any], new_rows: Optional[List[List[str]]]) -> bytes:
+    """
+    重写单个表格块，只修改进度列和分隔行，行与行之间的原始换行符保持不变。
     修复了因分隔行导致的数据索引错位问题。
     """
-    table_pattern = r'(\|.*\|(?:\n\|.*\|)+)'
-    tables = list(re.finditer(table_pattern, content, re.MULTILINE))
-    
-    if table_index >= len(tables):
-        return content
-    
-    target_table = tables[table_index]
-    original_table_text = target_table.group(1)
-    
-    original_lines = original_table_text.strip().split('\n')
-    new_table_lines = []
-    
-    original_header_cells = [h.strip() for h in original_lines[0].split('|')[1:-1]]
-    has_original_progress_col = original_header_cells and original_header_cells[-1] == '进度'
-    
-    # FIXED: 使用一个统一的游标来同步 new_rows 和 original_lines
+    has_original_progress_col = has_progress_column(location)
+    # 进度列在解析结果中的列号：已有时为表头最后一列，否则追加在表头之后
+    progress_index = len(location['header']) - 1 if has_original_progress_col else len(location['header'])
+
+    line_spans = [location['headerLine']]
+    if location['separatorLine'] is not None:
+        line_spans.append(location['separatorLine'])
+    line_spans.extend((start, end) for start, end, _ in location['rows'])
+
+    parts = []
+    position = location['start']
+
+    # FIXED: 使用一个统一的游标来同步 new_rows 和 数据行
     new_rows_cursor = 0
-    
-    for i, line in enumerate(original_lines):
-        line = line.rstrip()
-        
+
+    for i, (start, end) in enumerate(line_spans):
+        parts.append(content[position:start])
+        position = end
+        raw_line = content[start:end].decode('utf-8')
+        line = raw_line.rstrip()
+        trailing = raw_line[len(line):]
+
         is_header = i == 0
-        is_main_separator = i == 1 and '---' in line
+        is_main_separator = i == 1 and location['separatorLine'] is not None
 
         if is_header or is_main_separator:
             # 处理表头和主分隔行
             if not has_original_progress_col:
-                parts = line.rsplit('|', 1)
-                if len(parts) == 2:
-                    left, right = parts
-                    if is_header:
-                        new_line = f"{left}| 进度 |{right}"
-                    else: # is_main_separator
-                        new_line = f"{left}| ---- |{right}"
-                    new_table_lines.append(new_line)
-                else:
-                    new_table_lines.append(line)
+                parts.append(_append_cell(line, '进度' if is_header else '----', trailing))
             else:
-                new_table_lines.append(line)
+                parts.append(content[start:end])
             continue
 
         # --- 从这里开始，处理所有对应 new_rows 的行（数据行和自定义分隔行）---
-        
+
         # 安全检查，防止索引越界
         if new_rows and new_rows_cursor >= len(new_rows):
-            new_table_lines.append(line) # 如果 new_rows 数据不够，保留原始行
+            parts.append(content[start:end]) # 如果 new_rows 数据不够，保留原始行
             continue
 
-        cells_stripped = [c.strip() for c in line.split('|')[1:-1]]
-        is_custom_separator = not is_header and cells_stripped and all(c and all(char == '-' for char in c) for c in cells_stripped)
-        is_data_row = not is_header and not is_main_separator and not is_custom_separator
+        is_separator = location['rows'][new_rows_cursor][2]
+        cells_stripped = [c.strip() for c in split_row(line)[1:-1]]
+        is_custom_separator = is_separator and cells_stripped and all(c and all(char == '-' for char in c) for c in cells_stripped)
+        new_row = new_rows[new_rows_cursor] if new_rows else None
 
         # ----------------------------------------
         # Case 1: 需要添加新的进度列
         # ----------------------------------------
         if not has_original_progress_col:
-            parts = line.rsplit('|', 1)
-            if len(parts) == 2:
-                left, right = parts
-                if is_data_row:
-                    progress_state = '[ ]' # 默认值
-                    # 从 new_rows 获取正确的状态
-                    if new_rows and new_rows[new_rows_cursor]:
-                        progress_state = new_rows[new_rows_cursor][-1].strip()
-                    new_line = f"{left}| {progress_state} |{right}"
-                elif is_custom_separator:
-                    new_line = f"{left}| ---- |{right}"
-                else: # 其他未知行
-                    new_line = line
-                new_table_lines.append(new_line)
+            if is_custom_separator:
+                parts.append(_append_cell(line, '----', trailing))
             else:
-                new_table_lines.append(line)
-        
+                progress_state = '[ ]' # 默认值
+                # 从 new_rows 获取正确的状态
+                if new_row and not is_separator:
+                    progress_state = new_row[-1].strip()
+                parts.append(_set_cell(line, progress_index, progress_state, trailing, insert=True))
+
         # ----------------------------------------
         # Case 2: 已经有进度列，只需更新
         # ----------------------------------------
         else:
-            if is_data_row and new_rows: # 只在有更新数据时才修改现有进度列
-                progress_state = new_rows[new_rows_cursor][-1].strip()
-                cells = line.split('|')
-                if len(cells) > 2:
-                    original_cell = cells[-2]
-                    stripped_cell = original_cell.strip()
-                    leading_space = original_cell[:original_cell.find(stripped_cell)] if stripped_cell else ' '
-                    trailing_space = original_cell[original_cell.rfind(stripped_cell)+len(stripped_cell):] if stripped_cell else ' '
-                    cells[-2] = f"{leading_space}{progress_state}{trailing_space}"
-                    new_table_lines.append('|'.join(cells))
-                else:
-                    new_table_lines.append(line)
-            else: # 如果是自定义分隔行或没有更新数据，保留原样
-                new_table_lines.append(line)
-        
+            # 只在有更新数据且与解析结果不同时才修改现有进度列，未改动的行按原始字节保留
+            if not is_separator and new_row and new_row[-1].strip() != _progress_state(cells_stripped, progress_index):
+                parts.append(_set_cell(line, progress_index, new_row[-1].strip(), trailing))
+            else: # 如果是分隔行或没有更新数据，保留原样
+                parts.append(content[start:end])
+
         # FIXED: 无论当前行是数据行还是自定义分隔行，游标都必须前进
         new_rows_cursor += 1
 
-    new_table_text = '\n'.join(new_table_lines)
-    
-    return content[:target_table.start()] + new_table_text + content[target_table.end():]
+    return b''.join(parts)
+
+def has_progress_column(location: Dict[str, Any]) -> bool:
+    """
+    表格是否已有进度列，与解析器的判断一致（最后一列大多为[ ]/[x]）
+    表头为"进度"但内容不是进度标记（如"50%"）时不算，写入时与读取时一样追加新的进度列，不覆盖原有内容
+    """
+    return location['hasProgressColumn']
+
+def apply_progress_deltas(deltas: List[ProgressDelta], root_dir: str,
+                          engine: Optional[WriteEngine] = None) -> Dict[str, Any]:
+    """
+    按行应用进度增量。按文件分组，每个文件只读取一次；
+    目标表格已有进度列且单元格长度不变时（[ ] <-> [x]），直接在文件中原位改写这几个字节，
+    否则（需要补充进度列等）重写受影响的表格。
+    某个文件中任一增量无效时，该文件的所有增量都不会被应用。
+    携带rowCells的增量按行内容核对，results['deltas']为实际应用的增量（对应后的行号），
+    remapped/dropped为行号被改变和找不到对应行而丢弃的增量数
+    """
+    engine = engine or WRITE_ENGINE
+    results = {
+        'success': True,
+        'updated_files': [],
+        'errors': [],
+        'versions': {},
+        'deltas': [],
+        'remapped': 0,
+        'dropped': 0
+    }
+
+    deltas_by_file = defaultdict(list)
+    for delta in deltas:
+        deltas_by_file[delta.filePath].append(delta)
+
+    for file_path_rel, file_deltas in deltas_by_file.items():
+        try:
+            file_path_abs = resolve_data_path(root_dir, file_path_rel)
+            expected_version = next((d.baseVersion for d in file_deltas if d.baseVersion), None)
+            # 写入冲突重试时转换会再次执行，只保留最后一次的结果
+            applied = []
+
+            def transform(content, file_deltas=file_deltas, applied=applied):
+                applied.clear()
+                return build_delta_replacements(content, file_deltas, applied)
+
+            results['versions'][file_path_rel] = engine.modify(file_path_abs, transform, expected_version)
+            results['updated_files'].append(file_path_rel)
+            results['deltas'].extend(applied)
+            originals = {id(delta) for delta in file_deltas}
+            results['remapped'] += sum(1 for delta in applied if id(delta) not in originals)
+            results['dropped'] += len(file_deltas) - len(applied)
+
+        except Exception as e:
+            results['success'] = False
+            results['errors'].append({
+                'file': file_path_rel,
+                'error': str(e)
+            })
+
+    return results
+
+def build_delta_replacements(content: bytes, deltas: List[ProgressDelta],
+                             applied: Optional[List[ProgressDelta]] = None) -> List[tuple]:
+    """
+    将单个文件的进度增量转换为按起始位置排序的 (起始字节, 结束字节, 新内容) 列表
+    同一行出现多次时以最后一次为准
+    携带rowCells的增量先按行内容核对（见locate_delta），找不到对应的行时丢弃并记录警告；
+    applied不为None时依次追加实际应用的增量
+    """
+    locations = {
+        location['tableIndex']: location
+        for location in build_table_index(content)
+        if location['tableIndex'] is not None
+    }
+
+    states_by_table = defaultdict(dict)
+    for delta in deltas:
+        if delta.rowCells is not None:
+            located = locate_delta(content, locations.get(delta.tableIndex), delta)
+            if located is None:
+                logger.warning("%s 已被修改，表格 %d 第 %d 行的进度增量找不到对应的行，已丢弃",
+                               delta.filePath, delta.tableIndex, delta.rowIndex)
+                continue
+            delta = located
+        states_by_table[delta.tableIndex][delta.rowIndex] = '[x]' if delta.checked else '[ ]'
+        if applied is not None:
+            applied.append(delta)
+
+    replacements = []
+    for table_index, states in states_by_table.items():
+        location = locations.get(table_index)
+        if location is None:
+            raise Exception(f"表格不存在: {table_index}")
+        rows = location['rows']
+        for row_index in states:
+            if row_index < 0 or row_index >= len(rows):
+                raise Exception(f"行不存在: 表格 {table_index} 第 {row_index} 行")
+            if rows[row_index][2]:
+                raise Exception(f"不能修改分隔行: 表格 {table_index} 第 {row_index} 行")
+        replacements.extend(_progress_replacements(content, location, states))
+
+    replacements.sort(key=lambda r: r[0])
+    return replacements
+
+def locate_delta(content: bytes, location: Optional[Dict[str, Any]], delta: ProgressDelta) -> Optional[ProgressDelta]:
+    """
+    按行内容核对增量: 原位置上的行单元格与rowCells相同时原样返回，
+    否则对应到同一表格中单元格相同的第一个数据行（返回改了行号的副本），找不到时返回None
+    """
+    if location is None:
+        return None
+    rows = location['rows']
+    if 0 <= delta.rowIndex < len(rows) and not rows[delta.rowIndex][2] \
+            and _row_cells(content, rows[delta.rowIndex], location)[:-1] == delta.rowCells:
+        return delta
+    for row_index, row in enumerate(rows):
+        if not row[2] and _row_cells(content, row, location)[:-1] == delta.rowCells:
+            return delta.model_copy(update={'rowIndex': row_index})
+    return None
+
+def _progress_replacements(content: bytes, location: Dict[str, Any], states: Dict[int, str]) -> List[tuple]:
+    """
+    把单个表格中若干行的进度改为states中的值（行号 -> '[ ]'/'[x]'）
+    已有进度列时逐行原位替换进度列（表头最后一列）；否则补充进度列并重写整个表格
+    """
+    rows = location['rows']
+    if has_progress_column(location):
+        replacements = []
+        progress_index = len(location['header']) - 1
+        for row_index, state in states.items():
+            start, end, _ = rows[row_index]
+            line = content[start:end].decode('utf-8')
+            body = line.rstrip()
+            replacements.append((start, end, _set_cell(body, progress_index, state, line[len(body):])))
+        return replacements
+    # 没有进度列时，其余行的进度都是默认值，补充进度列并写入新状态
+    new_rows = [
+        [] if is_separator else [states.get(i, '[ ]')]
+        for i, (_, _, is_separator) in enumerate(rows)
+    ]
+    return [(location['start'], location['end'], render_table(content, location, new_rows))]
+
+def apply_bulk_progress(operations: List[BulkProgressOperation], root_dir: str,
+                        engine: Optional[WriteEngine] = None) -> Dict[str, Any]:
+    """
+    批量设置或清除进度。按文件分组，每个文件只读取、定位一次，在同一次写入中应用该文件的所有操作；
+    选择在写入时对文件当前内容进行，不依赖调用方已知的行内容。
+    除写入服务的通用结果外还返回:
+    - affected: 每个文件 {'matched': 选中的行数, 'changed': 状态实际改变的行数}
+    - deltas: 状态实际改变的行（ProgressDelta），供统计和推送使用
+    """
+    engine = engine or WRITE_ENGINE
+    results = {
+        'success': True,
+        'updated_files': [],
+        'errors': [],
+        'versions': {},
+        'affected': {},
+        'deltas': []
+    }
+
+    operations_by_file = defaultdict(list)
+    for operation in operations:
+        operations_by_file[operation.filePath].append(operation)
+
+    for file_path_rel, file_operations in operations_by_file.items():
+        outcome = {}
+        try:
+            file_path_abs = resolve_data_path(root_dir, file_path_rel)
+            expected_version = next((op.baseVersion for op in file_operations if op.baseVersion), None)
+
+            results['versions'][file_path_rel] = engine.modify(
+                file_path_abs,
+                lambda content, ops=file_operations, outcome=outcome: build_bulk_replacements(content, ops, outcome),
+                expected_version
+            )
+            results['updated_files'].append(file_path_rel)
+            results['affected'][file_path_rel] = {'matched': outcome['matched'], 'changed': len(outcome['changed'])}
+            results['deltas'].extend(
+                ProgressDelta(filePath=file_path_rel, tableIndex=table_index, rowIndex=row_index, checked=checked)
+                for (table_index, row_index), checked in outcome['changed'].items()
+            )
+
+        except Exception as e:
+            results['success'] = False
+            results['errors'].append({
+                'file': file_path_rel,
+                'error': str(e)
+            })
+
+    return results
+
+def build_bulk_replacements(content: bytes, operations: List[BulkProgressOperation],
+                            outcome: Dict[str, Any]) -> List[tuple]:
+    """
+    将单个文件的批量操作转换为替换列表（格式同build_delta_replacements）
+    多个操作选中同一行时以最后一个为准；outcome中记录选中的行数和状态实际改变的行
+    (tableIndex, rowIndex) -> checked，写入重试时会被重新计算
+    """
+    locations = [location for location in build_table_index(content) if location['tableIndex'] is not None]
+    by_index = {location['tableIndex']: location for location in locations}
+
+    targets_by_table = defaultdict(dict)
+    for operation in operations:
+        conditions = compile_conditions(operation.where)
+        if operation.tableIndex is None:
+            # 不指定表格时作用于文件中的所有表格，不存在所选分段或列的表格直接跳过
+            for location in locations:
+                for row_index in select_rows(content, location, operation, conditions, strict=False):
+                    targets_by_table[location['tableIndex']][row_index] = operation.checked
+        else:
+            location = by_index.get(operation.tableIndex)
+            if location is None:
+                raise Exception(f"表格不存在: {operation.tableIndex}")
+            for row_index in select_rows(content, location, operation, conditions, strict=True):
+                targets_by_table[location['tableIndex']][row_index] = operation.checked
+
+    replacements = []
+    changed = {}
+    for table_index, targets in targets_by_table.items():
+        location = by_index[table_index]
+        rows = location['rows']
+        if has_progress_column(location):
+            progress_index = len(location['header']) - 1
+            current = {row_index: _cell_at(content, rows[row_index], progress_index) for row_index in targets}
+            states = {
+                row_index: '[x]' if checked else '[ ]'
+                for row_index, checked in targets.items()
+                if current[row_index] != ('[x]' if checked else '[ ]')
+            }
+            # 原有内容不是规范的进度标记（如空单元格）时，改写后状态不一定改变
+            changed.update(((table_index, row_index), targets[row_index]) for row_index in states
+                           if (current[row_index] == '[x]') != targets[row_index])
+        else:
+            # 没有进度列时所有行都未完成，只有设置为完成的行需要写入
+            states = {row_index: '[x]' for row_index, checked in targets.items() if checked}
+            changed.update(((table_index, row_index), True) for row_index in states)
+        if states:
+            replacements.extend(_progress_replacements(content, location, states))
+
+    outcome['matched'] = sum(len(targets) for targets in targets_by_table.values())
+    outcome['changed'] = changed
+    replacements.sort(key=lambda r: r[0])
+    return replacements
+
+def compile_conditions(conditions: List[CellCondition]) -> List[tuple]:
+    """
+    把单元格条件转换为 (列名或列号, 判断函数) 列表；条件无效时抛出ValueError
+    """
+    compiled = []
+    for condition in conditions:
+        checks = []
+        if condition.equals is not None:
+            checks.append(lambda value, expected=condition.equals: value == expected)
+        if condition.contains is not None:
+            checks.append(lambda value, part=condition.contains: part in value)
+        if condition.regex is not None:
+            try:
+                pattern = re.compile(condition.regex)
+            except re.error as e:
+                raise ValueError(f"无效的正则表达式 {condition.regex!r}: {e}")
+            checks.append(lambda value, pattern=pattern: pattern.search(value) is not None)
+        if not checks:
+            raise ValueError(f"列 {condition.column!r} 的条件缺少 equals/contains/regex")
+        compiled.append((condition.column, lambda value, checks=checks: all(check(value) for check in checks)))
+    return compiled
+
+def select_rows(content: bytes, location: Dict[str, Any], operation: BulkProgressOperation,
+                conditions: List[tuple], strict: bool) -> List[int]:
+    """
+    返回表格中被操作选中的数据行号（分隔行永远不会被选中）
+    - start/end: 行号范围 [start, end)，与TableData.rows的下标一致
+    - section: 以分隔行划分的第几个分段（只计非空的分段，与/api/stats一致）
+    - where: 单元格条件（AND），列可以是列号或表头名称，单元格内容与/api/table返回的一致
+    strict为False时，分段或列不存在的表格返回空列表，否则抛出异常
+    """
+    rows = location['rows']
+    table_index = location['tableIndex']
+    start = max(operation.start or 0, 0)
+    end = len(rows) if operation.end is None else min(operation.end, len(rows))
+
+    if operation.section is not None:
+        bounds = _section_bounds(rows, operation.section)
+        if bounds is None:
+            if strict:
+                raise Exception(f"分段不存在: 表格 {table_index} 第 {operation.section} 段")
+            return []
+        start, end = max(start, bounds[0]), min(end, bounds[1])
+
+    header = list(location['header'])
+    if not location['hasProgressColumn']:
+        header.append('进度')
+    columns = []
+    for column, check in conditions:
+        position = column if isinstance(column, int) else (header.index(column) if column in header else -1)
+        if not 0 <= position < len(header):
+            if strict:
+                raise Exception(f"列不存在: 表格 {table_index} {column!r}")
+            return []
+        columns.append((position, check))
+
+    selected = []
+    for row_index in range(start, end):
+        row = rows[row_index]
+        if row[2]:
+            continue
+        if columns:
+            cells = _row_cells(content, row, location)
+            if not all(check(cells[position]) for position, check in columns):
+                continue
+        selected.append(row_index)
+    return selected
+
+def _section_bounds(rows: List[tuple], section: int) -> Optional[tuple]:
+    # 第section个非空分段的行号范围 [start, end)
+    count = 0
+    start = 0
+    for row_index in range(len(rows) + 1):
+        if row_index == len(rows) or rows[row_index][2]:
+            if row_index > start:
+                if count == section:
+                    return start, row_index
+                count += 1
+            start = row_index + 1
+    return None
+
+def _row_cells(content: bytes, row: tuple, location: Dict[str, Any]) -> List[str]:
+    """
+    还原单行的单元格，与解析结果（TableData.rows）一致：按表头补齐或截断，进度列规范为[ ]/[x]
+    """
+    start, end, _ = row
+    cells = [c.strip() for c in split_row(content[start:end].decode('utf-8'))[1:-1]]
+    header_count = len(location['header'])
+    cells = (cells + [''] * header_count)[:header_count]
+    if location['hasProgressColumn']:
+        if cells[-1] != '[x]':
+            cells[-1] = '[ ]'
+    else:
+        cells.append('[ ]')
+    return cells
+
+def _cell_at(content: bytes, row: tuple, index: int) -> str:
+    # 行中第index列的内容（与_set_cell改写的位置相同），该列不存在时为空
+    start, end, _ = row
+    cells = split_row(content[start:end].decode('utf-8').rstrip())[1:-1]
+    return cells[index].strip() if index < len(cells) else ''
+
+def _append_cell(line: str, value: str, trailing: str) -> bytes:
+    """
+    在最后一个 | 之前追加一列
+    """
+    left, right = line.rsplit('|', 1)
+    return f"{left}| {value} |{right}{trailing}".encode('utf-8')
+
+def _progress_state(cells: List[str], index: int) -> str:
+    """
+    行中进度列在解析结果中的值：不是[ ]/[x]（含缺少的单元格）时与解析器一样视为[ ]
+    """
+    if index < len(cells) and cells[index] in PROGRESS_MARKS:
+        return cells[index]
+    return '[ ]'
+
+def _set_cell(line: str, index: int, value: str, trailing: str, insert: bool = False) -> bytes:
+    """
+    设置第index列（与解析结果的列号一致）的内容，保留单元格两侧原有的空白
+    行的列数不足时先补齐空单元格；insert为True时在该位置插入新列，多出表头的单元格向后移
+    """
+    cells = split_row(line)
+    # cells[0]是第一个 | 之前的内容，cells[-1]是最后一个 | 之后的内容
+    position = index + 1
+    while len(cells) - 1 < position:
+        cells.insert(len(cells) - 1, ' ')
+    if insert or len(cells) - 1 == position:
+        cells.insert(position, f" {value} ")
+        return ('|'.join(cells) + trailing).encode('utf-8')
+    original_cell = cells[position]
+    stripped_cell = original_cell.strip()
+    leading_space = original_cell[:original_cell.find(stripped_cell)] if stripped_cell else ' '
+    trailing_space = original_cell[original_cell.rfind(stripped_cell)+len(stripped_cell):] if stripped_cell else ' '
+    cells[position] = f"{leading_space}{value}{trailing_space}"
+    return ('|'.join(cells) + trailing).encode('utf-8')
 
 
 # 单文件写入函数现在不再被直接调用，但可以保留以备将来使用或测试
 def write_updates_to_file(update_data: TableUpdate, root_dir: str) -> bool:
-    file_path = os.path.join(root_dir, update_data.filePath)
+    file_path = resolve_data_path(root_dir, update_data.filePath)
     if not os.path.exists(file_path):
         raise Exception(f"文件不存在: {file_path}")
     with open(file_path, 'r', encoding='utf-8') as f:
         original_content = f.read()
     updated_content = update_table_in_content(
-        original_content, 
-        update_data.tableIndex, 
+        original_content,
+        update_data.tableIndex,
         update_data.newRows
     )
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(updated_content)
-    return True
\ No newline at end of file
+    atomic_write(file_path, updated_content.encode('utf-8'))
+    return True
@@ -0,0 +1,8 @@
+"""
+性能基准测试
+
+在 backend 目录下运行，例如:
+    python -m benchmarks.bench_scan --files 5000 --workers 1,2,4,8
+    python -m benchmarks.bench_api --files 2000 --output api.json
+    python -m benchmarks.compare base.json api.json
+"""
@@ -0,0 +1,99 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+from .common import emit, percentiles
+from .corpus import add_corpus_arguments, corpus_from_args, WORDS
+
+def measure(request: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    发出requests次请求（concurrency个线程并发），返回延迟分布、吞吐量和非2xx响应数
+    """
+    def one(i: int):
+        started_at = time.perf_counter()
+        response = request(i)
+        return time.perf_counter() - started_at, response.status_code
+
+    started_at = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one, range(requests)))
+    else:
+        outcomes = [one(i) for i in range(requests)]
+    seconds = time.perf_counter() - started_at
+
+    result = percentiles([latency for latency, _ in outcomes])
+    result['rps'] = round(requests / seconds, 1)
+    result['errors'] = sum(1 for _, status in outcomes if status >= 300)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="使用进程内的TestClient测量各API的延迟和吞吐量")
+    add_corpus_arguments(parser, files=500, tables=3, rows=100)
+    parser.add_argument('--requests', type=int, default=200, help="每个接口的请求数")
+    parser.add_argument('--concurrency', type=int, default=1, help="并发的请求线程数")
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = args.data or os.path.join(tmp_dir, 'data')
+        if not args.data:
+            corpus_from_args(root_dir, args)
+        # app.main在导入时读取配置，需要先设置环境变量；日志和快照写到临时目录
+        os.environ['DATA_DIR'] = root_dir
+        os.environ['SAVE_JOURNAL_PATH'] = os.path.join(tmp_dir, 'save-journal')
+        os.environ['PARSE_SNAPSHOT_PATH'] = os.path.join(tmp_dir, 'parse-snapshot')
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.services import PHASE_SECONDS
+
+        started_at = time.perf_counter()
+        with TestClient(app) as client:
+            files = client.get('/api/files').json()['files']
+            startup_seconds = time.perf_counter() - started_at
+            paths = [f['filePath'] for f in files if f['tables']]
+            if not paths:
+                raise SystemExit("数据目录中没有包含表格的文件")
+
+            def delta(i: int):
+                # 保存只切换进度，不修改表格结构；文件可能是已有的数据，只在临时数据上运行
+                return client.post('/api/save/delta', json={'deltas': [{
+                    'filePath': paths[i % len(paths)], 'tableIndex': 0, 'rowIndex': 0, 'checked': i % 2 == 0
+                }]})
+
+            endpoints: List[tuple] = [
+                ('files', lambda i: client.get('/api/files')),
+                ('structure', lambda i: client.get('/api/structure')),
+                ('structure_gzip', lambda i: client.get('/api/structure', headers={'Accept-Encoding': 'gzip'})),
+                ('file', lambda i: client.get('/api/file', params={'path': paths[i % len(paths)]})),
+                ('table', lambda i: client.get('/api/table', params={'path': paths[i % len(paths)], 'index': 0, 'limit': 100})),
+                ('file_tree', lambda i: client.get('/api/file-tree')),
+                ('stats', lambda i: client.get('/api/stats')),
+                ('search', lambda i: client.get('/api/search', params={'q': WORDS[i % len(WORDS)]})),
+            ]
+            if not args.data:
+                endpoints.append(('save_delta', delta))
+
+            results = {}
+            for name, request in endpoints:
+                results[name] = measure(request, args.requests, args.concurrency)
+                result = results[name]
+                print(f"{name:<15} p50 {result['p50Ms']:9.3f}ms  p99 {result['p99Ms']:9.3f}ms  "
+                      f"{result['rps']:9.1f} req/s  errors={result['errors']}")
+
+    phases = {labels[0]: {'count': value['count'], 'seconds': round(value['sum'], 4)}
+              for labels, value in PHASE_SECONDS.snapshot().items()}
+    emit({
+        'benchmark': 'api',
+        'files': len(files),
+        'concurrency': args.concurrency,
+        'startupSeconds': round(startup_seconds, 4),
+        'results': results,
+        'phases': phases
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
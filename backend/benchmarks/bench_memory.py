@@ -0,0 +1,65 @@
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from app.services.parser import iter_markdown_files, parse_markdown_file, parse_markdown_file_compact
+from .common import emit
+from .corpus import generate_corpus
+
+def measure(parse, file_paths, root_dir) -> dict:
+    """
+    解析全部文件并保持结果常驻，返回占用的内存（tracemalloc统计）和耗时
+    """
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    resident = [parse(file_path, root_dir) for file_path in file_paths]
+    seconds = time.perf_counter() - started_at
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resident
+    return {'bytes': current, 'peakBytes': peak, 'seconds': round(seconds, 4)}
+
+def main():
+    parser = argparse.ArgumentParser(description="比较Pydantic模型与紧凑表示常驻内存时的占用")
+    parser.add_argument('--data', help="使用已有的数据目录（默认生成临时的合成数据）")
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--tables', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--columns', type=int, default=3)
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = args.data or tmp_dir
+        if args.data:
+            file_paths = list(iter_markdown_files(root_dir))
+            disk_bytes = sum(len(open(p, 'rb').read()) for p in file_paths)
+        else:
+            disk_bytes = generate_corpus(root_dir, files=args.files, tables_per_file=args.tables,
+                                         rows_per_table=args.rows, columns=args.columns)['bytes']
+            file_paths = list(iter_markdown_files(root_dir))
+
+        results = {
+            'pydantic': measure(parse_markdown_file, file_paths, root_dir),
+            'compact': measure(parse_markdown_file_compact, file_paths, root_dir),
+        }
+
+    for name, result in results.items():
+        print(f"{name:<9} {result['bytes'] / 1048576:8.2f} MiB  x{result['bytes'] / disk_bytes:5.2f} of disk  "
+              f"peak {result['peakBytes'] / 1048576:8.2f} MiB  {result['seconds']:.3f}s")
+    ratio = results['pydantic']['bytes'] / results['compact']['bytes']
+    print(f"disk      {disk_bytes / 1048576:8.2f} MiB  compact is {ratio:.1f}x smaller")
+
+    emit({
+        'benchmark': 'memory',
+        'files': len(file_paths),
+        'diskBytes': disk_bytes,
+        'results': results,
+        'ratio': round(ratio, 2)
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
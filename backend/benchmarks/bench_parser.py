@@ -0,0 +1,73 @@
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+from app.models import ProgressDelta
+from app.services import WriteEngine, apply_progress_deltas, build_table_index
+from app.services.parser import iter_markdown_files, parse_markdown_file, parse_markdown_file_compact
+from app.services.writer import build_delta_replacements, update_table_in_content
+from .common import emit, percentiles
+from .corpus import add_corpus_arguments, corpus_from_args
+
+def run(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started_at)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="解析器和写入器的微基准测试（单个文件上的各个操作）")
+    add_corpus_arguments(parser, files=1, tables=5, rows=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = args.data or tmp_dir
+        if not args.data:
+            corpus_from_args(root_dir, args)
+        file_path = max(iter_markdown_files(root_dir), key=os.path.getsize)
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        text = content.decode('utf-8')
+        compact = parse_markdown_file_compact(file_path, root_dir)
+        rel_path = compact.filePath
+        # 在最大的表格中每隔若干个数据行切换一次进度（约100个增量）
+        table_index = max(range(len(compact.tables)), key=lambda i: compact.tables[i].row_count)
+        table = compact.tables[table_index]
+        new_rows = table.rows()
+        step = max(1, table.data_row_count // 100)
+        deltas = [ProgressDelta(filePath=rel_path, tableIndex=table_index, rowIndex=row_index, checked=data_index % 2 == 0)
+                  for row_index, data_index in table.iter_data_rows() if data_index % step == 0]
+        engine = WriteEngine()
+
+        results = {
+            'parse_markdown_file': run(lambda: parse_markdown_file(file_path, root_dir), args.repeat),
+            'parse_markdown_file_compact': run(lambda: parse_markdown_file_compact(file_path, root_dir), args.repeat),
+            'build_table_index': run(lambda: build_table_index(content), args.repeat),
+            'update_table_in_content': run(lambda: update_table_in_content(text, table_index, new_rows), args.repeat),
+            'build_delta_replacements': run(lambda: build_delta_replacements(content, deltas), args.repeat),
+        }
+        if args.data:
+            print("使用已有的数据目录时跳过 apply_progress_deltas（会修改文件）")
+        else:
+            results['apply_progress_deltas'] = run(
+                lambda: apply_progress_deltas(deltas, root_dir, engine=engine), args.repeat)
+
+    for name, result in results.items():
+        print(f"{name:<28} p50 {result['p50Ms']:9.3f}ms  p90 {result['p90Ms']:9.3f}ms")
+
+    emit({
+        'benchmark': 'parser',
+        'fileBytes': len(content),
+        'tables': len(compact.tables),
+        'rows': sum(t.row_count for t in compact.tables),
+        'deltas': len(deltas),
+        'results': results
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
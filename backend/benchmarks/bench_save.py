@@ -0,0 +1,78 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from .common import emit, percentiles
+from .corpus import add_corpus_arguments, corpus_from_args
+
+def main():
+    parser = argparse.ArgumentParser(description="多个客户端同时自动保存（/api/save 整表更新）时的吞吐量和提交延迟")
+    add_corpus_arguments(parser, files=200, tables=3, rows=200)
+    parser.add_argument('--clients', default='1,4,16,32', help="逗号分隔的并发客户端数")
+    parser.add_argument('--requests', type=int, default=20, help="每个客户端的保存次数")
+    parser.add_argument('--hot-files', type=int, default=4, help="客户端保存的文件数（越少竞争越激烈）")
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+    if args.data:
+        raise SystemExit("保存会修改文件，只在生成的临时数据上运行")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = os.path.join(tmp_dir, 'data')
+        corpus_from_args(root_dir, args)
+        os.environ['DATA_DIR'] = root_dir
+        os.environ['SAVE_JOURNAL_PATH'] = os.path.join(tmp_dir, 'save-journal')
+        os.environ['PARSE_SNAPSHOT_PATH'] = os.path.join(tmp_dir, 'parse-snapshot')
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with TestClient(app) as client:
+            paths = [f['filePath'] for f in client.get('/api/files').json()['files'] if f['tables']][:args.hot_files]
+            files = [client.get('/api/file', params={'path': path}).json() for path in paths]
+            if not files:
+                raise SystemExit("数据目录中没有包含表格的文件")
+
+            def autosave(client_index: int) -> List[Dict[str, Any]]:
+                # 每个客户端轮流保存热点文件的第一个表格，每次切换自己负责的一行
+                outcomes = []
+                for i in range(args.requests):
+                    f = files[(client_index + i) % len(files)]
+                    rows = [list(row) for row in f['tables'][0]['rows']]
+                    row = rows[client_index % len(rows)]
+                    if row:
+                        row[-1] = '[x]' if i % 2 == 0 else '[ ]'
+                    started_at = time.perf_counter()
+                    response = client.post('/api/save', json={'updates': [
+                        {'filePath': f['filePath'], 'tableIndex': 0, 'newRows': rows}]})
+                    body = response.json()
+                    outcomes.append({'latency': time.perf_counter() - started_at, 'ok': body.get('success', False),
+                                     'commitMs': body.get('commitMs')})
+                return outcomes
+
+            results = {}
+            for clients in [int(value) for value in args.clients.split(',')]:
+                started_at = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    outcomes = [outcome for batch in pool.map(autosave, range(clients)) for outcome in batch]
+                seconds = time.perf_counter() - started_at
+                result = percentiles([outcome['latency'] for outcome in outcomes])
+                result['rps'] = round(len(outcomes) / seconds, 1)
+                result['errors'] = sum(1 for outcome in outcomes if not outcome['ok'])
+                commit = sorted(outcome['commitMs'] for outcome in outcomes if outcome['commitMs'] is not None)
+                result['commitP50Ms'] = commit[len(commit) // 2] if commit else None
+                results[str(clients)] = result
+                print(f"clients {clients:<4} {result['rps']:9.1f} req/s  p50 {result['p50Ms']:9.3f}ms  "
+                      f"p99 {result['p99Ms']:9.3f}ms  errors={result['errors']}")
+            scheduler = client.get('/health').json().get('saveScheduler')
+
+    emit({
+        'benchmark': 'save',
+        'files': len(files),
+        'results': results,
+        'scheduler': scheduler
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
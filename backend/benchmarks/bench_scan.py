@@ -0,0 +1,47 @@
+import argparse
+import os
+import tempfile
+import time
+from app.services import scan_directory
+from .common import emit
+from .corpus import generate_corpus
+
+def time_scan(root_dir: str, workers: int, repeat: int) -> float:
+    """
+    返回多次全量扫描（不使用缓存）中最快的一次耗时
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        scan_directory(root_dir, workers=workers)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="比较串行与多进程全量扫描的耗时")
+    parser.add_argument('--data', help="使用已有的数据目录（默认生成临时的合成数据）")
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--tables', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}", help="逗号分隔的进程数列表")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = args.data or tmp_dir
+        if not args.data:
+            generate_corpus(root_dir, files=args.files, tables_per_file=args.tables, rows_per_table=args.rows)
+
+        results = []
+        baseline = None
+        for workers in [int(w) for w in args.workers.split(',')]:
+            seconds = time_scan(root_dir, workers, args.repeat)
+            baseline = baseline or seconds
+            results.append({'workers': workers, 'seconds': round(seconds, 4), 'speedup': round(baseline / seconds, 2)})
+            print(f"workers={workers:<3} {seconds:8.3f}s  x{baseline / seconds:.2f}")
+
+    emit({'benchmark': 'scan', 'results': results}, args.output)
+
+if __name__ == '__main__':
+    main()
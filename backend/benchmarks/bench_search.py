@@ -0,0 +1,72 @@
+import argparse
+import tempfile
+import time
+from app.services import SearchIndex
+from app.services.parser import iter_markdown_files, load_markdown_files
+from .common import emit
+from .corpus import generate_corpus, WORDS
+
+def time_query(index: SearchIndex, query: str, repeat: int) -> tuple:
+    """
+    返回多次查询中最快的一次耗时和命中行数
+    """
+    best = float('inf')
+    total = 0
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        total = index.search(query)['total']
+        best = min(best, time.perf_counter() - started_at)
+    return best, total
+
+def main():
+    parser = argparse.ArgumentParser(description="测量搜索索引的构建、增量更新和查询耗时")
+    parser.add_argument('--data', help="使用已有的数据目录（默认生成临时的合成数据）")
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--tables', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--columns', type=int, default=2, help="每行的非进度列数，默认共1M个单元格")
+    parser.add_argument('--queries', default=','.join([WORDS[0], WORDS[0][:1], WORDS[11].split()[0][:3], f"{WORDS[2]} {WORDS[3]}", 'nomatch']),
+                        help="逗号分隔的查询列表")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = args.data or tmp_dir
+        if not args.data:
+            generate_corpus(root_dir, files=args.files, tables_per_file=args.tables,
+                            rows_per_table=args.rows, columns=args.columns)
+        parsed = load_markdown_files(list(iter_markdown_files(root_dir)), root_dir)
+        files = {file_data.filePath: file_data for file_data in parsed.values()}
+
+    cells = sum(table.data_row_count * len(table.columns) for file_data in files.values() for table in file_data.tables)
+    index = SearchIndex()
+    index.on_index_change(files, True)
+    started_at = time.perf_counter()
+    index.refresh()
+    build_seconds = time.perf_counter() - started_at
+    print(f"cells={cells}  build {build_seconds:.3f}s")
+
+    file_path, file_data = next(iter(files.items()))
+    started_at = time.perf_counter()
+    index.on_index_change({file_path: file_data}, False)
+    index.refresh()
+    update_ms = (time.perf_counter() - started_at) * 1000
+    print(f"update one file {update_ms:.3f}ms")
+
+    results = []
+    for query in args.queries.split(','):
+        seconds, total = time_query(index, query, args.repeat)
+        results.append({'query': query, 'hits': total, 'ms': round(seconds * 1000, 3)})
+        print(f"{query!r:<24} hits={total:<8} {seconds * 1000:8.3f}ms")
+
+    emit({
+        'benchmark': 'search',
+        'cells': cells,
+        'buildSeconds': round(build_seconds, 4),
+        'updateMs': round(update_ms, 3),
+        'results': results
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional
+from .common import emit, percentiles
+from .corpus import add_corpus_arguments, corpus_from_args
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def get(url: str, timeout: float) -> Optional[bytes]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.read() if response.status == 200 else None
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return None
+
+def start_once(root_dir: str, state_dir: str, warmup: str, timeout: float) -> Dict[str, Any]:
+    """
+    启动一个uvicorn进程，测量从启动进程到第一次健康检查成功、以及到/api/files返回（索引就绪）的时间
+    """
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATA_DIR=root_dir, LOG_LEVEL='WARNING', STARTUP_WARMUP=warmup,
+               SAVE_JOURNAL_PATH=os.path.join(state_dir, 'save-journal'),
+               PARSE_SNAPSHOT_PATH=os.path.join(state_dir, 'parse-snapshot'))
+    started_at = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        healthy = None
+        while time.perf_counter() - started_at < timeout:
+            if process.poll() is not None:
+                raise SystemExit("服务进程意外退出")
+            if get(base + '/health', 1) is not None:
+                healthy = time.perf_counter() - started_at
+                break
+            time.sleep(0.005)
+        if healthy is None:
+            raise SystemExit(f"{timeout}s 内健康检查未成功")
+        # /api/files 等待索引就绪后才返回
+        get(base + '/api/files', timeout)
+        ready = time.perf_counter() - started_at
+        # 等待后台的预热和快照保存完成，读取服务端记录的启动耗时分解
+        startup = {}
+        while time.perf_counter() - started_at < timeout:
+            startup = json.loads(get(base + '/health', 1))['startup']
+            if 'warm' in startup['marks'] and ('snapshotSave' in startup['phases'] or not env['PARSE_SNAPSHOT_PATH']):
+                break
+            time.sleep(0.02)
+        return {'healthy': healthy, 'ready': ready, 'startup': startup}
+    finally:
+        process.terminate()
+        process.wait(10)
+
+def main():
+    parser = argparse.ArgumentParser(description="测量服务从启动到第一次健康检查成功（及索引就绪）的时间")
+    add_corpus_arguments(parser, files=2000, tables=3, rows=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--warmup', default='search', help="STARTUP_WARMUP的值")
+    parser.add_argument('--target-ms', type=float, default=3000,
+                        help="第一次健康检查成功的目标时间（中位数），超过时以非0状态退出")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = args.data or os.path.join(tmp_dir, 'data')
+        if not args.data:
+            corpus_from_args(root_dir, args)
+        state_dir = os.path.join(tmp_dir, 'state')
+        os.makedirs(state_dir)
+
+        results = {}
+        for mode in ('cold', 'snapshot'):
+            runs = []
+            for _ in range(args.repeat):
+                if mode == 'cold':
+                    # 冷启动: 没有解析快照，需要全量解析
+                    for name in os.listdir(state_dir):
+                        os.remove(os.path.join(state_dir, name))
+                runs.append(start_once(root_dir, state_dir, args.warmup, args.timeout))
+            results[mode] = {
+                'healthy': percentiles([run['healthy'] for run in runs]),
+                'ready': percentiles([run['ready'] for run in runs]),
+                'startup': runs[-1]['startup'],
+            }
+            print(f"{mode:<9} healthy p50 {results[mode]['healthy']['p50Ms']:9.1f}ms  "
+                  f"ready p50 {results[mode]['ready']['p50Ms']:9.1f}ms  phases {runs[-1]['startup']['phases']}")
+
+    worst = max(result['healthy']['p50Ms'] for result in results.values())
+    passed = worst <= args.target_ms
+    print(f"time to first healthy {worst:.1f}ms, target {args.target_ms:.0f}ms: {'ok' if passed else 'FAILED'}")
+    emit({
+        'benchmark': 'startup',
+        'warmup': args.warmup,
+        'targetMs': args.target_ms,
+        'passed': passed,
+        'results': results
+    }, args.output)
+    if not passed:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
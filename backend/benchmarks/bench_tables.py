@@ -0,0 +1,75 @@
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+from app.services.parser import parse_table_lines, process_table_data
+from .common import emit, percentiles
+from .corpus import WORDS
+
+def table_lines(rows: int, columns: int, variant: str, seed: int) -> List[str]:
+    """
+    生成一个大表格的行（已去除首尾空白），variant:
+    - progress: 最后一列是进度列，少量单元格需要规范化为[ ]
+    - append: 没有进度列，需要追加
+    - ragged: 有进度列，各行列数不一致，需要补齐或截断
+    """
+    rng = random.Random(seed)
+    header = [f"列{i + 1}" for i in range(columns)]
+    if variant != 'append':
+        header.append('进度')
+    lines = ['| ' + ' | '.join(header) + ' |', '|' + '---|' * len(header)]
+    for i in range(rows):
+        cells = [rng.choice(WORDS) for _ in range(columns)]
+        if variant == 'ragged':
+            cells = cells[:rng.randint(1, columns)] if i % 3 == 0 else cells + ['备注'] * (i % 3 - 1)
+        if variant != 'append':
+            cells.append(rng.choice(('[ ]', '[x]', '[x]', '')) if i % 10 == 0 else rng.choice(('[ ]', '[x]')))
+        if i % 500 == 499:
+            lines.append('|' + '---|' * len(header))
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return lines
+
+def run(fn: Callable[[], object], repeat: int, prepare: Callable[[], object] = None) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        argument = prepare() if prepare else None
+        started_at = time.perf_counter()
+        fn(argument)
+        samples.append(time.perf_counter() - started_at)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="大表格的解析和进度列规范化（parse_table_lines / process_table_data）")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="同时把JSON结果写入该文件")
+    args = parser.parse_args()
+
+    scale = 100000 / args.rows
+    results = {}
+    for variant in ('progress', 'append', 'ragged'):
+        lines = table_lines(args.rows, args.columns, variant, args.seed)
+        headers = [h.strip() for h in lines[0].split('|')[1:-1]]
+        parsed_rows = [[c.strip() for c in line.split('|')[1:-1]] for line in lines[2:]]
+        # process_table_data会原地修改行，每次使用新的副本（复制不计入耗时）
+        results[variant] = {
+            'parse_table_lines': run(lambda _: parse_table_lines(lines), args.repeat),
+            'process_table_data': run(lambda rows: process_table_data(list(headers), rows), args.repeat,
+                                      lambda: [[] if set(''.join(row)) <= {'-', ' '} else list(row)
+                                               for row in parsed_rows]),
+        }
+        for name, result in results[variant].items():
+            result['per100kRowsMs'] = round(result['p50Ms'] * scale, 3)
+            print(f"{variant:<9} {name:<19} p50 {result['p50Ms']:9.3f}ms  per 100k rows {result['per100kRowsMs']:9.3f}ms")
+
+    emit({
+        'benchmark': 'tables',
+        'rows': args.rows,
+        'columns': args.columns,
+        'results': results
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+def git_commit() -> Optional[str]:
+    """
+    当前代码的提交号（有未提交的修改时加上 -dirty），不在git仓库中时返回None
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=directory,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directory,
+                               capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if not commit:
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    耗时样本（秒）的统计，单位毫秒
+    """
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {
+        'count': len(ordered),
+        'meanMs': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50Ms': pick(0.5),
+        'p90Ms': pick(0.9),
+        'p99Ms': pick(0.99),
+        'maxMs': round(ordered[-1] * 1000, 3),
+    }
+
+def emit(result: Dict[str, Any], output: Optional[str] = None) -> Dict[str, Any]:
+    """
+    打印一行JSON结果（附带提交号、Python版本等环境信息）；指定output时同时写入文件，
+    供 python -m benchmarks.compare 比较两次提交的结果
+    """
+    result = dict(result)
+    result['meta'] = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'cpuCount': os.cpu_count(),
+        'timestamp': int(time.time()),
+    }
+    line = json.dumps(result, ensure_ascii=False)
+    print(line)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(line + '\n')
+    return result
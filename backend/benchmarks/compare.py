@@ -0,0 +1,65 @@
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+# 数值越大越好的指标，其余（耗时、内存）越小越好
+HIGHER_IS_BETTER = ('rps', 'speedup', 'ratio')
+# 描述数据规模而非性能的字段，不判断回退
+NOT_PERFORMANCE = ('count', 'errors', 'files', 'hits', 'cells', 'rows', 'tables', 'deltas', 'fileBytes', 'diskBytes', 'workers', 'concurrency')
+
+def flatten(value: Any, prefix: str = '') -> Iterator[Tuple[str, float]]:
+    """
+    把嵌套的结果展开为 (路径, 数值)；列表中的元素按其标识字段（workers/query等）命名
+    """
+    if isinstance(value, bool):
+        return
+    if isinstance(value, (int, float)):
+        yield prefix, float(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key != 'meta':
+                yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            name = str(i)
+            if isinstance(item, dict):
+                name = next((str(item[k]) for k in ('workers', 'query', 'name') if k in item), name)
+            yield from flatten(item, f"{prefix}[{name}]")
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准测试的JSON结果（--output写入的文件）")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1, help="变化超过该比例时标记为回退或改进")
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    if baseline.get('benchmark') != current.get('benchmark'):
+        raise SystemExit(f"不是同一个基准测试: {baseline.get('benchmark')} / {current.get('benchmark')}")
+    print(f"{baseline.get('benchmark')}: {baseline.get('meta', {}).get('commit')} -> {current.get('meta', {}).get('commit')}")
+
+    before = dict(flatten(baseline))
+    regressions = 0
+    for key, value in flatten(current):
+        if key not in before:
+            continue
+        old = before[key]
+        change = (value - old) / old if old else 0.0
+        name = key.rsplit('.', 1)[-1]
+        better = change > 0 if name in HIGHER_IS_BETTER else change < 0
+        mark = ''
+        if abs(change) >= args.threshold and name not in NOT_PERFORMANCE:
+            mark = 'improved' if better else 'REGRESSED'
+            regressions += not better
+        print(f"{key:<50} {old:>12.4g} {value:>12.4g} {change:+8.1%} {mark}")
+
+    if regressions:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import os
+import random
+import argparse
+import json
+from typing import Dict
+
+# 生成内容使用的中文词汇，模拟真实的收集品清单
+WORDS = ['诺威之长剑', '艾丽丝之枪', '骑士盾牌', '火焰法杖', '月光大剑', '第一章', '第二节',
+         '隐藏宝箱', '商人处购买', '击败首领', '支线任务', 'Long Sword', 'Spear', 'Shield']
+
+# 不含中文时使用的词汇
+ASCII_WORDS = ['Long Sword', 'Spear', 'Shield', 'Fire Staff', 'Moonlight Greatsword', 'Chapter 1', 'Section 2',
+               'Hidden Chest', 'Merchant', 'Boss Drop', 'Side Quest', 'Ring', 'Amulet', 'Key']
+
+def generate_corpus(root_dir: str, files: int = 1000, tables_per_file: int = 3,
+                    rows_per_table: int = 50, columns: int = 3, seed: int = 0,
+                    progress_rate: float = 0.5, separator_rate: float = 0.0, cjk: bool = True) -> Dict[str, int]:
+    """
+    在root_dir下生成合成的Markdown数据目录，返回生成的文件数和总字节数
+    文件分散在两级子目录中；progress_rate为带进度列的表格比例，separator_rate为分隔行（|---|）占数据行的比例，
+    cjk为False时只使用英文内容。相同参数和seed生成的内容完全相同
+    """
+    rnd = random.Random(seed)
+    words = WORDS if cjk else ASCII_WORDS
+    names = ('游戏', '周目', '清单', '列', '进度', '表格') if cjk else ('game', 'run', 'list', 'col', 'progress', 'Table ')
+    total_bytes = 0
+    for index in range(files):
+        directory = os.path.join(root_dir, f"{names[0]}{index % 20:02d}", f"{names[1]}{index % 5}")
+        os.makedirs(directory, exist_ok=True)
+
+        lines = []
+        for table in range(tables_per_file):
+            has_progress = rnd.random() < progress_rate
+            header = [f"{names[3]}{c}" for c in range(columns)] + ([names[4]] if has_progress else [])
+            lines.append(f"### {names[5]}{table}")
+            lines.append('| ' + ' | '.join(header) + ' |')
+            lines.append('|' + '|'.join(['------'] * len(header)) + '|')
+            for _ in range(rows_per_table):
+                if separator_rate and rnd.random() < separator_rate:
+                    lines.append('|' + '|'.join(['---'] * len(header)) + '|')
+                    continue
+                cells = [rnd.choice(words) for _ in range(columns)]
+                if has_progress:
+                    cells.append(rnd.choice(['[ ]', '[x]']))
+                lines.append('| ' + ' | '.join(cells) + ' |')
+            lines.append('')
+
+        content = '\n'.join(lines).encode('utf-8')
+        with open(os.path.join(directory, f"{names[2]}{index:05d}.md"), 'wb') as f:
+            f.write(content)
+        total_bytes += len(content)
+
+    return {'files': files, 'bytes': total_bytes}
+
+def add_corpus_arguments(parser: argparse.ArgumentParser, files: int = 1000, tables: int = 3,
+                         rows: int = 50, columns: int = 3) -> None:
+    """
+    为基准测试添加生成合成数据的命令行参数
+    """
+    parser.add_argument('--data', help="使用已有的数据目录（默认生成临时的合成数据）")
+    parser.add_argument('--files', type=int, default=files)
+    parser.add_argument('--tables', type=int, default=tables, help="每个文件的表格数")
+    parser.add_argument('--rows', type=int, default=rows, help="每个表格的行数")
+    parser.add_argument('--columns', type=int, default=columns, help="每行的非进度列数")
+    parser.add_argument('--progress-rate', type=float, default=0.5, help="带进度列的表格比例")
+    parser.add_argument('--separator-rate', type=float, default=0.0, help="分隔行占数据行的比例")
+    parser.add_argument('--ascii', action='store_true', help="只生成英文内容（默认包含中文）")
+    parser.add_argument('--seed', type=int, default=0)
+
+def corpus_from_args(root_dir: str, args: argparse.Namespace) -> Dict[str, int]:
+    return generate_corpus(root_dir, files=args.files, tables_per_file=args.tables, rows_per_table=args.rows,
+                           columns=args.columns, seed=args.seed, progress_rate=args.progress_rate,
+                           separator_rate=args.separator_rate, cjk=not args.ascii)
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成的DATA_DIR目录")
+    parser.add_argument('output', help="输出目录")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    result = corpus_from_args(args.output, args)
+    print(json.dumps({'corpus': args.output, **result}, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# app.main在导入时读取配置：数据目录和预写日志放在临时目录，后台线程不自动写入（由测试调用flush）
+DATA_DIR = tempfile.mkdtemp(prefix='crt-test-')
+os.environ['DATA_DIR'] = DATA_DIR
+os.environ['SAVE_JOURNAL_PATH'] = os.path.join(DATA_DIR, '.crt-save-journal')
+os.environ['SAVE_JOURNAL_FLUSH_INTERVAL'] = '3600'
+os.environ['PARSE_SNAPSHOT_PATH'] = ''
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# lifespan停止时会关闭线程池，所有测试共用一个TestClient
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app import main
+    with TestClient(main.app) as client:
+        yield client
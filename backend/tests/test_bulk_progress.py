@@ -0,0 +1,101 @@
+import os
+import pytest
+from app import main
+from app.models import BulkProgressOperation, CellCondition
+from app.services import apply_bulk_progress, compile_conditions, parse_markdown_file
+from app.services.writer import build_bulk_replacements
+from app.services.write_engine import splice
+
+# 两个标题层级下的三个表格；第一个表格以分隔行开头，中间有连续的分隔行（空分段不计数）
+DOCUMENT = (
+    "### 武器\n"
+    "\n"
+    "#### 近战\n"
+    "| 名称 | 类型 | 进度 |\n"
+    "|---|---|---|\n"
+    "|---|---|---|\n"
+    "| 长剑 | 单手 | [ ] |\n"
+    "| 大剑 | 双手 | [x] |\n"
+    "|---|---|---|\n"
+    "|---|---|---|\n"
+    "| 匕首 | 单手 | [ ] |\n"
+    "| 长枪 | 双手 | [ ] |\n"
+    "| 斧 | 单手 | [ ] |\n"
+    "\n"
+    "#### 远程\n"
+    "| 名称 | 类型 |\n"
+    "|---|---|\n"
+    "| 弓 | 双手 |\n"
+    "\n"
+    "### 防具\n"
+    "| 名称 | 类型 | 进度 |\n"
+    "|---|---|---|\n"
+    "| 盾 | 单手 | [ ] |\n"
+)
+
+def bulk(**fields):
+    return BulkProgressOperation(**dict({'filePath': 'doc.md', 'checked': True}, **fields))
+
+def apply(content: bytes, *operations):
+    outcome = {}
+    new_content = splice(content, build_bulk_replacements(content, list(operations), outcome))
+    return new_content, outcome
+
+def progress(tmp_path, content: bytes):
+    path = tmp_path / 'doc.md'
+    path.write_bytes(content)
+    return [[row[-1] if row else None for row in table.rows] for table in parse_markdown_file(str(path), str(tmp_path)).tables]
+
+def test_section_with_range_inside_it(tmp_path):
+    content = DOCUMENT.encode('utf-8')
+    # 第1段为匕首、长枪、斧（行号5-7），再用 [6, 100) 缩小到段内的后两行
+    new_content, outcome = apply(content, bulk(tableIndex=0, section=1, start=6, end=100))
+    assert outcome['matched'] == 2
+    assert progress(tmp_path, new_content)[0] == [None, '[ ]', '[x]', None, None, '[ ]', '[x]', '[x]']
+    # 不指定表格时每个表格各自计算分段，没有第1段的表格被跳过
+    new_content, outcome = apply(content, bulk(section=1, checked=False), bulk(section=0))
+    assert progress(tmp_path, new_content) == [[None, '[x]', '[x]', None, None, '[ ]', '[ ]', '[ ]'], ['[x]'], ['[x]']]
+    assert sorted(outcome['changed']) == [(0, 1), (1, 0), (2, 0)]
+    with pytest.raises(Exception, match="分段不存在"):
+        apply(content, bulk(tableIndex=0, section=2))
+
+def test_condition_matching_nothing_leaves_file_untouched(tmp_path):
+    path = tmp_path / 'doc.md'
+    path.write_bytes(DOCUMENT.encode('utf-8'))
+    operations = [bulk(where=[CellCondition(column='类型', equals='三手')]),
+                  bulk(where=[CellCondition(column=0, regex='^盾$'), CellCondition(column='进度', equals='[x]')])]
+    results = apply_bulk_progress(operations, str(tmp_path))
+    assert results['success']
+    assert results['affected'] == {'doc.md': {'matched': 0, 'changed': 0}}
+    assert results['deltas'] == []
+    assert path.read_bytes() == DOCUMENT.encode('utf-8')
+
+def test_conditions_combine_and_reject_invalid_input():
+    content = DOCUMENT.encode('utf-8')
+    _, outcome = apply(content, bulk(where=[CellCondition(column='类型', equals='单手'), CellCondition(column='名称', contains='剑')]))
+    assert outcome['changed'] == {(0, 1): True}
+    with pytest.raises(ValueError):
+        compile_conditions([CellCondition(column='名称', regex='(')])
+    with pytest.raises(ValueError):
+        compile_conditions([CellCondition(column='名称')])
+    with pytest.raises(Exception, match="列不存在"):
+        apply(content, bulk(tableIndex=1, where=[CellCondition(column='重量', equals='1')]))
+
+def write_file(name: str) -> None:
+    path = os.path.join(main.DATA_DIR, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] |\n")
+    main.LIVE_INDEX.update_file(path)
+
+def test_directory_selector_does_not_match_sibling_prefix(client):
+    for name in ('bulk/a/x.md', 'bulk/a/sub/y.md', 'bulk/ab/z.md', 'bulk/a.md'):
+        write_file(name)
+    for selector in ('bulk/a', 'bulk/a/'):
+        response = client.post('/api/progress/bulk', json={'operations': [{'filePath': selector, 'checked': True}]}).json()
+        assert response['success']
+        assert sorted(response['affected']) == ['bulk/a/sub/y.md', 'bulk/a/x.md']
+    for name in ('bulk/ab/z.md', 'bulk/a.md'):
+        assert client.get('/api/file', params={'path': name}).json()['tables'][0]['rows'] == [['长剑', '[ ]']]
+    response = client.post('/api/progress/bulk', json={'operations': [{'filePath': 'bulk/b', 'checked': True}]}).json()
+    assert not response['success']
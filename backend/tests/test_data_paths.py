@@ -0,0 +1,58 @@
+import os
+import pytest
+from app import main
+from app.models import BulkProgressOperation, ProgressDelta, TableUpdate
+from app.services import apply_bulk_progress, apply_progress_deltas, file_version, resolve_data_path, write_multiple_updates
+
+CONTENT = "#### 武器\n\n| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] |\n"
+
+@pytest.fixture
+def outside(tmp_path):
+    # 数据目录之外、与之相邻的文件
+    root = tmp_path / 'data'
+    root.mkdir()
+    path = tmp_path / 'outside.md'
+    path.write_text(CONTENT, encoding='utf-8')
+    return str(root), path
+
+@pytest.mark.parametrize('file_path', ['../outside.md', 'sub/../../outside.md', '__absolute__', ''])
+def test_resolve_data_path_rejects_paths_outside_root(outside, file_path):
+    root, path = outside
+    with pytest.raises(ValueError):
+        resolve_data_path(root, str(path) if file_path == '__absolute__' else file_path)
+
+def test_resolve_data_path_rejects_symlink_out_of_root(outside):
+    root, path = outside
+    os.symlink(path, os.path.join(root, 'link.md'))
+    with pytest.raises(ValueError):
+        resolve_data_path(root, 'link.md')
+    assert resolve_data_path(root, 'a/b.md') == os.path.join(root, 'a/b.md')
+
+def test_writers_do_not_touch_files_outside_root(outside):
+    root, path = outside
+    for file_path in ('../outside.md', str(path)):
+        results = [
+            apply_progress_deltas([ProgressDelta(filePath=file_path, tableIndex=0, rowIndex=0, checked=True)], root),
+            write_multiple_updates([TableUpdate(filePath=file_path, tableIndex=0, newRows=[['长剑', '[x]']])], root),
+            apply_bulk_progress([BulkProgressOperation(filePath=file_path, tableIndex=0, checked=True)], root),
+        ]
+        for result in results:
+            assert not result['success'] and result['updated_files'] == []
+            assert '数据目录' in result['errors'][0]['error']
+    assert path.read_text(encoding='utf-8') == CONTENT
+
+def test_versioned_delta_outside_root_is_rejected(client):
+    path = os.path.join(os.path.dirname(main.DATA_DIR), 'crt-outside.md')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(CONTENT)
+    try:
+        # 版本号与文件一致，只有路径检查能拒绝这次写入
+        response = client.post('/api/save/delta', json={'deltas': [{
+            'filePath': '../crt-outside.md', 'tableIndex': 0, 'rowIndex': 0, 'checked': True,
+            'baseVersion': file_version(os.stat(path))}]}).json()
+        assert not response['success']
+        assert client.get('/api/table/range', params={'path': '../crt-outside.md'}).status_code == 404
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == CONTENT
+    finally:
+        os.unlink(path)
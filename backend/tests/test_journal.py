@@ -0,0 +1,61 @@
+import os
+from app.models import ProgressDelta, TableUpdate
+from app.services import SaveJournal
+from app.services.writer import apply_progress_deltas, write_multiple_updates
+
+CONTENT = "#### 武器\n\n| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] |\n| 盾 | [ ] |\n"
+
+def start_journal(data_dir):
+    journal = SaveJournal(os.path.join(data_dir, '.crt-save-journal'),
+                          lambda deltas: apply_progress_deltas(deltas, str(data_dir)), flush_interval=3600)
+    journal.start()
+    return journal
+
+def test_flush_writes_other_workers_journal_first(tmp_path):
+    path = tmp_path / 'a.md'
+    path.write_text(CONTENT, encoding='utf-8')
+    # 同一数据目录上的两个worker，各自独占一个日志文件
+    worker_a = start_journal(tmp_path)
+    worker_b = start_journal(tmp_path)
+    try:
+        assert worker_a.path != worker_b.path
+        worker_a.append([ProgressDelta(filePath='a.md', tableIndex=0, rowIndex=0, checked=True)])
+
+        # worker B同步保存之前先写入所有日志中的增量
+        worker_b.flush()
+        assert '| 长剑 | [x] |' in path.read_text(encoding='utf-8')
+        write_multiple_updates([TableUpdate(filePath='a.md', tableIndex=0, newRows=[['长剑', '[ ]'], ['盾', '[x]']])],
+                               str(tmp_path))
+
+        # worker A的后台写入不能用已转走的增量覆盖之后的保存
+        assert worker_a.flush() is None
+        assert path.read_text(encoding='utf-8') == CONTENT.replace('| 盾 | [ ] |', '| 盾 | [x] |')
+        assert worker_a.stats()['pendingDeltas'] == 0
+        assert worker_b.stats()['adopted'] == 1
+    finally:
+        worker_b.stop()
+        worker_a.stop()
+
+def test_replayed_deltas_follow_their_rows(tmp_path):
+    path = tmp_path / 'a.md'
+    path.write_text(CONTENT, encoding='utf-8')
+    before_restart = start_journal(tmp_path)
+    try:
+        before_restart.append([
+            ProgressDelta(filePath='a.md', tableIndex=0, rowIndex=0, checked=True, rowCells=['长剑']),
+            ProgressDelta(filePath='a.md', tableIndex=0, rowIndex=1, checked=True, rowCells=['盾']),
+        ])
+        # 写入之前文件被外部修改: 删除了长剑，在盾之前插入了两行
+        path.write_text(CONTENT.replace('| 长剑 | [ ] |\n', '| 弓 | [ ] |\n| 箭 | [ ] |\n'), encoding='utf-8')
+
+        after_restart = start_journal(tmp_path)
+        try:
+            after_restart.flush()
+            assert path.read_text(encoding='utf-8') == CONTENT.replace(
+                '| 长剑 | [ ] |\n| 盾 | [ ] |\n', '| 弓 | [ ] |\n| 箭 | [ ] |\n| 盾 | [x] |\n')
+            stats = after_restart.stats()
+            assert (stats['remapped'], stats['dropped']) == (1, 1)
+        finally:
+            after_restart.stop()
+    finally:
+        before_restart.stop()
@@ -0,0 +1,91 @@
+import io
+from app.services import build_table_index, parse_markdown_file
+from app.services.parser import split_row, tokenize_markdown
+from app.services.writer import rewrite_tables
+
+DOCUMENT = (
+    "# 武器\n"
+    "\n"
+    "| 名称 | 说明 | 进度 |\n"
+    "|---|---|---|\n"
+    "| 长剑 | 单手 \\| 双手 | [x] |\n"
+    "| 盾 | 防具 | [ ] |\n"
+    "\n"
+    "## 饰品\n"
+    "\n"
+    "| 名称 | 进度 |\n"
+    "|---|---|\n"
+    "| 戒指 | [ ] |\n"
+    "|---|---|\n"
+    "| 项链 | [x] |"
+)
+
+def parse(tmp_path, content: bytes):
+    path = tmp_path / 'doc.md'
+    path.write_bytes(content)
+    return parse_markdown_file(str(path), str(tmp_path))
+
+def assert_offsets_round_trip(content: bytes):
+    # 记录的字节范围切回原文后与各行（不含换行符）一致
+    lines = content.decode('utf-8').splitlines()
+    for token in tokenize_markdown(io.BytesIO(content)):
+        text = content[token['start']:token['end']].decode('utf-8')
+        if token['type'] == 'header':
+            assert text in lines and token['title'] in text
+            continue
+        assert [content[start:end].decode('utf-8').strip() for start, end in token['offsets']] == token['lines']
+        assert text.splitlines() == [content[start:end].decode('utf-8') for start, end in token['offsets']]
+    for location in build_table_index(content):
+        start, end = location['headerLine']
+        assert [c.strip() for c in split_row(content[start:end].decode('utf-8'))[1:-1]] == location['header']
+        for start, end, _ in location['rows']:
+            line = content[start:end].decode('utf-8')
+            assert line in lines and not line.endswith(('\r', '\n'))
+
+def test_tokenizer_yields_headers_and_tables_with_byte_offsets():
+    content = DOCUMENT.encode('utf-8')
+    tokens = list(tokenize_markdown(io.BytesIO(content)))
+    assert [token['type'] for token in tokens] == ['header', 'table', 'header', 'table']
+    assert [token['title'] for token in tokens if token['type'] == 'header'] == ['武器', '饰品']
+    assert_offsets_round_trip(content)
+
+def test_crlf_parses_like_lf(tmp_path):
+    lf = DOCUMENT.encode('utf-8')
+    crlf = lf.replace(b'\n', b'\r\n')
+    assert parse(tmp_path, crlf).tables == parse(tmp_path, lf).tables
+    assert_offsets_round_trip(crlf)
+    # 行的字节范围不含 \r，两种换行下每行的位置只相差之前的 \r 个数
+    for lf_location, crlf_location in zip(build_table_index(lf), build_table_index(crlf)):
+        for (lf_start, lf_end, _), (start, end, _) in zip(lf_location['rows'], crlf_location['rows']):
+            newlines = lf[:lf_start].count(b'\n')
+            assert (start, end) == (lf_start + newlines, lf_end + newlines)
+
+def test_multibyte_cells_use_byte_offsets():
+    content = "| 名称 | 进度 |\n|---|---|\n| 🗡️ 诺威之长剑 | [ ] |\n| Ærøskøbing | [x] |\n".encode('utf-8')
+    location = build_table_index(content)[0]
+    assert [content[start:end].decode('utf-8') for start, end, _ in location['rows']] == [
+        '| 🗡️ 诺威之长剑 | [ ] |', '| Ærøskøbing | [x] |']
+    assert location['end'] == len(content) - 1
+    assert_offsets_round_trip(content)
+
+def test_escaped_pipes_stay_in_their_cell(tmp_path):
+    content = DOCUMENT.encode('utf-8')
+    table = parse(tmp_path, content).tables[0]
+    assert table.header == ['名称', '说明', '进度']
+    assert table.rows == [['长剑', '单手 \\| 双手', '[x]'], ['盾', '防具', '[ ]']]
+    # 改写进度时转义保持不变
+    rewritten = rewrite_tables(content, {0: [['长剑', '单手 \\| 双手', '[ ]'], ['盾', '防具', '[ ]']]})
+    assert rewritten == content.replace('| 单手 \\| 双手 | [x] |'.encode('utf-8'), '| 单手 \\| 双手 | [ ] |'.encode('utf-8'))
+
+def test_table_at_end_of_file_without_newline(tmp_path):
+    content = DOCUMENT.encode('utf-8')
+    tables = parse(tmp_path, content).tables
+    assert [table.title for table in tables] == ['武器', '饰品']
+    assert tables[1].rows == [['戒指', '[ ]'], [], ['项链', '[x]']]
+    location = build_table_index(content)[-1]
+    assert location['end'] == len(content)
+    assert content[location['rows'][-1][0]:location['rows'][-1][1]] == '| 项链 | [x] |'.encode('utf-8')
+    assert_offsets_round_trip(content)
+    # 末尾有换行时结果相同，结束位置不含换行符
+    assert parse(tmp_path, content + b'\n').tables == tables
+    assert build_table_index(content + b'\r\n')[-1]['end'] == len(content)
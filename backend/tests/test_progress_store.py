@@ -0,0 +1,28 @@
+import os
+from app.models import ProgressDelta
+from app.services import ProgressStore
+from app.services.parser import parse_markdown_file_compact
+
+CONTENT = "#### 武器\n\n| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] |\n| 盾 | [ ] |\n"
+
+def write(deltas):
+    return {'success': True, 'updated_files': [], 'errors': [], 'versions': {}}
+
+def test_append_rejects_file_with_missing_rows(tmp_path):
+    for name in ('a.md', 'b.md'):
+        (tmp_path / name).write_text(CONTENT, encoding='utf-8')
+    files = {name: parse_markdown_file_compact(os.path.join(tmp_path, name), str(tmp_path)) for name in ('a.md', 'b.md')}
+    store = ProgressStore(os.path.join(tmp_path, 'progress.sqlite3'), write, flush_interval=3600)
+    store.start()
+    try:
+        store.on_index_change(files, True)
+        rejected = store.append([
+            ProgressDelta(filePath='a.md', tableIndex=0, rowIndex=0, checked=True),
+            ProgressDelta(filePath='b.md', tableIndex=0, rowIndex=0, checked=True),
+            ProgressDelta(filePath='b.md', tableIndex=0, rowIndex=9, checked=True),
+        ])
+        assert list(rejected) == ['b.md']
+        # 被拒绝的文件中没有任何一行被修改
+        assert store.stats()['lagRecords'] == 1
+    finally:
+        store.stop()
@@ -0,0 +1,55 @@
+import os
+from app.services import parse_markdown_file, read_table_rows
+from app.services.parser import ROW_OFFSET_STRIDE, parse_markdown_file_compact
+from app.services.write_engine import file_version
+
+ROW_COUNT = 3 * ROW_OFFSET_STRIDE + 5
+# 记录点前后的边界: 0、1、STRIDE-1、STRIDE、STRIDE+1 ... 以及表格末尾
+BOUNDARIES = sorted({0, 1, ROW_COUNT - 1, ROW_COUNT} | {
+    k * ROW_OFFSET_STRIDE + d for k in range(1, 4) for d in (-1, 0, 1)})
+
+def table_lines(with_progress: bool):
+    # 每隔7行一个分隔行，每隔5行一个转义的 |，每隔11行一个缺少单元格的行，部分进度单元格不是标记
+    lines = ["| 名称 | 说明 | 进度 |" if with_progress else "| 名称 | 说明 |", "|---|---|---|" if with_progress else "|---|---|"]
+    for i in range(ROW_COUNT):
+        if i % 7 == 6:
+            lines.append("|---|---|---|" if with_progress else "|---|---|")
+        elif i % 11 == 10:
+            lines.append(f"| 物品{i} |")
+        else:
+            note = f"甲 \\| 乙{i}" if i % 5 == 0 else f"说明{i}"
+            mark = ("[x]" if i % 3 == 0 else "未开始" if i % 13 == 0 else "[ ]") if with_progress else ""
+            lines.append(f"|物品{i}|  {note}  | {mark} |" if with_progress else f"| 物品{i} | {note} |")
+    return lines
+
+def write_document(tmp_path):
+    content = "\r\n".join(["# 收集", "", "#### 武器"] + table_lines(True) + ["", "#### 地点"] + table_lines(False))
+    path = tmp_path / 'range.md'
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
+
+def test_range_matches_full_parse_around_offset_boundaries(tmp_path):
+    path = write_document(tmp_path)
+    full = parse_markdown_file(path, str(tmp_path))
+    compact = parse_markdown_file_compact(path, str(tmp_path))
+    assert [t.header for t in full.tables] == [['名称', '说明', '进度']] * 2
+    for table, compact_table in zip(full.tables, compact.tables):
+        assert len(table.rows) == compact_table.row_count == ROW_COUNT
+        for offset in BOUNDARIES:
+            for end in BOUNDARIES:
+                if end < offset:
+                    continue
+                assert read_table_rows(path, compact_table, compact.version, offset, end) == table.rows[offset:end], (offset, end)
+        # 超出表格末尾的范围截断到最后一行
+        assert read_table_rows(path, compact_table, compact.version, ROW_COUNT - 2, ROW_COUNT + 50) == table.rows[-2:]
+
+def test_stale_version_is_rejected(tmp_path):
+    path = write_document(tmp_path)
+    compact = parse_markdown_file_compact(path, str(tmp_path))
+    table = compact.tables[0]
+    assert read_table_rows(path, table, 'stale', 0, 10) is None
+    # 文件在解析之后被修改，常驻索引中的版本和偏移已失效
+    with open(path, 'ab') as f:
+        f.write("\r\n| 新物品 | 新 | [ ] |".encode('utf-8'))
+    assert file_version(os.stat(path)) != compact.version
+    assert read_table_rows(path, table, compact.version, 0, 10) is None
@@ -0,0 +1,52 @@
+import os
+from fastapi.testclient import TestClient
+from app import main
+
+CONTENT = "#### 武器\n\n| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] |\n| 盾 | [ ] |\n"
+
+def write_file(name: str) -> str:
+    path = os.path.join(main.DATA_DIR, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(CONTENT)
+    main.LIVE_INDEX.update_file(path)
+    return path
+
+def progress(client: TestClient, name: str):
+    rows = client.get('/api/file', params={'path': name}).json()['tables'][0]['rows']
+    return [row[-1] for row in rows]
+
+def delta(name: str, checked: bool, **extra):
+    return {'deltas': [dict({'filePath': name, 'tableIndex': 0, 'rowIndex': 0, 'checked': checked}, **extra)]}
+
+def test_full_save_after_journaled_delta(client):
+    write_file('save.md')
+    assert client.post('/api/save/delta', json=delta('save.md', True)).json()['success']
+    response = client.post('/api/save', json={'updates': [
+        {'filePath': 'save.md', 'tableIndex': 0, 'newRows': [['长剑', '[ ]'], ['盾', '[x]']]}]})
+    assert response.json()['success']
+    # 后台线程此时再写入日志中的增量，不能覆盖之后的保存
+    main.JOURNAL.flush()
+    assert progress(client, 'save.md') == ['[ ]', '[x]']
+
+def test_base_version_delta_after_journaled_delta(client):
+    write_file('versioned.md')
+    version = client.get('/api/file', params={'path': 'versioned.md'}).json()['version']
+    assert client.post('/api/save/delta', json=delta('versioned.md', True)).json()['success']
+    # 日志中的增量先写入文件，版本号已变化
+    response = client.post('/api/save/delta', json=delta('versioned.md', False, baseVersion=version)).json()
+    assert not response['success']
+    version = client.get('/api/file', params={'path': 'versioned.md'}).json()['version']
+    response = client.post('/api/save/delta', json=delta('versioned.md', False, baseVersion=version)).json()
+    assert response['success']
+    main.JOURNAL.flush()
+    assert progress(client, 'versioned.md') == ['[ ]', '[ ]']
+    assert client.get('/api/file', params={'path': 'versioned.md'}).json()['version'] == response['versions']['versioned.md']
+
+def test_journaled_delta_survives_external_edit(client):
+    path = write_file('edited.md')
+    assert client.post('/api/save/delta', json=delta('edited.md', True)).json()['success']
+    # 后台写入之前在表格开头插入一行，日志中的增量仍然作用于长剑
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(CONTENT.replace('| 长剑 |', '| 弓 | [ ] |\n| 长剑 |'))
+    main.JOURNAL.flush()
+    assert progress(client, 'edited.md') == ['[ ]', '[x]', '[ ]']
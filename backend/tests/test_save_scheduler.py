@@ -0,0 +1,53 @@
+from app.models import TableUpdate
+from app.services import parse_markdown_file, write_multiple_updates
+from app.services.save_scheduler import merge_table_updates
+
+CONTENT = ("#### 武器\n| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] |\n|---|---|\n| 盾 | [ ] |\n| 弓 | [ ] |\n\n"
+           "#### 防具\n| 名称 | 进度 |\n|---|---|\n| 头盔 | [ ] |\n")
+
+def update(file_path, table_index, rows, base_version=None):
+    return TableUpdate(filePath=file_path, tableIndex=table_index, newRows=rows, baseVersion=base_version)
+
+def test_later_update_to_same_row_wins():
+    first = update('a.md', 0, [['长剑', '[x]'], [], ['盾', '[x]'], ['弓', '[ ]']], 'v1')
+    second = update('a.md', 0, [['长剑', '[ ]'], [], ['盾', '[x]']], 'v2')
+    third = update('a.md', 0, [[], [], [], ['弓', '[x]']])
+    merged = merge_table_updates([[first], [second], [third]])
+    assert len(merged) == 1
+    # 空行和超出后一个请求长度的行保留之前的值；baseVersion取第一个
+    assert merged[0].newRows == [['长剑', '[ ]'], [], ['盾', '[x]'], ['弓', '[x]']]
+    assert merged[0].baseVersion == 'v1'
+    # 合并不修改请求中的行列表
+    assert first.newRows == [['长剑', '[x]'], [], ['盾', '[x]'], ['弓', '[ ]']]
+
+def test_updates_to_different_tables_and_files_are_all_kept():
+    requests = [
+        [update('a.md', 0, [['长剑', '[x]']]), update('a.md', 1, [['头盔', '[x]']])],
+        [update('b.md', 0, [['盾', '[x]']])],
+        [update('a.md', 0, [['长剑', '[ ]']]), update('dir/a.md', 0, [['弓', '[x]']])],
+    ]
+    merged = merge_table_updates(requests)
+    assert [(u.filePath, u.tableIndex, u.newRows) for u in merged] == [
+        ('a.md', 0, [['长剑', '[ ]']]),
+        ('a.md', 1, [['头盔', '[x]']]),
+        ('b.md', 0, [['盾', '[x]']]),
+        ('dir/a.md', 0, [['弓', '[x]']]),
+    ]
+
+def test_merged_write_matches_sequential_writes(tmp_path):
+    requests = [
+        [update('s.md', 0, [['长剑', '[x]'], [], ['盾', '[x]'], ['弓', '[x]']]), update('s.md', 1, [['头盔', '[x]']])],
+        [update('s.md', 0, [['长剑', '[ ]'], [], ['盾', '[x]']])],
+        [update('s.md', 0, [[], [], ['盾', '[ ]']])],
+    ]
+    sequential = tmp_path / 'sequential'
+    merged = tmp_path / 'merged'
+    for directory in (sequential, merged):
+        directory.mkdir()
+        (directory / 's.md').write_text(CONTENT, encoding='utf-8')
+    for updates in requests:
+        assert write_multiple_updates(updates, str(sequential))['success']
+    assert write_multiple_updates(merge_table_updates(requests), str(merged))['success']
+    assert (merged / 's.md').read_bytes() == (sequential / 's.md').read_bytes()
+    table = parse_markdown_file(str(merged / 's.md'), str(merged)).tables[0]
+    assert [row[-1] if row else None for row in table.rows] == ['[ ]', None, '[ ]', '[x]']
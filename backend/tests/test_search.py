@@ -0,0 +1,66 @@
+from app.services import LiveIndex, SearchIndex
+from app.services.search import index_terms
+
+WEAPONS = (
+    "#### 武器\n"
+    "| 名称 | 说明 | 进度 |\n"
+    "|---|---|---|\n"
+    "| 长剑 | 骑士的剑 | [ ] |\n"
+    "| 剑 | Excalibur 圣剑 | [x] |\n"
+    "| 大弓 | Longbow | [ ] |\n"
+)
+
+def build(tmp_path, **files):
+    for name, content in files.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    live_index = LiveIndex(str(tmp_path))
+    search_index = SearchIndex()
+    live_index.subscribe(search_index.on_index_change)
+    live_index.rebuild()
+    return live_index, search_index
+
+def rows(search_index, query, **options):
+    return [(r['filePath'], r['tableIndex'], r['rowIndex']) for r in search_index.search(query, **options)['results']]
+
+def test_cjk_text_is_indexed_as_characters_and_bigrams():
+    assert index_terms('骑士的剑') == {'骑', '士', '的', '剑', '骑士', '士的', '的剑'}
+    assert index_terms('Excalibur 圣剑') == {'excalibur', '圣', '剑', '圣剑'}
+
+def test_single_cjk_character(tmp_path):
+    _, search_index = build(tmp_path, **{'w.md': WEAPONS})
+    # 单字按单字匹配：名称或说明中含"剑"的行
+    assert rows(search_index, '剑') == [('w.md', 0, 0), ('w.md', 0, 1)]
+    assert rows(search_index, '弓') == [('w.md', 0, 2)]
+    assert rows(search_index, '枪') == []
+    # 两个以上的字按相邻双字匹配，不跨过不相邻的字
+    assert rows(search_index, '长剑') == [('w.md', 0, 0)]
+    assert rows(search_index, '骑剑') == []
+
+def test_mixed_cjk_and_ascii_query(tmp_path):
+    _, search_index = build(tmp_path, **{'w.md': WEAPONS})
+    assert rows(search_index, 'excal 圣剑') == [('w.md', 0, 1)]
+    assert rows(search_index, 'EXCALIBUR剑') == [('w.md', 0, 1)]
+    assert rows(search_index, 'long 剑') == []
+    # 关闭前缀匹配时普通词必须完整
+    assert rows(search_index, 'excal 圣剑', prefix=False) == []
+    assert rows(search_index, 'excalibur 圣剑', prefix=False) == [('w.md', 0, 1)]
+    # 表头和标题命中时rowIndex为None，进度列不参与索引
+    assert rows(search_index, '说明') == [('w.md', 0, None)]
+    assert rows(search_index, 'x') == []
+
+def test_index_follows_live_index_updates(tmp_path):
+    live_index, search_index = build(tmp_path, **{'w.md': WEAPONS, 'a.md': "| 名称 | 进度 |\n|---|---|\n| 护符 | [ ] |\n"})
+    assert rows(search_index, 'longbow') == [('w.md', 0, 2)]
+    path = tmp_path / 'w.md'
+    path.write_text(WEAPONS.replace('| 大弓 | Longbow |', '| 短弓 | Shortbow 猎人的弓 |'), encoding='utf-8')
+    assert live_index.update_file(str(path))
+    assert rows(search_index, 'longbow') == []
+    assert rows(search_index, '大弓') == []
+    assert rows(search_index, 'short') == [('w.md', 0, 2)]
+    assert rows(search_index, '猎人') == [('w.md', 0, 2)]
+    # 未修改的文件不受影响，删除的文件不再出现在结果中
+    assert rows(search_index, '护符') == [('a.md', 0, 0)]
+    path.unlink()
+    assert live_index.update_file(str(path))
+    assert rows(search_index, '剑') == []
+    assert search_index.stats()['files'] == 1
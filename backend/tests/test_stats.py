@@ -0,0 +1,60 @@
+from app.models import ProgressDelta
+from app.services import LiveIndex, ProgressStats
+
+TREE = {
+    # 分隔行把表格分为两段，空分段不计
+    'root.md': "| 名称 | 进度 |\n|---|---|\n| 长剑 | [x] |\n|---|---|\n|---|---|\n| 盾 | [ ] |\n| 弓 | [ ] |\n",
+    # 没有进度列的表格：所有行都未完成；"进度"列的内容不是进度标记时同样不算进度列
+    'a/one.md': ("#### 地点\n| 地点 | 区域 |\n|---|---|\n| 城堡 | 北 |\n| 森林 | 南 |\n\n"
+                 "#### 任务\n| 名称 | 进度 |\n|---|---|\n| 主线 | 50% |\n\n"
+                 "#### 饰品\n| 名称 | 进度 |\n|---|---|\n| 戒指 | [x] |\n| 项链 | [x] |\n"),
+    'a/b/two.md': "| 名称 | 进度 |\n|---|---|\n| 药水 | [ ] |\n",
+    # 没有表格的文件不计入
+    'a/notes.md': "# 笔记\n\n没有表格\n",
+}
+
+def build(tmp_path):
+    for name, content in TREE.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    live_index = LiveIndex(str(tmp_path))
+    stats = ProgressStats()
+    live_index.subscribe(stats.on_index_change)
+    live_index.rebuild()
+    return live_index, stats
+
+def test_totals_roll_up_by_directory(tmp_path):
+    _, stats = build(tmp_path)
+    summary = stats.summary()
+    assert summary['totals'] == {'fileCount': 3, 'tableCount': 5, 'dataRows': 9, 'checkedRows': 3}
+    assert summary['directories'] == {
+        'a': {'fileCount': 2, 'tableCount': 4, 'dataRows': 6, 'checkedRows': 2},
+        'a/b': {'fileCount': 1, 'tableCount': 1, 'dataRows': 1, 'checkedRows': 0},
+    }
+    assert sorted(summary['files']) == ['a/b/two.md', 'a/one.md', 'root.md']
+    assert stats.file_info('a/notes.md') is None
+    tables = stats.file_detail('a/one.md')['tables']
+    assert [(t['title'], t['dataRows'], t['checkedRows']) for t in tables] == [('地点', 2, 0), ('任务', 1, 0), ('饰品', 2, 2)]
+    sections = stats.file_detail('root.md')['tables'][0]['sections']
+    assert sections == [{'dataRows': 1, 'checkedRows': 1}, {'dataRows': 2, 'checkedRows': 0}]
+
+def test_deltas_and_file_changes_update_totals(tmp_path):
+    live_index, stats = build(tmp_path)
+    deltas = [ProgressDelta(filePath='a/one.md', tableIndex=0, rowIndex=1, checked=True),
+              ProgressDelta(filePath='root.md', tableIndex=0, rowIndex=1, checked=True),   # 分隔行
+              ProgressDelta(filePath='root.md', tableIndex=0, rowIndex=0, checked=True),   # 未改变
+              ProgressDelta(filePath='a/b/two.md', tableIndex=0, rowIndex=0, checked=True)]
+    stats.apply_deltas(deltas, {'updated_files': ['a/one.md', 'root.md'], 'versions': {}})
+    summary = stats.summary()
+    assert summary['totals']['checkedRows'] == 4
+    assert summary['directories']['a']['checkedRows'] == 3
+    assert summary['directories']['a/b']['checkedRows'] == 0
+    # 文件被删除或改写时按新的解析结果重新统计（a/one.md未改写，保留增量后的计数）
+    (tmp_path / 'a' / 'b' / 'two.md').unlink()
+    assert live_index.update_file(str(tmp_path / 'a' / 'b' / 'two.md'))
+    (tmp_path / 'root.md').write_text(TREE['root.md'].replace('| 盾 | [ ] |', '| 盾 | [x] |\n| 枪 | [ ] |'), encoding='utf-8')
+    assert live_index.update_file(str(tmp_path / 'root.md'))
+    summary = stats.summary()
+    assert summary['totals'] == {'fileCount': 2, 'tableCount': 4, 'dataRows': 9, 'checkedRows': 5}
+    assert 'a/b' not in summary['directories']
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from app.services import WriteConflict, WriteEngine, file_version
+
+def test_queues_are_removed_after_writes(tmp_path):
+    engine = WriteEngine()
+    paths = [tmp_path / f"{i}.md" for i in range(4)]
+    for path in paths:
+        path.write_bytes(b'')
+
+    def append(path, i):
+        engine.modify(str(path), lambda content, i=i: content + b'%d\n' % i)
+
+    threads = [threading.Thread(target=append, args=(paths[i % len(paths)], i)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert engine.stats()['activeFiles'] == 0
+    assert sorted(int(line) for path in paths for line in path.read_bytes().split()) == list(range(40))
+
+def test_coalesced_jobs_with_same_expected_version_conflict(tmp_path):
+    engine = WriteEngine()
+    path = tmp_path / 'versioned.md'
+    path.write_bytes(b'base\n')
+    version = file_version(os.stat(path))
+    release = threading.Event()
+
+    def hold(content):
+        # 不修改内容，只让后续的两个写入在等待期间合并到同一批次
+        release.wait()
+        return content
+
+    results = []
+    def write(text):
+        try:
+            results.append(engine.modify(str(path), lambda content: content + text, expected_version=version))
+        except WriteConflict as e:
+            results.append(e)
+
+    holder = threading.Thread(target=engine.modify, args=(str(path), hold))
+    holder.start()
+    while engine.stats()['pendingJobs'] != 0 or engine.stats()['activeFiles'] != 1:
+        time.sleep(0.001)
+    writers = [threading.Thread(target=write, args=(text,)) for text in (b'a\n', b'b\n')]
+    for thread in writers:
+        thread.start()
+    while engine.stats()['pendingJobs'] != 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in [holder] + writers:
+        thread.join()
+
+    assert sum(isinstance(result, WriteConflict) for result in results) == 1
+    assert path.read_bytes() in (b'base\na\n', b'base\nb\n')
+    assert engine.stats()['coalescedJobs'] == 1
@@ -0,0 +1,77 @@
+from app.models import ProgressDelta, TableUpdate
+from app.services import apply_progress_deltas, parse_markdown_file, write_multiple_updates
+from app.services.writer import rewrite_tables
+
+def test_delta_keeps_non_progress_column_titled_progress(tmp_path):
+    # 表头为"进度"但内容不是进度标记：解析器追加进度列，写入也应写到追加的列
+    path = tmp_path / 'p.md'
+    path.write_text("#### 任务\n\n| 名称 | 进度 |\n|---|---|\n| 长剑 | 50% |\n| 盾 | 10% |\n", encoding='utf-8')
+    results = apply_progress_deltas([ProgressDelta(filePath='p.md', tableIndex=0, rowIndex=0, checked=True)], str(tmp_path))
+    assert results['success']
+    table = parse_markdown_file(str(path), str(tmp_path)).tables[0]
+    assert table.rows == [['长剑', '50%', '[x]'], ['盾', '10%', '[ ]']]
+
+def test_delta_targets_progress_column_in_ragged_rows(tmp_path):
+    # 列数与表头不一致的行：写入的位置与解析结果中的进度列一致，多出的单元格保留
+    path = tmp_path / 'r.md'
+    path.write_text("#### 武器\n\n| 名称 | 进度 |\n|---|---|\n| 长剑 | [ ] | 备注 |\n| 盾 |\n| 弓 | [ ] |\n", encoding='utf-8')
+    deltas = [ProgressDelta(filePath='r.md', tableIndex=0, rowIndex=i, checked=True) for i in (0, 1)]
+    assert apply_progress_deltas(deltas, str(tmp_path))['success']
+    assert "| 长剑 | [x] | 备注 |" in path.read_text(encoding='utf-8')
+    table = parse_markdown_file(str(path), str(tmp_path)).tables[0]
+    assert table.rows == [['长剑', '[x]'], ['盾', '[x]'], ['弓', '[ ]']]
+
+# 各种写法混在一起: 不规则的空白、CRLF、行尾空格、自定义分隔行、列数不一致的行、非进度标记的进度单元格、
+# 没有数据行的表格块和表格之外的文字
+ROUND_TRIP = (
+    "# 收集\r\n"
+    "说明文字 | 不是表格\r\n"
+    "\r\n"
+    "#### 武器\r\n"
+    "|名称|类型|进度|\r\n"
+    "| :--- | --- |:---:|\r\n"
+    "|长剑|单手|[x]|\r\n"
+    "|  盾  |  防具  |  [ ]  |   \r\n"
+    "| 弓 | 远程 | 未开始 |\r\n"
+    "|----|----|----|\r\n"
+    "| 枪 | 双手 \\| 长柄 | [x] | 备注 |\n"
+    "| 斧 |\n"
+    "\n"
+    "#### 地点\n"
+    "| 地点 | 区域 | 进度 |\n"
+    "|---|---|---|\n"
+    "| 城堡 | 北 | [x] |\n"
+    "\n"
+    "| 只有表头 | 进度 |\n"
+    "|---|---|\n"
+    "\n"
+    "结尾"
+).encode('utf-8')
+
+def test_unchanged_rows_are_written_back_byte_identical(tmp_path):
+    path = tmp_path / 'round.md'
+    path.write_bytes(ROUND_TRIP)
+    tables = parse_markdown_file(str(path), str(tmp_path)).tables
+    assert tables[0].rows[2] == ['弓', '远程', '[ ]']
+    # 把解析出的行原样保存（已有进度列的表格），文件不变
+    results = write_multiple_updates([TableUpdate(filePath='round.md', tableIndex=0, newRows=tables[0].rows)], str(tmp_path))
+    assert results['success']
+    assert path.read_bytes() == ROUND_TRIP
+    assert rewrite_tables(ROUND_TRIP, {0: tables[0].rows}, normalize_all=False) == ROUND_TRIP
+    # 没有进度列、也不在更新中的表格不标准化时按原始字节保留
+    plain = "| 地点 | 区域 |\r\n|---|---|\r\n| 城堡 | 北 |".encode('utf-8')
+    assert rewrite_tables(ROUND_TRIP + b"\n\n" + plain, {}, normalize_all=False) == ROUND_TRIP + b"\n\n" + plain
+
+def test_changing_one_row_rewrites_only_that_row(tmp_path):
+    path = tmp_path / 'round.md'
+    path.write_bytes(ROUND_TRIP)
+    rows = [list(row) for row in parse_markdown_file(str(path), str(tmp_path)).tables[0].rows]
+    rows[1][-1] = '[x]'
+    assert write_multiple_updates([TableUpdate(filePath='round.md', tableIndex=0, newRows=rows)], str(tmp_path))['success']
+    before = ROUND_TRIP.splitlines(keepends=True)
+    after = path.read_bytes().splitlines(keepends=True)
+    assert len(after) == len(before)
+    changed = [i for i, (old, new) in enumerate(zip(before, after)) if old != new]
+    assert changed == [7]
+    assert after[7] == '|  盾  |  防具  |  [x]  |   \r\n'.encode('utf-8')
+    assert parse_markdown_file(str(path), str(tmp_path)).tables[0].rows == rows